@@ -1,6 +1,6 @@
 import pyaudio # <--- ESTO ES IMPORTANTE: Asegúrate de que esta línea esté al principio
 import time
-import wave
+import threading
 import os
 import sys
 import yaml
@@ -13,6 +13,11 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 # Import the AgentFramework from your custom mcp package
 try:
     from mcp.agent_framework import AgentFramework
+    from mcp.audio_io import open_audio_writer
+    from mcp.ring_buffer import AudioRingBuffer
+    from mcp.audio_dsp import AutomaticGainControl, LevelMeter, StreamingResampler
+    from mcp.audio_devices import get_audio_session
+    from mcp.audio_mixer import SourceMixer
 except ImportError as e:
     print(f"Error importing AgentFramework: {e}")
     print("Asegúrate de que el archivo mcp/agent_framework.py existe y tiene la clase AgentFramework")
@@ -25,9 +30,19 @@ class RecordingAgent(AgentFramework):
     """
     def __init__(self):
         super().__init__("RecordingAgent") # Initialize with agent name
-        self.p = pyaudio.PyAudio()
+        # Shared PortAudio session: initialised once per process, device table cached
+        self.audio = get_audio_session()
         self.stream = None
-        self.frames = []
+        self.streams = []
+        self.mixer = None
+        self.sources = []
+        self.capture_channels = None
+        self.input_device_index = None
+        self.labels = {}
+        self.writer = None
+        self.full_rate_writer = None
+        self._writers_closed = True
+        self.resampler = None
         self.recording = False
         
         self.config = self._load_config() # Load configs from AgentFramework
@@ -39,6 +54,56 @@ class RecordingAgent(AgentFramework):
         self.FORMAT = getattr(pyaudio, self.audio_settings.get('recording_format', 'paInt16'))
         self.CHANNELS = self.audio_settings.get('channels', 1)
         self.RATE = self.audio_settings.get('sample_rate', 44100)
+
+        # Disk spooling: bounded write buffer and periodic WAV header fix-ups
+        self.spool_buffer_bytes = int(self.audio_settings.get('spool_buffer_kb', 256)) * 1024
+        self.header_update_seconds = float(self.audio_settings.get('header_update_seconds', 5.0))
+        # Container for recordings: "wav" or "flac" (lossless, ~50% smaller, encoded while capturing)
+        self.file_format = str(self.audio_settings.get('file_format', 'wav')).lower()
+        if self.file_format not in ('wav', 'flac'):
+            print(f"[{self.agent_name}] ⚠️ Unknown file_format '{self.file_format}'. Using wav.")
+            self.file_format = 'wav'
+
+        # Capture mode: "blocking" (record_chunk loop) or "callback" (PortAudio thread + ring buffer)
+        self.capture_mode = self.audio_settings.get('capture_mode', 'blocking')
+        self.ring_buffer_seconds = float(self.audio_settings.get('ring_buffer_seconds', 10))
+        self.ring_buffer = None
+        self._drain_thread = None
+        self._drain_stop = threading.Event()
+        self._reset_capture_counters()
+
+        # Several simultaneous inputs (e.g. room mic + "pulse" for hybrid classes)
+        self.source_settings = self.audio_settings.get('sources') or []
+        self.multi_source_output = self.audio_settings.get('multi_source_output', 'mix')
+        self.drift_target_ms = float(self.audio_settings.get('drift_target_latency_ms', 100))
+
+        # Optional capture-time resampling to whisper-native 16 kHz mono
+        self.target_sample_rate = self.audio_settings.get('target_sample_rate')
+        self.keep_full_rate = bool(self.audio_settings.get('keep_full_rate', False))
+        if self.target_sample_rate and self.FORMAT != pyaudio.paInt16:
+            print(f"[{self.agent_name}] ⚠️ Resampling requires paInt16 input. Disabling target_sample_rate.")
+            self.target_sample_rate = None
+
+        # Rolling segments: finished files are handed to listeners while the class continues
+        self.segment_seconds = float(self.audio_settings.get('segment_minutes', 0) or 0) * 60
+        self.segment_search_seconds = float(self.audio_settings.get('segment_silence_search_seconds', 30))
+        self.segment_listeners = []
+        self.segments = []
+        # Live consumers of the audio written to disk (e.g. live captions)
+        self.chunk_listeners = []
+
+        # Per-chunk level statistics (RMS, peak, clipping, SNR) saved next to the recording
+        self.silence_threshold_dbfs = float(self.audio_settings.get('silence_threshold_dbfs', -50.0))
+        self.level_meter = None
+
+        # Automatic gain control + limiter before the audio reaches disk
+        self.agc_enabled = bool(self.audio_settings.get('agc_enabled', False))
+        self.agc_params = {
+            "target_dbfs": float(self.audio_settings.get('agc_target_dbfs', -20.0)),
+            "max_gain_db": float(self.audio_settings.get('agc_max_gain_db', 24.0)),
+            "gate_dbfs": float(self.audio_settings.get('agc_gate_dbfs', -55.0)),
+        }
+        self.agc = None
         
         # Paths
         self.recordings_raw_dir = Path('recordings/raw')
@@ -46,15 +111,21 @@ class RecordingAgent(AgentFramework):
 
         print(f"[{self.agent_name}] Initialized with audio settings: {self.audio_settings}")
 
+    @property
+    def p(self):
+        """The session's PyAudio instance (kept for code that used self.p directly)."""
+        return self.audio.pa
+
+    def _reset_capture_counters(self):
+        """Counters for overflows and gaps; stored in the metadata instead of aborting."""
+        self.overflow_count = 0
+        self.gap_count = 0
+        self.gap_frames = 0
+        self._last_adc_time = None
+
     def _get_device_by_name(self, device_name, is_input=True):
-        """Helper to find device index by name."""
-        for i in range(self.p.get_device_count()):
-            info = self.p.get_device_info_by_index(i)
-            if device_name.lower() in info['name'].lower():
-                if (is_input and info['maxInputChannels'] > 0) or \
-                   (not is_input and info['maxOutputChannels'] > 0):
-                    return i
-        return None
+        """Helper to find device index by name (cached device table)."""
+        return self.audio.find(device_name, is_input=is_input)
 
     def select_audio_source(self, class_type="presencial", preferred_device_name=None):
         """
@@ -62,6 +133,9 @@ class RecordingAgent(AgentFramework):
         Can be overridden by a preferred_device_name (e.g., 'HD-Audio Generic').
         """
         input_device_index = None
+        # Cheap check; PortAudio is only re-initialised if hardware was plugged/unplugged
+        if self.audio.refresh_if_changed():
+            print(f"[{self.agent_name}] 🔌 Audio hardware changed - device table refreshed")
 
         if preferred_device_name:
             input_device_index = self._get_device_by_name(preferred_device_name, is_input=True)
@@ -73,20 +147,16 @@ class RecordingAgent(AgentFramework):
 
         if class_type.lower() == "presencial":
             # For presencial, try to use default input or a common mic
-            try:
-                default_input = self.p.get_default_input_device_info()
+            default_input = self.audio.default_input()
+            if default_input is not None:
                 input_device_index = default_input['index']
                 print(f"[{self.agent_name}] Selected default input device for 'presencial': {default_input['name']} (Index: {input_device_index})")
-            except Exception as e:
-                print(f"[{self.agent_name}] Could not get default input device: {e}. Listing available devices...")
-                input_devices = [
-                    (i, self.p.get_device_info_by_index(i)['name']) 
-                    for i in range(self.p.get_device_count()) 
-                    if self.p.get_device_info_by_index(i)['maxInputChannels'] > 0
-                ]
+            else:
+                print(f"[{self.agent_name}] Could not get default input device. Listing available devices...")
+                input_devices = self.audio.input_devices()
                 if input_devices:
-                    input_device_index = input_devices[0][0] # Pick the first available
-                    print(f"[{self.agent_name}] Falling back to first available input device: {input_devices[0][1]} (Index: {input_device_index})")
+                    input_device_index = input_devices[0]['index'] # Pick the first available
+                    print(f"[{self.agent_name}] Falling back to first available input device: {input_devices[0]['name']} (Index: {input_device_index})")
                 else:
                     print(f"[{self.agent_name}] No input devices found!")
                     return None
@@ -98,29 +168,73 @@ class RecordingAgent(AgentFramework):
                 input_device_index = self._get_device_by_name("default", is_input=True)
             
             if input_device_index is not None:
-                print(f"[{self.agent_name}] Selected system audio device for 'online': {self.p.get_device_info_by_index(input_device_index)['name']} (Index: {input_device_index})")
+                print(f"[{self.agent_name}] Selected system audio device for 'online': {self.audio.device(input_device_index)['name']} (Index: {input_device_index})")
             else:
                 print(f"[{self.agent_name}] Could not find 'pulse' or 'default' input for online classes. Please check your audio setup.")
                 # Fallback to default input if no specific system audio found
-                try:
-                    default_input = self.p.get_default_input_device_info()
+                default_input = self.audio.default_input()
+                if default_input is not None:
                     input_device_index = default_input['index']
                     print(f"[{self.agent_name}] Falling back to default input device: {default_input['name']} (Index: {input_device_index})")
-                except Exception:
+                else:
                     print(f"[{self.agent_name}] No suitable input device found for online classes.")
                     return None
+        elif class_type.lower() == "hibrido":
+            # Hybrid: the room mic is the main device; select_audio_sources() adds system audio
+            return self.select_audio_source(class_type="presencial", preferred_device_name=preferred_device_name)
         else:
             print(f"[{self.agent_name}] Unknown class type '{class_type}'. Defaulting to 'presencial' device selection.")
             return self.select_audio_source(class_type="presencial", preferred_device_name=preferred_device_name) # Recursive call to handle unknown type
 
         return input_device_index
 
-    def start_recording(self, output_filename="raw_audio", input_device_index=None):
-        """Starts recording audio from the selected input device."""
+    def select_audio_sources(self, class_type="hibrido", preferred_device_name=None):
+        """
+        Input sources to capture together, as [{"index", "gain_db"}, ...].
+        `sources` in audio_settings wins; otherwise 'hibrido' classes get the
+        room mic plus the system audio device used for 'online' classes, and
+        every other type a single source.
+        """
+        sources = []
+        for entry in self.source_settings:
+            index = entry.get('index')
+            if index is None and entry.get('device'):
+                index = self._get_device_by_name(entry['device'], is_input=True)
+            if index is None:
+                print(f"[{self.agent_name}] ⚠️ Source '{entry.get('device')}' not found. Skipping it.")
+                continue
+            sources.append({"index": index, "gain_db": float(entry.get('gain_db', 0.0))})
+        if sources:
+            return sources
+
+        main_index = self.select_audio_source(class_type=class_type, preferred_device_name=preferred_device_name)
+        if main_index is None:
+            return []
+        sources.append({"index": main_index, "gain_db": 0.0})
+        if class_type.lower() == "hibrido":
+            system_index = self.select_audio_source(class_type="online")
+            if system_index is not None and system_index != main_index:
+                sources.append({"index": system_index, "gain_db": 0.0})
+            else:
+                print(f"[{self.agent_name}] ⚠️ No separate system audio source. Recording the mic only.")
+        return sources
+
+    def start_recording(self, output_filename="raw_audio", input_device_index=None, labels=None, sources=None):
+        """
+        Starts recording audio from the selected input device.
+        `labels` (e.g. class name, instructor) are stored in the recording metadata.
+        With more than one entry in `sources` (see select_audio_sources) all of
+        them are captured at once and mixed (or stacked as tracks) on the fly.
+        """
         if self.recording:
             print(f"[{self.agent_name}] Already recording.")
             return False
 
+        if sources and len(sources) > 1:
+            return self._start_multi_source(output_filename, sources, labels)
+        if sources:
+            input_device_index = sources[0]["index"]
+
         if input_device_index is None:
             # Attempt to automatically select based on pre-configured preference or default
             # For now, let's assume default behavior for simplicity in this initial implementation
@@ -132,70 +246,396 @@ class RecordingAgent(AgentFramework):
             input_device_index = selected_device_index
 
         try:
-            self.stream = self.p.open(
+            self._reset_capture_counters()
+            self.mixer = None
+            self.capture_channels = self.CHANNELS
+            use_callback = self.capture_mode == "callback"
+            if use_callback:
+                frame_size = self.CHANNELS * pyaudio.get_sample_size(self.FORMAT)
+                self.ring_buffer = AudioRingBuffer(
+                    int(self.RATE * self.ring_buffer_seconds) * frame_size, frame_size=frame_size
+                )
+
+            self.stream = self.audio.open(
                 format=self.FORMAT,
                 channels=self.CHANNELS,
                 rate=self.RATE,
                 input=True,
                 frames_per_buffer=self.CHUNK,
-                input_device_index=input_device_index # Use the selected device
+                input_device_index=input_device_index, # Use the selected device
+                stream_callback=self._audio_callback if use_callback else None
             )
-            self.frames = []
+            self.streams = [self.stream]
+            self.input_device_index = input_device_index
+            self.labels = dict(labels or {})
             self.recording = True
             self.start_time = time.time()
-            self.output_filename = self.recordings_raw_dir / f"{output_filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
-            print(f"[{self.agent_name}] Started recording to {self.output_filename} from device index {input_device_index}...")
+            self.output_filename = self.recordings_raw_dir / f"{output_filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{self.file_format}"
+            # Stream straight to disk instead of holding every chunk in memory
+            self._open_writers()
+            if use_callback:
+                self._drain_stop.clear()
+                self._drain_thread = threading.Thread(target=self._drain_loop, name="RecordingDrain", daemon=True)
+                self._drain_thread.start()
+            print(f"[{self.agent_name}] Started recording to {self.output_filename} from device index {input_device_index} ({self.capture_mode} mode)...")
             return True
         except Exception as e:
             print(f"[{self.agent_name}] Error starting recording: {e}")
             self.recording = False
             return False
 
+    def _start_multi_source(self, output_filename, sources, labels):
+        """Opens one callback stream per source; a mixer thread feeds the writers."""
+        if self.FORMAT != pyaudio.paInt16:
+            print(f"[{self.agent_name}] Multi-source capture requires paInt16. Cannot start recording.")
+            return False
+        try:
+            self._reset_capture_counters()
+            source_channels = []
+            for source in sources:
+                info = self.audio.device(source["index"])
+                max_channels = info["max_input_channels"] if info else self.CHANNELS
+                source_channels.append(max(1, min(self.CHANNELS, max_channels)))
+            self.mixer = SourceMixer(
+                source_channels, self.RATE,
+                gains_db=[s.get("gain_db", 0.0) for s in sources],
+                mode=self.multi_source_output,
+                ring_seconds=self.ring_buffer_seconds,
+                target_latency_frames=int(self.RATE * self.drift_target_ms / 1000)
+            )
+            self.capture_channels = self.mixer.channels
+            self.ring_buffer = None
+
+            self.streams = []
+            for i, (source, channels) in enumerate(zip(sources, source_channels)):
+                self.streams.append(self.audio.open(
+                    format=pyaudio.paInt16,
+                    channels=channels,
+                    rate=self.RATE,
+                    input=True,
+                    frames_per_buffer=self.CHUNK,
+                    input_device_index=source["index"],
+                    stream_callback=self._source_callback(self.mixer.rings[i])
+                ))
+            self.stream = self.streams[0]
+            self.input_device_index = sources[0]["index"]
+            self.sources = sources
+            self.labels = dict(labels or {})
+            self.recording = True
+            self.start_time = time.time()
+            self.output_filename = self.recordings_raw_dir / f"{output_filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{self.file_format}"
+            self._open_writers()
+            self._drain_stop.clear()
+            self._drain_thread = threading.Thread(target=self._drain_loop, name="RecordingMixer", daemon=True)
+            self._drain_thread.start()
+            names = [self.audio.device(s["index"])["name"] for s in sources]
+            print(f"[{self.agent_name}] Started recording to {self.output_filename} from {len(sources)} sources "
+                  f"({self.multi_source_output}): {names}")
+            return True
+        except Exception as e:
+            print(f"[{self.agent_name}] Error starting multi-source recording: {e}")
+            self._close_streams()
+            self.mixer = None
+            self.recording = False
+            return False
+
+    def _source_callback(self, ring):
+        """PortAudio callback for one source of a multi-source recording."""
+        def callback(in_data, frame_count, time_info, status):
+            if status & pyaudio.paInputOverflow:
+                self.overflow_count += 1
+            ring.write(in_data)
+            return (None, pyaudio.paContinue)
+        return callback
+
+    def _close_streams(self):
+        for stream in self.streams:
+            try:
+                stream.stop_stream()
+                stream.close()
+            except Exception:
+                pass
+            self.audio.release(stream)
+        self.streams = []
+
+    @property
+    def uses_callbacks(self):
+        """True when capture runs on PortAudio's thread(s) instead of record_chunk()."""
+        return self.capture_mode == "callback" or self.mixer is not None
+
+    def add_segment_listener(self, callback):
+        """
+        Registers `callback(segment_info)`, called each time a segment file is
+        finalized. It runs on the capture thread, so it should only hand the
+        work off (e.g. put it on a queue).
+        """
+        self.segment_listeners.append(callback)
+
+    def remove_segment_listener(self, callback):
+        if callback in self.segment_listeners:
+            self.segment_listeners.remove(callback)
+
+    def add_chunk_listener(self, callback):
+        """
+        Registers `callback(data)`, called with every chunk of PCM exactly as it
+        is written (output_rate / output_channels, int16). Runs on the capture
+        thread, so it must return immediately. Register before start_recording()
+        (see output_format) to receive the first chunks too.
+        """
+        self.chunk_listeners.append(callback)
+
+    def remove_chunk_listener(self, callback):
+        if callback in self.chunk_listeners:
+            self.chunk_listeners.remove(callback)
+
+    def output_format(self, sources=None):
+        """
+        (sample_rate, channels) of the audio start_recording() will write and
+        pass to chunk listeners, so they can be built before capture starts.
+        """
+        if self.target_sample_rate:
+            return int(self.target_sample_rate), 1
+        if sources and len(sources) > 1:
+            return self.RATE, 1 if self.multi_source_output == "mix" else len(sources)
+        return self.RATE, self.CHANNELS
+
+    def _segment_path(self, index):
+        return self.output_filename.with_name(f"{self.output_filename.stem}_seg{index:03d}{self.output_filename.suffix}")
+
+    def _open_writers(self):
+        """Creates the output writer(s) and, if configured, the resampling stage."""
+        sample_width = pyaudio.get_sample_size(self.FORMAT)
+        self.segments = []
+        self.segment_index = 1
+        self._segment_offset = 0.0
+        self._segment_floor_db = None
+        self._frames_in_closed_segments = 0
+        self.resampler = None
+        self.full_rate_writer = None
+        out_rate, out_channels = self.RATE, self.capture_channels
+
+        if self.target_sample_rate and (self.target_sample_rate != self.RATE or self.capture_channels != 1):
+            out_rate, out_channels = int(self.target_sample_rate), 1
+            self.resampler = StreamingResampler(self.RATE, out_rate, in_channels=self.capture_channels)
+            # Separate tracks only survive in the full-rate file, so keep it for multitrack
+            if self.keep_full_rate or (self.mixer is not None and self.mixer.mode == "multitrack"):
+                full_rate_path = self.output_filename.with_name(f"{self.output_filename.stem}_full{self.output_filename.suffix}")
+                self.full_rate_writer = open_audio_writer(
+                    full_rate_path,
+                    channels=self.capture_channels,
+                    sample_width=sample_width,
+                    sample_rate=self.RATE,
+                    buffer_bytes=self.spool_buffer_bytes,
+                    header_interval=self.header_update_seconds
+                )
+
+        self.output_rate = out_rate
+        self.output_channels = out_channels
+        self.writer = self._open_main_writer(
+            self._segment_path(self.segment_index) if self.segment_seconds else self.output_filename
+        )
+        self._writers_closed = False
+        self.level_meter = LevelMeter(self.output_rate, self.output_channels,
+                                      silence_db=self.silence_threshold_dbfs)
+        self.agc = AutomaticGainControl(self.output_rate, self.output_channels, **self.agc_params) \
+            if self.agc_enabled and self.FORMAT == pyaudio.paInt16 else None
+
+    def _open_main_writer(self, path):
+        return open_audio_writer(
+            path,
+            channels=self.output_channels,
+            sample_width=pyaudio.get_sample_size(self.FORMAT),
+            sample_rate=self.output_rate,
+            buffer_bytes=self.spool_buffer_bytes,
+            header_interval=self.header_update_seconds
+        )
+
+    def _close_writers(self):
+        # stop_recording's error path may call this again after a partial close
+        if self._writers_closed:
+            return
+        self._writers_closed = True
+        if self.writer is not None:
+            if self.segment_seconds:
+                self._roll_segment(final=True)
+            else:
+                self.writer.close()
+        if self.full_rate_writer is not None:
+            self.full_rate_writer.close()
+
+    def _maybe_roll_segment(self, level_db):
+        """
+        Rolls over to a new segment at the first quiet chunk within
+        `segment_search_seconds` of the target length, or unconditionally
+        once the search window has passed.
+        """
+        if self._segment_floor_db is None or level_db < self._segment_floor_db:
+            self._segment_floor_db = level_db
+
+        elapsed = self.writer.duration_seconds
+        if elapsed < self.segment_seconds - self.segment_search_seconds:
+            return
+        is_quiet = level_db < self._segment_floor_db + 6.0
+        if is_quiet or elapsed >= self.segment_seconds + self.segment_search_seconds:
+            self._roll_segment()
+
+    def _roll_segment(self, final=False):
+        """Finalizes the current segment file, notifies listeners and opens the next one."""
+        self.writer.close()
+        if final and self.writer.frames_written == 0 and self.segments:
+            # Stopped right after a roll: nothing to transcribe in the last file
+            Path(self.writer.path).unlink(missing_ok=True)
+            self.segments[-1]["final"] = True
+            return
+        info = {
+            "index": self.segment_index,
+            "path": str(self.writer.path),
+            "offset_seconds": round(self._segment_offset, 3),
+            "duration_seconds": round(self.writer.duration_seconds, 3),
+            "final": final
+        }
+        self._segment_offset += self.writer.duration_seconds
+        self._frames_in_closed_segments += self.writer.frames_written
+        self.segments.append(info)
+        print(f"[{self.agent_name}] 📦 Segment {info['index']} ready: {Path(info['path']).name} "
+              f"({info['duration_seconds']:.1f}s at +{info['offset_seconds']:.1f}s)")
+
+        if not final:
+            self.segment_index += 1
+            self._segment_floor_db = None
+            self.writer = self._open_main_writer(self._segment_path(self.segment_index))
+
+        for listener in list(self.segment_listeners):
+            try:
+                listener(info)
+            except Exception as e:
+                print(f"[{self.agent_name}] Segment listener error: {e}")
+
+    def _audio_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: runs on PortAudio's own thread, must never block."""
+        if status & pyaudio.paInputOverflow:
+            self.overflow_count += 1
+
+        # A jump in the ADC clock means the driver skipped audio before handing it to us
+        adc_time = time_info.get('input_buffer_adc_time', 0) if time_info else 0
+        if adc_time and self._last_adc_time is not None:
+            missing = round((adc_time - self._last_adc_time) * self.RATE) - frame_count
+            if missing > frame_count // 2:
+                self.gap_count += 1
+                self.gap_frames += missing
+        if adc_time:
+            self._last_adc_time = adc_time
+
+        self.ring_buffer.write(in_data)
+        return (None, pyaudio.paContinue)
+
+    def _drain_loop(self):
+        """
+        Moves audio from the ring buffer (or the source mixer) to disk until
+        stopped, then drains what is left.
+        """
+        read = self.mixer.mix if self.mixer is not None else self.ring_buffer.read
+        poll_interval = self.CHUNK / float(self.RATE) / 2
+        while not self._drain_stop.is_set():
+            data = read()
+            if data:
+                self._process_chunk(data)
+            else:
+                self._drain_stop.wait(poll_interval)
+        data = read()
+        if data:
+            self._process_chunk(data)
+
+    def _process_chunk(self, data):
+        """Single sink for captured audio, shared by the blocking and callback paths."""
+        if self.full_rate_writer is not None:
+            self.full_rate_writer.write(data)
+        if self.resampler is not None:
+            data = self.resampler.process(data)
+
+        # Meter the input before any gain: a quiet or dead mic must look quiet
+        alerts_before = len(self.level_meter.alerts)
+        levels = self.level_meter.update(data)
+        if len(self.level_meter.alerts) > alerts_before:
+            print(f"[{self.agent_name}] 🚨 {self.level_meter.alerts[-1]}")
+
+        if self.agc is not None:
+            data = self.agc.process(data)
+        self.writer.write(data)
+        for listener in self.chunk_listeners:
+            try:
+                listener(data)
+            except Exception as e:
+                print(f"[{self.agent_name}] Chunk listener error: {e}")
+
+        if self.segment_seconds and levels is not None:
+            self._maybe_roll_segment(levels["rms_db"])
+
     def record_chunk(self):
-        """Records a chunk of audio."""
-        if not self.recording or self.stream is None:
+        """Records a chunk of audio (blocking mode only)."""
+        if not self.recording or self.stream is None or self.uses_callbacks:
             return None
         
         try:
             data = self.stream.read(self.CHUNK)
-            self.frames.append(data)
+            self._process_chunk(data)
             return data
+        except IOError as e:
+            # Input overflow loses one buffer but is not a reason to end the class
+            if getattr(e, 'errno', None) == pyaudio.paInputOverflowed:
+                self.overflow_count += 1
+                return None
+            print(f"[{self.agent_name}] Error recording chunk: {e}")
+            self.stop_recording() # Attempt to stop on error
+            return None
         except Exception as e:
             print(f"[{self.agent_name}] Error recording chunk: {e}")
             self.stop_recording() # Attempt to stop on error
             return None
 
     def stop_recording(self):
-        """Stops recording and saves the audio to a WAV file."""
+        """Stops recording and finalizes the audio file being written to disk."""
         if not self.recording:
             print(f"[{self.agent_name}] Not currently recording.")
             return None
 
         try:
-            self.stream.stop_stream()
-            self.stream.close()
+            self._close_streams()
             self.recording = False
             self.end_time = time.time()
+
+            # Callbacks have stopped; let the drain thread empty the ring buffer
+            if self._drain_thread is not None:
+                self._drain_stop.set()
+                self._drain_thread.join()
+                self._drain_thread = None
             
-            # Save to WAV file
-            wf = wave.open(str(self.output_filename), 'wb')
-            wf.setnchannels(self.CHANNELS)
-            wf.setsampwidth(self.p.get_sample_size(self.FORMAT))
-            wf.setframerate(self.RATE)
-            wf.writeframes(b''.join(self.frames))
-            wf.close()
+            # Flush the remaining buffer and patch the final header
+            self._close_writers()
             
             duration = self.end_time - self.start_time
             print(f"[{self.agent_name}] Recording stopped. Saved to {self.output_filename}. Duration: {duration:.2f} seconds.")
             
-            # Get device info safely
-            device_name = "Unknown"
+            # Signal quality summary + per-chunk time series next to the recording
+            # Measured on the input (after resampling, before the AGC)
+            signal = self.level_meter.summary()
+            signal["measured"] = "input"
             try:
-                if hasattr(self.stream, 'get_input_device_info'):
-                    device_info = self.stream.get_input_device_info()
-                    device_name = self.p.get_device_info_by_index(device_info['index'])['name']
-            except Exception:
-                device_name = "Could not retrieve device info"
+                signal["levels_file"] = self.level_meter.save(self.output_filename.with_suffix('.levels.npz'))
+            except Exception as e:
+                print(f"[{self.agent_name}] Could not save level time series: {e}")
+            print(f"[{self.agent_name}] 📈 Signal: {signal['quality']} (peak {signal['peak_dbfs']} dBFS, "
+                  f"SNR ~{signal.get('snr_db', 0)} dB, {signal['silence_ratio']:.0%} silent)")
+
+            agc = self.agc.summary() if self.agc is not None else None
+            if agc and agc.get("chunks"):
+                print(f"[{self.agent_name}] 🎚️ AGC: mean gain {agc['mean_gain_db']} dB "
+                      f"({agc['min_gain_db']}..{agc['max_gain_db']}), {agc['output_clip_ratio']:.2%} clipped "
+                      f"after gain, {agc['cost_us_mean']} µs/chunk")
+
+            # Device name from the cached table
+            device_info = self.audio.device(self.input_device_index)
+            device_name = device_info['name'] if device_info else "Unknown"
             
             # Basic metadata for now (will be expanded)
             metadata = {
@@ -204,29 +644,82 @@ class RecordingAgent(AgentFramework):
                 "end_time": datetime.fromtimestamp(self.end_time).isoformat(),
                 "duration_seconds": round(duration, 2),
                 "input_device": device_name,
-                "channels": self.CHANNELS,
-                "sample_rate": self.RATE,
-                "format": str(self.FORMAT) # Stored as string for readability
+                "channels": self.output_channels,
+                "sample_rate": self.output_rate,
+                "capture_channels": self.capture_channels,
+                "capture_sample_rate": self.RATE,
+                "full_rate_file": str(self.full_rate_writer.path) if self.full_rate_writer else None,
+                "format": str(self.FORMAT), # Stored as string for readability
+                "frames_written": self._frames_in_closed_segments if self.segment_seconds else self.writer.frames_written,
+                "file_format": self.file_format,
+                "capture_mode": self.capture_mode,
+                "overflow_count": self.overflow_count,
+                "dropped_frames": self._dropped_frames(),
+                "gap_count": self.gap_count,
+                "gap_frames": self.gap_frames,
+                "labels": self.labels,
+                "sources": self._sources_metadata(),
+                "segments": list(self.segments),
+                "signal": signal,
+                "agc": agc
             }
+            if metadata["overflow_count"] or metadata["dropped_frames"] or metadata["gap_count"]:
+                print(f"[{self.agent_name}] ⚠️ Capture issues: {metadata['overflow_count']} overflows, "
+                      f"{metadata['dropped_frames']} dropped frames, {metadata['gap_count']} gaps")
             
-            return {"path": str(self.output_filename), "metadata": metadata}
+            # With rolling segments there is no single file; point at the first one
+            path = self.segments[0]["path"] if self.segments else str(self.output_filename)
+            return {"path": path, "metadata": metadata, "segments": list(self.segments)}
 
         except Exception as e:
             print(f"[{self.agent_name}] Error stopping recording or saving file: {e}")
             self.recording = False
+            if self._drain_thread is not None:
+                self._drain_stop.set()
+                self._drain_thread.join()
+                self._drain_thread = None
+            self._close_writers()
             return None
         finally:
-            # Reinitialize PyAudio for next recording
-            self.p = pyaudio.PyAudio()
+            # The PortAudio session stays alive for the next recording; just drop the streams
+            self._close_streams()
+            self.mixer = None
+
+    def _dropped_frames(self):
+        if self.mixer is not None:
+            return sum(ring.dropped_frames for ring in self.mixer.rings)
+        return self.ring_buffer.dropped_frames if self.ring_buffer else 0
+
+    def _sources_metadata(self):
+        """Per-source device names plus drift/underrun figures for multi-source recordings."""
+        if self.mixer is None:
+            return None
+        stats = self.mixer.stats()
+        stats["devices"] = [(self.audio.device(s["index"]) or {}).get("name", "Unknown") for s in self.sources]
+        return stats
+
+    def record_for(self, duration_seconds):
+        """
+        Keeps the current recording running for `duration_seconds`.
+        In blocking mode this drives record_chunk(); in callback mode capture
+        happens on PortAudio's thread and the caller just waits.
+        """
+        if self.uses_callbacks:
+            deadline = time.time() + duration_seconds
+            while self.recording and time.time() < deadline:
+                time.sleep(min(0.5, max(0.0, deadline - time.time())))
+            return
+        for _ in range(0, int(self.RATE / self.CHUNK * duration_seconds)):
+            if not self.recording:
+                break
+            self.record_chunk()
 
     def run(self):
         """Main execution loop for the Recording Agent (for manual testing)."""
         print(f"[{self.agent_name}] Running Recording Agent in manual test mode.")
         print(f"[{self.agent_name}] Available input devices:")
-        for i in range(self.p.get_device_count()):
-            info = self.p.get_device_info_by_index(i)
-            if info['maxInputChannels'] > 0:
-                print(f"  Device {i}: {info['name']}")
+        for info in self.audio.input_devices():
+            print(f"  Device {info['index']}: {info['name']} ({info['host_api']}, {info['max_input_channels']} ch)")
 
         # Example: Try to record for a fixed duration
         # In a real scenario, this would be triggered by class schedule or manual start
@@ -242,9 +735,7 @@ class RecordingAgent(AgentFramework):
             
             if self.start_recording(output_filename="test_presencial_class", input_device_index=selected_input_device_index):
                 print(f"[{self.agent_name}] Recording for {test_duration_seconds} seconds...")
-                for _ in range(0, int(self.RATE / self.CHUNK * test_duration_seconds)):
-                    self.record_chunk()
-                    time.sleep(self.CHUNK / self.RATE) # Simulate real-time by waiting
+                self.record_for(test_duration_seconds)
                 result = self.stop_recording()
                 if result:
                     print(f"[{self.agent_name}] Test recording successful. File: {result['path']}")
@@ -258,8 +749,7 @@ class RecordingAgent(AgentFramework):
         finally:
             if self.stream is not None and self.recording:
                 self.stop_recording()
-            if self.p is not None:
-                self.p.terminate()
+            self.audio.shutdown()
 
 
 if __name__ == "__main__":
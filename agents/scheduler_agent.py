@@ -0,0 +1,211 @@
+import bisect
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from mcp.agent_framework import AgentFramework
+
+# Día de la semana -> índice de datetime.weekday()
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
+    "friday": 4, "saturday": 5, "sunday": 6,
+    "lunes": 0, "martes": 1, "miercoles": 2, "miércoles": 2, "jueves": 3,
+    "viernes": 4, "sabado": 5, "sábado": 5, "domingo": 6,
+}
+WEEK_SECONDS = 7 * 24 * 3600
+
+_TIME_RANGE = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+
+
+def parse_schedule(schedule):
+    """
+    "Monday 09:00-11:00" (or "Lunes, Miércoles 09:00-11:00") ->
+    [(start_offset, end_offset), ...] in seconds since Monday 00:00.
+    """
+    match = _TIME_RANGE.search(schedule)
+    if not match:
+        raise ValueError(f"No time range in schedule {schedule!r}")
+    h1, m1, h2, m2 = (int(g) for g in match.groups())
+    start, end = h1 * 3600 + m1 * 60, h2 * 3600 + m2 * 60
+    if end <= start:
+        end += 24 * 3600  # Clase que cruza la medianoche
+
+    days = [WEEKDAYS[w] for w in re.findall(r'[^\W\d_]+', schedule[:match.start()].lower()) if w in WEEKDAYS]
+    if not days:
+        raise ValueError(f"No weekday in schedule {schedule!r}")
+    return [(d * 24 * 3600 + start, d * 24 * 3600 + end) for d in days]
+
+
+class ScheduleIndex:
+    """
+    Weekly interval index over the configured classes. Lookups are a bisect
+    on the sorted start offsets, so finding the next class is O(log n).
+    """
+    def __init__(self, classes):
+        self.intervals = []
+        for cls in classes:
+            for start, end in parse_schedule(cls.get("schedule", "")):
+                self.intervals.append((start, end, cls))
+        self.intervals.sort(key=lambda item: item[0])
+        self._starts = [item[0] for item in self.intervals]
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def next_occurrence(self, now):
+        """
+        (start_datetime, end_datetime, class) of the class in progress at
+        `now`, or else of the next one to begin. None if the schedule is empty.
+        """
+        if not self.intervals:
+            return None
+        week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        offset = (now - week_start).total_seconds()
+
+        # Una clase en curso empezó antes de `offset`; también puede venir de la semana anterior
+        i = bisect.bisect_right(self._starts, offset)
+        for start, end, cls in (self.intervals[i - 1:i] if i else []) + [self.intervals[-1]]:
+            for shift in (0, -WEEK_SECONDS):
+                if start + shift <= offset < end + shift:
+                    return (week_start + timedelta(seconds=start + shift),
+                            week_start + timedelta(seconds=end + shift), cls)
+
+        if i < len(self.intervals):
+            start, end, cls = self.intervals[i]
+        else:
+            start, end, cls = self.intervals[0]
+            start, end = start + WEEK_SECONDS, end + WEEK_SECONDS
+        return week_start + timedelta(seconds=start), week_start + timedelta(seconds=end), cls
+
+
+class SchedulerAgent(AgentFramework):
+    """
+    Long-running daemon that records every class in the schedule.
+    It sleeps on a timer until the next event (no polling), warms up the
+    agents a few minutes before class and hands them to the pipeline.
+    """
+    # Tope de cada espera: tras una suspensión del portátil el reloj de pared
+    # se vuelve a consultar a lo sumo una hora después.
+    MAX_SLEEP_SECONDS = 3600
+
+    def __init__(self):
+        super().__init__("SchedulerAgent")
+        settings = self.config.get('scheduler', {}) or {}
+        self.warmup_minutes = float(settings.get('warmup_minutes', 5))
+        self.language = settings.get('language', 'es')
+        self.min_remaining_minutes = float(settings.get('min_remaining_minutes', 1))
+        self.force_engine = settings.get('force_transcription_engine')
+
+        self.index = ScheduleIndex(self.config.get('classes', []) or [])
+        self._stop = threading.Event()
+        self.agents = None
+        self._last_started = None
+        print(f"[{self.agent_name}] Initialized with {len(self.index)} weekly class slots.")
+
+    def stop(self):
+        """Wakes the daemon and makes run() return."""
+        self._stop.set()
+
+    def _sleep_until(self, when):
+        """Blocks until `when` (or stop). Returns False if stopped."""
+        delay = (when - datetime.now()).total_seconds()
+        if delay > 0:
+            self._stop.wait(min(delay, self.MAX_SLEEP_SECONDS))
+        return not self._stop.is_set()
+
+    def warm_up(self):
+        """Builds the agents and loads models so capture starts on a warm pipeline."""
+        from agents.recording_agent import RecordingAgent
+        from agents.transcription_agent import TranscriptionAgent
+        from agents.analysis_agent import AnalysisAgent  # Carga los modelos de spaCy
+        from agents.obsidian_agent import ObsidianAgent
+
+        started = time.time()
+        print(f"[{self.agent_name}] 🔥 Warming up agents...")
+        recording_agent = RecordingAgent()
+        recording_agent.audio.refresh_if_changed()  # Micrófono USB conectado desde el arranque
+        transcription_agent = TranscriptionAgent()
+        engines = transcription_agent.warm_up()
+        self.agents = {
+            "recording": recording_agent,
+            "transcription": transcription_agent,
+            "analysis": AnalysisAgent(),
+            "obsidian": ObsidianAgent(),
+        }
+        print(f"[{self.agent_name}] ✅ Warm-up done in {time.time() - started:.1f}s (engines: {engines})")
+
+    def release(self):
+        """Drops the warm agents so models are not kept resident between classes."""
+        self.agents = None
+
+    def run_class(self, cls, end):
+        """Records the class until `end` and runs the rest of the pipeline."""
+        from main_mcp import run_full_pipeline
+
+        remaining = int((end - datetime.now()).total_seconds())
+        print(f"[{self.agent_name}] 🎓 Starting '{cls.get('name')}' ({remaining}s remaining)")
+        if self.agents is None:
+            self.warm_up()
+        try:
+            run_full_pipeline(
+                class_name=cls.get("name", "Clase"),
+                class_type=cls.get("type", "presencial"),
+                instructor=cls.get("instructor", cls.get("platform", "")),
+                language_hint=cls.get("language", self.language),
+                record_duration_seconds=remaining,
+                force_transcription_engine=self.force_engine,
+                preferred_device_name=cls.get("device"),
+                agents=self.agents
+            )
+        except Exception as e:
+            print(f"[{self.agent_name}] ❌ Pipeline failed for '{cls.get('name')}': {e}")
+        finally:
+            self.release()
+
+    def run(self):
+        if not len(self.index):
+            print(f"[{self.agent_name}] No classes in schedule; nothing to do.")
+            return
+
+        warmup = timedelta(minutes=self.warmup_minutes)
+        min_remaining = timedelta(minutes=self.min_remaining_minutes)
+        while not self._stop.is_set():
+            now = datetime.now()
+            start, end, cls = self.index.next_occurrence(now)
+            key = (cls.get("name"), start)
+
+            if start <= now:
+                # Clase en curso: grabar lo que queda (p.ej. daemon arrancado tarde)
+                if key != self._last_started and end - now >= min_remaining:
+                    self._last_started = key
+                    self.run_class(cls, end)
+                else:
+                    self._sleep_until(end)
+                continue
+
+            print(f"[{self.agent_name}] ⏰ Next: '{cls.get('name')}' at {start:%A %H:%M}")
+            if now < start - warmup:
+                self._sleep_until(start - warmup)
+                continue
+            if self.agents is None:
+                self.warm_up()
+            self._sleep_until(start)
+
+        print(f"[{self.agent_name}] Stopped.")
+
+
+if __name__ == '__main__':
+    scheduler = SchedulerAgent()
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+        print("\n[SchedulerAgent] Interrupted by user.")
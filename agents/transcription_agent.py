@@ -1,17 +1,164 @@
-import subprocess
-import json
+import contextlib
 import time
 from pathlib import Path
 import sys
 import os
+import shutil
+import tempfile
+import threading
+import queue
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
+# CPU accounting for the race workers (POSIX only)
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    resource = None
+    RESOURCE_AVAILABLE = False
+
 # Add the project root to Python path
 project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from mcp.agent_framework import AgentFramework
+from mcp.audio_io import audio_info, list_recordings
+from mcp.audio_dsp import denoise_file
+from mcp.transcript_format import parse_srt, write_srt, write_transcripts, write_vtt
+from mcp.vad import compact_speech
+from mcp.whisper_backends import get_resident_whisper
+from mcp.engine_registry import EngineError, get_engine_registry
+from mcp.live_transcription import LiveTranscriber
+from mcp.transcription_cache import TranscriptionCache, file_fingerprint
+from mcp.parallel_transcription import extract_chunks, merge_chunk_segments, plan_chunks
+from mcp.segment_fallback import bad_ranges, segment_flags, splice_segments
+from mcp.torch_quantization import configure_torch_threads
+from mcp.whisper_streaming import WINDOW_SECONDS
+
+class SegmentTranscriber:
+    """
+    Background worker that transcribes recording segments as they are
+    finalized, then stitches them into one transcript. Pass `submit` to
+    RecordingAgent.add_segment_listener and call `finish()` after the
+    recording stops.
+    """
+    def __init__(self, agent, output_name, **transcribe_kwargs):
+        self.agent = agent
+        self.output_name = output_name
+        self.transcribe_kwargs = transcribe_kwargs
+        self.results = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name="SegmentTranscriber", daemon=True)
+        self._thread.start()
+
+    def submit(self, segment_info):
+        self._queue.put(segment_info)
+
+    def _work(self):
+        while True:
+            segment = self._queue.get()
+            if segment is None:
+                break
+            name = f"{self.output_name}_seg{segment['index']:03d}"
+            print(f"[{self.agent.agent_name}] ✂️ Transcribing segment {segment['index']} while recording continues...")
+            result = self.agent.transcribe_audio_file(segment["path"], output_name=name, **self.transcribe_kwargs)
+            self.results.append((segment, result))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def finish(self):
+        """Waits for the queued segments and returns the stitched result."""
+        self._queue.put(None)
+        self._thread.join()
+        return self.agent.stitch_segment_results(self.results, self.output_name)
+
+# One TranscriptionAgent per pool worker process, created by _init_chunk_worker
+_worker_agent = None
+
+
+def _init_chunk_worker(threads):
+    """Pool initializer: builds the worker's agent once and pins its thread count."""
+    global _worker_agent
+    _worker_agent = TranscriptionAgent(preload_models=False)
+    # Both engines get the worker's share: whisper.cpp threads and PyTorch intra-op threads
+    _worker_agent.amd_config["threads"] = threads
+    _worker_agent.openai_options["threads"] = threads
+    configure_torch_threads(threads)
+
+
+def _transcribe_chunk(chunk_path, out_dir, language, custom_prompt, force_engine, enable_fallback):
+    """Runs the normal engine chain on one chunk inside a pool worker."""
+    agent = _worker_agent
+    agent.transcripts_dir = Path(out_dir)
+    chunk_path = Path(chunk_path)
+    result = agent._run_engines(chunk_path, language, custom_prompt, chunk_path.stem,
+                                force_engine, enable_fallback)
+    segments = result.get("segments")
+    if not segments and result.get("srt_file") and Path(result["srt_file"]).exists():
+        segments = parse_srt(result["srt_file"])
+    # Only what the merge needs goes back through the pipe
+    return {
+        "success": result.get("success", False),
+        "engine": result.get("engine"),
+        "error": result.get("error"),
+        "language": result.get("language"),
+        "processing_time": result.get("processing_time", 0.0),
+        "is_music_classification": result.get("is_music_classification", False),
+        "segments": [{"start": float(seg.get("start", 0.0)), "end": float(seg.get("end", 0.0)),
+                      "text": seg.get("text", "").strip()} for seg in segments or []]
+    }
+
+
+def _race_worker(engine, threads, audio_path, out_dir, language, custom_prompt, output_name, results):
+    """
+    One entrant of a race: runs a single engine in its own process group, so
+    cancelling it also kills the whisper-amd process it may have started.
+    """
+    try:
+        os.setpgrp()
+    except (AttributeError, OSError):
+        pass
+    _init_chunk_worker(threads)
+    agent = _worker_agent
+    agent.transcripts_dir = Path(out_dir)
+    try:
+        if engine == "amd":
+            result = agent._transcribe_with_whisper_amd(Path(audio_path), language, custom_prompt, output_name)
+        else:
+            result = agent._transcribe_with_openai_whisper(Path(audio_path), language, custom_prompt, output_name)
+    except Exception as e:
+        result = {"success": False, "error": f"Worker error: {e}"}
+    if RESOURCE_AVAILABLE:
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        result["cpu_seconds"] = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    results.put((engine, result))
+
+
+def _process_group_cpu(pgid):
+    """CPU seconds used so far by every live process in a process group (Linux /proc), or None."""
+    try:
+        ticks = os.sysconf('SC_CLK_TCK')
+        pids = [d for d in os.listdir('/proc') if d.isdigit()]
+    except (AttributeError, ValueError, OSError):
+        return None
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # pgrp, then utime/stime/cutime/cstime
+        if int(fields[2]) == pgid:
+            total += sum(int(v) for v in fields[11:15])
+    return total / float(ticks)
+
 
 class TranscriptionAgent(AgentFramework):
     """
@@ -24,110 +171,163 @@ class TranscriptionAgent(AgentFramework):
     
     Best performance for Charly-bite's AMD system!
     """
-    def __init__(self):
+    def __init__(self, preload_models=True):
         super().__init__("TranscriptionAgent")
         self.config = self._load_config()
         
-        # Paths and settings
-        self.whisper_amd_path = "/usr/local/bin/whisper-amd"
-        self.models_dir = Path("/home/byte/whisper_models")
+        # Engines (binaries, models, Python backends) come from the shared registry;
+        # their capability probes are cached on disk per installed version
+        self.transcription_settings = self.config.get('transcription_settings', {})
+        engine_settings = self.transcription_settings.get('engines', {}) or {}
+        self.engines = get_engine_registry(engine_settings, self.config.get('whisper_cpp_optimized'))
+        self.models_dir = Path(engine_settings.get('models_dir', '/home/byte/whisper_models'))
         self.transcripts_dir = Path("recordings/transcripts")
         self.transcripts_dir.mkdir(parents=True, exist_ok=True)
+
+        # Voice activity detection: compact silence before the engines run
+        self.audio_settings = self.config.get('audio_settings', {})
+        self.vad_enabled = bool(self.audio_settings.get('vad_enabled', False))
+        self.vad_params = {
+            "threshold_db": float(self.audio_settings.get('vad_threshold_db', 10.0)),
+            "min_silence": float(self.audio_settings.get('vad_min_silence_seconds', 1.0)),
+            "padding": float(self.audio_settings.get('vad_padding_seconds', 0.25)),
+        }
+        # Spectral-gating noise reduction (fans, projector hum) before VAD and the engines
+        self.noise_reduction_enabled = bool(self.audio_settings.get('noise_reduction_enabled', False))
+        self.noise_reduction_params = {
+            "threshold_db": float(self.audio_settings.get('noise_gate_threshold_db', 6.0)),
+            "reduction_db": float(self.audio_settings.get('noise_reduction_db', 18.0)),
+        }
         
-        # Initialize OpenAI Whisper for fallback
-        self.whisper_openai = None
-        self.openai_model = None
-        try:
-            import whisper
-            self.whisper_openai = whisper
+        # OpenAI Whisper for fallback: the default model is preloaded in the
+        # background so the first fallback does not pay the load time
+        if self.engines.is_available("openai-whisper"):
             print(f"[{self.agent_name}] ✅ OpenAI Whisper available for fallback")
-        except ImportError:
+            if preload_models and (engine_settings.get('openai_pool', {}) or {}).get('preload', False):
+                self.engines.get("openai-whisper").preload()
+        else:
             print(f"[{self.agent_name}] ⚠️ OpenAI Whisper not available - AMD only mode")
         
         # Optimal whisper-amd configuration (validated working)
         self.amd_config = {
-            "model": "ggml-base.bin",
+            "model": engine_settings.get('model', 'ggml-base.bin'),
             "threads": 2,
             "processors": 1,
             "temperature": 0.0,
             "best_of": 5,
             "beam_size": 5,  # Max without "too many decoders" error
             "no_speech_threshold": 0.2,
-            "suppress_non_speech_tokens": True
+            "suppress_non_speech_tokens": True,
+            "output_formats": tuple(self.transcription_settings.get('default_formats', ["txt", "srt", "vtt"]))
+        }
+        
+        # OpenAI Whisper decoding (fallback engine)
+        self.openai_options = {
+            "temperature": 0.0,
+            "best_of": 5,
+            "beam_size": 5,
+            "word_timestamps": True
         }
         
+        # whisper.cpp backend: "auto" (resident in-process model when pywhispercpp
+        # is installed, CLI otherwise), "resident" or "cli"
+        self.whisper_cpp_backend = self.transcription_settings.get('whisper_cpp_backend', 'auto')
+
+        # Long recordings: split at pauses and transcribe the chunks in a process pool
+        parallel = self.transcription_settings.get('parallel', {}) or {}
+        self.parallel_enabled = bool(parallel.get('enabled', False))
+        self.parallel_min_seconds = float(parallel.get('min_duration_minutes', 10)) * 60
+        self.parallel_chunk_seconds = float(parallel.get('chunk_minutes', 5)) * 60
+        self.parallel_overlap_seconds = float(parallel.get('overlap_seconds', 2.0))
+        self.parallel_search_seconds = float(parallel.get('silence_search_seconds', 20))
+        self.parallel_workers = int(parallel.get('workers', 2))
+        self.parallel_threads_per_worker = int(parallel.get('threads_per_worker', 1))
+
+        # Backlogs (transcribe_batch): windows of several recordings decoded
+        # together by OpenAI Whisper; long ones are cut at pauses into chunks
+        batch = self.transcription_settings.get('batch', {}) or {}
+        self.batch_size = int(batch.get('batch_size', 4))
+        self.batch_chunk_seconds = float(batch.get('chunk_minutes', 5)) * 60
+
+        # Segment-level fallback: only the time ranges whisper-amd got wrong
+        # (music tags, hallucinations, loops, low confidence) are re-decoded
+        repair = self.transcription_settings.get('segment_fallback', {}) or {}
+        self.segment_fallback_enabled = bool(repair.get('enabled', False))
+        self.segment_fallback_max_fraction = float(repair.get('max_bad_fraction', 0.5))
+        self.segment_fallback_padding = float(repair.get('padding_seconds', 0.5))
+        self.segment_fallback_merge_gap = float(repair.get('merge_gap_seconds', 2.0))
+        self.segment_flag_params = {"min_confidence": float(repair.get('min_confidence', 0.4))}
+
+        # Race mode: both engines at once on separate processes, the first
+        # acceptable transcript wins and the other worker is killed
+        race = self.transcription_settings.get('race', {}) or {}
+        self.race_enabled = bool(race.get('enabled', False))
+        self.race_min_words = int(race.get('min_words', 3))
+        self.race_cpu_budget = int(race.get('cpu_budget', 0) or os.cpu_count() or 2)
+
+        # Live captions during recording (resident whisper.cpp model, tiny/base)
+        self.live_settings = self.transcription_settings.get('live', {}) or {}
+
+        # Content-addressed result cache (audio samples + engine/model/params)
+        cache_settings = self.transcription_settings.get('cache', {}) or {}
+        self.cache = None
+        if cache_settings.get('enabled', False):
+            self.cache = TranscriptionCache(cache_settings.get('dir', 'recordings/cache'),
+                                            max_entries=int(cache_settings.get('max_entries', 500)))
+        
         # Performance tracking
         self.stats = {
             "amd_success": 0,
             "amd_failed": 0,
             "openai_fallback": 0,
+            "cache_hits": 0,
+            "segments_repaired": 0,
+            "race_wasted_cpu_seconds": 0.0,
+            "batched_files": 0,
             "total_transcriptions": 0
         }
         
         print(f"[{self.agent_name}] 🚀 Hybrid transcription agent initialized")
         print(f"[{self.agent_name}] Primary: whisper-amd, Fallback: OpenAI Whisper")
 
+    def warm_up(self):
+        """
+        Loads what the first transcription would otherwise load on the
+        critical path. Used by the scheduler a few minutes before class.
+        """
+        amd_available = self._verify_whisper_amd()
+        resident = self._resident_whisper()
+        if resident is not None:
+            try:
+                print(f"[{self.agent_name}] 📥 Loading resident whisper.cpp model...")
+                print(f"[{self.agent_name}] ✅ Model resident after {resident.load():.2f}s")
+            except Exception as e:
+                print(f"[{self.agent_name}] ⚠️ Could not load resident whisper.cpp model: {e}")
+        openai = self.engines.get("openai-whisper")
+        if self.engines.is_available("openai-whisper") and not openai.is_loaded():
+            try:
+                print(f"[{self.agent_name}] 📥 Preloading OpenAI Whisper model...")
+                openai.load()
+            except Exception as e:
+                print(f"[{self.agent_name}] ⚠️ Could not preload OpenAI Whisper: {e}")
+        return {"whisper_amd": amd_available, "resident_whisper_cpp": bool(resident and resident.loaded),
+                "openai_whisper": openai.is_loaded()}
+
     def _verify_whisper_amd(self):
-        """Verify whisper-amd availability"""
-        try:
-            result = subprocess.run([self.whisper_amd_path, "--help"], 
-                                  capture_output=True, text=True, timeout=5)
-            return result.returncode == 0
-        except:
-            return False
+        """Verify whisper-amd availability (resident backend or CLI binary)"""
+        return self._resident_whisper() is not None or self.engines.is_available("whisper-amd")
+
+    def _resident_whisper(self):
+        """Shared in-process whisper.cpp model, or None when the CLI should be used"""
+        if self.whisper_cpp_backend == "cli" or not self.engines.is_available("whisper-amd-resident"):
+            return None
+        return self.engines.get("whisper-amd-resident").backend(self.amd_config)
 
     def _get_model_path(self, model_name):
         """Get full path to whisper-amd model"""
         model_path = self.models_dir / model_name
         return str(model_path) if model_path.exists() else None
 
-    def _find_generated_files(self, base_path, audio_file_name):
-        """Smart file detection for whisper-amd output"""
-        possible_names = [
-            base_path,
-            audio_file_name.replace('.wav', ''),
-            Path(audio_file_name).stem,
-        ]
-        
-        search_dirs = [
-            self.transcripts_dir,
-            Path.cwd(),
-            Path("recordings/raw").parent,
-        ]
-        
-        found_files = {"txt": None, "srt": None}
-        
-        for search_dir in search_dirs:
-            if not search_dir.exists():
-                continue
-                
-            for name in possible_names:
-                # Check .txt files
-                txt_patterns = [
-                    search_dir / f"{name}.txt",
-                    search_dir / f"{Path(name).name}.txt",
-                    search_dir / f"{Path(name).stem}.txt",
-                ]
-                
-                for txt_file in txt_patterns:
-                    if txt_file.exists() and found_files["txt"] is None:
-                        found_files["txt"] = str(txt_file)
-                        break
-                
-                # Check .srt files
-                srt_patterns = [
-                    search_dir / f"{name}.srt",
-                    search_dir / f"{Path(name).name}.srt",
-                    search_dir / f"{Path(name).stem}.srt",
-                ]
-                
-                for srt_file in srt_patterns:
-                    if srt_file.exists() and found_files["srt"] is None:
-                        found_files["srt"] = str(srt_file)
-                        break
-        
-        return found_files
-
     def _transcribe_with_whisper_amd(self, audio_path, language="es", custom_prompt=None, output_name=None):
         """
         Primary transcription method using optimized whisper-amd
@@ -155,104 +355,100 @@ class TranscriptionAgent(AgentFramework):
         
         print(f"[{self.agent_name}] 🚀 whisper-amd: {audio_path.name} ({audio_path.stat().st_size // 1024}KB)")
         
-        # Build optimized command with validated parameters
-        command = [
-            self.whisper_amd_path,
-            "-m", model_path,
-            "-t", str(self.amd_config["threads"]),
-            "-p", str(self.amd_config["processors"]),
-            "-l", language,
-            "--prompt", custom_prompt,
-            "--temperature", str(self.amd_config["temperature"]),
-            "--best-of", str(self.amd_config["best_of"]),
-            "--beam-size", str(self.amd_config["beam_size"]),
-            "--no-speech-thold", str(self.amd_config["no_speech_threshold"]),
-            "--suppress-nst",
-            "--output-txt",
-            "--output-srt",
-            "--output-file", str(output_base),
-            str(audio_path)
-        ]
-        
+        if self._resident_whisper() is not None:
+            result = self._run_resident_whisper(audio_path, language, custom_prompt, output_name)
+            if result["success"] or self.whisper_cpp_backend == "resident":
+                return result
+            print(f"[{self.agent_name}] ⚠️ Resident whisper.cpp failed ({result['error']}) - using CLI")
+
+        return self._run_whisper_amd(audio_path, language, custom_prompt, output_name, output_base)
+
+    def _run_resident_whisper(self, audio_path, language, custom_prompt, output_name):
+        """Transcribes with the in-process model: PCM goes straight in, no process or model reload"""
         try:
-            start_time = time.time()
-            result = subprocess.run(command, capture_output=True, text=True, timeout=300)
-            processing_time = time.time() - start_time
-            
-            if result.returncode == 0:
-                # Look for generated files
-                found_files = self._find_generated_files(str(output_base), audio_path.name)
-                
-                if found_files["txt"]:
-                    with open(found_files["txt"], 'r', encoding='utf-8') as f:
-                        transcribed_text = f.read().strip()
-                    
-                    # Check for music classification (main reason for fallback)
-                    is_music_classification = any(music_term in transcribed_text.lower() 
-                                                for music_term in ["[música]", "[music]", "música", "music"])
-                    
-                    # Move files to correct location if needed
-                    final_txt = self.transcripts_dir / f"{output_name}.txt"
-                    final_srt = self.transcripts_dir / f"{output_name}.srt"
-                    
-                    if Path(found_files["txt"]) != final_txt:
-                        import shutil
-                        shutil.move(found_files["txt"], final_txt)
-                        found_files["txt"] = str(final_txt)
-                    
-                    if found_files["srt"] and Path(found_files["srt"]) != final_srt:
-                        import shutil
-                        shutil.move(found_files["srt"], final_srt)
-                        found_files["srt"] = str(final_srt)
-                    
-                    word_count = len(transcribed_text.split()) if transcribed_text else 0
-                    
-                    print(f"[{self.agent_name}] ✅ whisper-amd success: {processing_time:.2f}s, {word_count} words")
-                    if is_music_classification:
-                        print(f"[{self.agent_name}] ⚠️ Music classification detected - will try fallback")
-                    
-                    return {
-                        "success": True,
-                        "engine": "whisper-amd",
-                        "text": transcribed_text,
-                        "word_count": word_count,
-                        "processing_time": processing_time,
-                        "txt_file": found_files["txt"],
-                        "srt_file": found_files["srt"],
-                        "language": language,
-                        "audio_file": str(audio_path),
-                        "is_music_classification": is_music_classification,
-                        "quality_score": "good" if word_count > 0 and not is_music_classification else "poor"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "No output files generated",
-                        "engine": "whisper-amd",
-                        "return_code": result.returncode,
-                        "stderr": result.stderr[:200] if result.stderr else ""
-                    }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Return code {result.returncode}",
-                    "engine": "whisper-amd",
-                    "stderr": result.stderr[:200] if result.stderr else "",
-                    "stdout": result.stdout[:200] if result.stdout else ""
-                }
-                
-        except subprocess.TimeoutExpired:
-            return {
-                "success": False,
-                "error": "Timeout (5 minutes)",
-                "engine": "whisper-amd"
-            }
+            engine_result = self.engines.transcribe("whisper-amd-resident", audio_path, None, language=language,
+                                                    prompt=custom_prompt, **self.amd_config)
+        except EngineError as e:
+            return {"success": False, "error": str(e), "engine": "whisper-amd"}
+
+        segments = engine_result["segments"]
+        processing_time = engine_result["processing_time"]
+        transcribed_text = engine_result["text"]
+        files = write_transcripts(segments, self.transcripts_dir / output_name, self.amd_config["output_formats"])
+
+        is_music_classification = any(music_term in transcribed_text.lower()
+                                      for music_term in ["[música]", "[music]", "música", "music"])
+        word_count = len(transcribed_text.split()) if transcribed_text else 0
+        print(f"[{self.agent_name}] ✅ whisper-amd (resident) success: {processing_time:.2f}s, {word_count} words")
+        if is_music_classification:
+            print(f"[{self.agent_name}] ⚠️ Music classification detected - will try fallback")
+
+        return {
+            "success": True,
+            "engine": "whisper-amd",
+            "backend": "resident",
+            "text": transcribed_text,
+            "word_count": word_count,
+            "processing_time": processing_time,
+            "txt_file": files.get("txt_file"),
+            "srt_file": files.get("srt_file"),
+            "vtt_file": files.get("vtt_file"),
+            "segments": segments,
+            "language": language,
+            "audio_file": str(audio_path),
+            "is_music_classification": is_music_classification,
+            "quality_score": "good" if word_count > 0 and not is_music_classification else "poor"
+        }
+
+    def _run_whisper_amd(self, audio_path, language, custom_prompt, output_name, output_base):
+        """Runs the whisper-amd binary through the registry; TXT/SRT/VTT are written from its JSON output"""
+        try:
+            engine_result = self.engines.transcribe("whisper-amd", audio_path, output_base, language=language,
+                                                    prompt=custom_prompt, **self.amd_config)
+        except EngineError as e:
+            return {"success": False, "error": str(e), "engine": "whisper-amd"}
         except Exception as e:
-            return {
-                "success": False,
-                "error": f"Unexpected error: {str(e)}",
-                "engine": "whisper-amd"
-            }
+            return {"success": False, "error": f"Unexpected error: {str(e)}", "engine": "whisper-amd"}
+
+        processing_time = engine_result["processing_time"]
+        transcribed_text = engine_result["text"]
+        
+        # Check for music classification (main reason for fallback)
+        is_music_classification = any(music_term in transcribed_text.lower() 
+                                    for music_term in ["[música]", "[music]", "música", "music"])
+        
+        word_count = len(transcribed_text.split()) if transcribed_text else 0
+        
+        print(f"[{self.agent_name}] ✅ whisper-amd success: {processing_time:.2f}s, {word_count} words")
+        if is_music_classification:
+            print(f"[{self.agent_name}] ⚠️ Music classification detected - will try fallback")
+        
+        return {
+            "success": True,
+            "engine": "whisper-amd",
+            "text": transcribed_text,
+            "word_count": word_count,
+            "processing_time": processing_time,
+            "txt_file": engine_result.get("txt_file"),
+            "srt_file": engine_result.get("srt_file"),
+            "vtt_file": engine_result.get("vtt_file"),
+            "segments": engine_result["segments"],
+            "language": engine_result.get("language") or language,
+            "audio_file": str(audio_path),
+            "is_music_classification": is_music_classification,
+            "quality_score": "good" if word_count > 0 and not is_music_classification else "poor"
+        }
+
+    def _openai_request(self, language, custom_prompt):
+        """Language name and default context prompt for OpenAI Whisper"""
+        if custom_prompt is None:
+            if language == "es":
+                custom_prompt = "Esta es una persona hablando en español sobre ciberseguridad"
+            else:
+                custom_prompt = "This is a person speaking about cybersecurity"
+        # Use Spanish language name for OpenAI Whisper
+        openai_language = "Spanish" if language == "es" else language
+        return openai_language, custom_prompt
 
     def _transcribe_with_openai_whisper(self, audio_path, language="es", custom_prompt=None, output_name=None):
         """
@@ -260,55 +456,35 @@ class TranscriptionAgent(AgentFramework):
         
         More reliable but slower than whisper-amd
         """
-        if not self.whisper_openai:
+        if not self.engines.is_available("openai-whisper"):
             return {
                 "success": False,
                 "error": "OpenAI Whisper not available",
                 "engine": "openai-whisper"
             }
         
-        # Load model if needed
-        if self.openai_model is None:
-            try:
-                print(f"[{self.agent_name}] 📥 Loading OpenAI Whisper model...")
-                self.openai_model = self.whisper_openai.load_model("base")
-            except Exception as e:
-                return {
-                    "success": False,
-                    "error": f"Failed to load OpenAI model: {e}",
-                    "engine": "openai-whisper"
-                }
+        if not self.engines.get("openai-whisper").is_loaded():
+            print(f"[{self.agent_name}] 📥 Loading OpenAI Whisper model...")
         
         if output_name is None:
             output_name = audio_path.stem
             
-        if custom_prompt is None:
-            if language == "es":
-                custom_prompt = "Esta es una persona hablando en español sobre ciberseguridad"
-            else:
-                custom_prompt = "This is a person speaking about cybersecurity"
+        openai_language, custom_prompt = self._openai_request(language, custom_prompt)
         
         print(f"[{self.agent_name}] 🔄 OpenAI Whisper fallback: {audio_path.name}")
         
         try:
-            start_time = time.time()
-            
-            # Use Spanish language name for OpenAI Whisper
-            openai_language = "Spanish" if language == "es" else language
-            
-            result = self.openai_model.transcribe(
-                str(audio_path),
+            result = self.engines.transcribe(
+                "openai-whisper",
+                audio_path,
+                None,
                 language=openai_language,
-                initial_prompt=custom_prompt,
-                temperature=0.0,
-                best_of=5,
-                beam_size=5,
-                word_timestamps=True,
-                verbose=False
+                prompt=custom_prompt,
+                **self.openai_options
             )
             
-            processing_time = time.time() - start_time
-            transcribed_text = result["text"].strip()
+            processing_time = result["processing_time"]
+            transcribed_text = result["text"]
             detected_language = result.get("language", language)
             
             # Save to file
@@ -368,7 +544,8 @@ class TranscriptionAgent(AgentFramework):
             }
 
     def transcribe_audio_file(self, audio_path, language="es", custom_prompt=None, 
-                            output_name=None, force_engine=None, enable_fallback=True):
+                            output_name=None, force_engine=None, enable_fallback=True,
+                            recording_metadata=None, strategy=None):
         """
         Hybrid transcription with intelligent fallback strategy
         
@@ -379,6 +556,9 @@ class TranscriptionAgent(AgentFramework):
             output_name: Custom output filename base
             force_engine: Force specific engine ("amd" or "openai")
             enable_fallback: Enable automatic fallback (default: True)
+            recording_metadata: RecordingAgent metadata; a "dead" signal skips the engines
+            strategy: "sequential" (whisper-amd, then fallback) or "race" (both at
+                      once, first acceptable result wins); default from config
         
         Returns:
             dict: Transcription results with success status and metadata
@@ -391,17 +571,224 @@ class TranscriptionAgent(AgentFramework):
                 "audio_file": str(audio_path)
             }
         
+        # Nothing to transcribe on a dead mic - don't spend engine time on it
+        signal = (recording_metadata or {}).get("signal") or {}
+        if signal.get("quality") == "dead":
+            print(f"[{self.agent_name}] ❌ Recording has no usable signal - skipping transcription")
+            return {
+                "success": False,
+                "error": "Recording has no usable signal",
+                "signal": signal,
+                "audio_file": str(audio_path)
+            }
+
         self.stats["total_transcriptions"] += 1
         
         print(f"[{self.agent_name}] 🎯 Starting hybrid transcription...")
         print(f"[{self.agent_name}] Audio: {audio_path.name} ({audio_path.stat().st_size // 1024}KB)")
         print(f"[{self.agent_name}] Language: {language}")
         print(f"[{self.agent_name}] Fallback enabled: {enable_fallback}")
-        
+
+        if output_name is None:
+            output_name = audio_path.stem
+        if strategy is None:
+            strategy = "race" if self.race_enabled else "sequential"
+
+        if self.cache is not None:
+            try:
+                key = self._cache_key(audio_path, language, custom_prompt, force_engine, enable_fallback, strategy)
+            except Exception as e:
+                print(f"[{self.agent_name}] ⚠️ Cache lookup failed ({e}) - transcribing without cache")
+                key = None
+            if key is not None:
+                # Concurrent requests for the same audio wait here for one computation
+                with self.cache.single_flight(key):
+                    cached = self.cache.get(key, self.transcripts_dir, output_name)
+                    if cached is not None:
+                        self.stats["cache_hits"] += 1
+                        print(f"[{self.agent_name}] ⚡ Cache hit ({cached.get('engine')}) - "
+                              f"{cached.get('word_count', 0)} words restored")
+                        cached["cached"] = True
+                        cached["audio_file"] = str(audio_path)
+                        return cached
+                    result = self._transcribe_uncached(audio_path, language, custom_prompt, output_name,
+                                                       force_engine, enable_fallback, strategy)
+                    if result.get("success"):
+                        self.cache.put(key, result)
+                    return result
+
+        return self._transcribe_uncached(audio_path, language, custom_prompt, output_name,
+                                         force_engine, enable_fallback, strategy)
+
+    def _transcribe_uncached(self, audio_path, language, custom_prompt, output_name, force_engine, enable_fallback,
+                             strategy="sequential"):
+        """Preprocessing + engines; the part of transcribe_audio_file the cache can skip"""
+        eta = self._estimate_eta(audio_path, force_engine)
+        # Preprocessing: denoise, then send only speech to the engines.
+        # Timestamps are mapped back to the original recording afterwards.
+        engine_audio, timeline, prep_stats, tmp_dir = audio_path, None, {}, None
+        if self.noise_reduction_enabled or self.vad_enabled:
+            tmp_dir = Path(tempfile.mkdtemp(prefix="mcp_prep_"))
+
+        try:
+            if self.noise_reduction_enabled:
+                engine_audio, prep_stats["noise_reduction"] = self._reduce_noise(engine_audio, tmp_dir)
+            if self.vad_enabled:
+                engine_audio, timeline, prep_stats["vad"] = self._compact_silence(engine_audio, tmp_dir)
+            if self._should_parallelize(engine_audio):
+                result = self._run_engines_parallel(engine_audio, language, custom_prompt, output_name,
+                                                    force_engine, enable_fallback)
+            elif strategy == "race" and self._can_race(force_engine, enable_fallback):
+                result = self._run_engines_race(engine_audio, language, custom_prompt, output_name)
+            else:
+                result = self._run_engines(engine_audio, language, custom_prompt, output_name,
+                                           force_engine, enable_fallback)
+        finally:
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if timeline is not None and result.get("success"):
+            self._restore_timeline(result, timeline)
+        for key, stats in prep_stats.items():
+            if stats is not None:
+                result[key] = stats
+        if eta is not None:
+            result["eta"] = eta
+        result["audio_file"] = str(audio_path)
+        return result
+
+    def _estimate_eta(self, audio_path, force_engine):
+        """
+        Predicted processing time of the first engine in the chain, from the
+        persistent performance history (or the default RTF without history).
+        """
+        audio_seconds = self.engines.audio_seconds(audio_path)
+        if force_engine == "openai":
+            engine, options = "openai-whisper", self.openai_options
+        else:
+            engine = "whisper-amd-resident" if self._resident_whisper() is not None else "whisper-amd"
+            options = self.amd_config
+        eta = self.engines.estimate(engine, audio_seconds, **options)
+        if eta is None:
+            return None
+        if self.parallel_enabled and self.parallel_workers > 1 and audio_seconds >= self.parallel_min_seconds:
+            eta = dict(eta, seconds=round(eta["seconds"] / self.parallel_workers, 1))
+        basis = f"RTF {eta['rtf']} from {eta['samples']} runs" if eta["source"] == "history" \
+            else f"default RTF {eta['rtf']}"
+        print(f"[{self.agent_name}] ⏳ ETA ~{eta['seconds']:.0f}s for {audio_seconds:.0f}s of audio "
+              f"({engine}, {basis})")
+        return dict(eta, engine=engine, audio_seconds=round(audio_seconds, 2))
+
+    def _cache_key(self, audio_path, language, custom_prompt, force_engine, enable_fallback, strategy="sequential"):
+        """
+        Cache key for a request. Besides the audio samples it covers every
+        engine that may run and the files behind it, so replacing a model or
+        binary (or changing a setting) yields a different key.
+        """
+        engines = {}
+        if force_engine != "openai":
+            engines["whisper-amd"] = {
+                "model": self.amd_config["model"],
+                "model_file": file_fingerprint(self._get_model_path(self.amd_config["model"])),
+                "binary": self.engines.get("whisper-amd").fingerprint(),
+                "backend": "resident" if self._resident_whisper() is not None else "cli",
+                "config": self.amd_config
+            }
+        if force_engine != "amd" and (enable_fallback or force_engine == "openai"):
+            openai_engine = self.engines.get("openai-whisper")
+            engines["openai-whisper"] = {
+                "model": openai_engine.fingerprint(),
+                # Thread count does not change the transcript
+                "options": {k: v for k, v in self.openai_options.items() if k != "threads"},
+                "streaming": WINDOW_SECONDS if openai_engine.streaming else None
+            }
+        params = {
+            "language": language,
+            "prompt": custom_prompt,
+            "engines": engines,
+            "strategy": strategy,
+            "vad": self.vad_params if self.vad_enabled else None,
+            "noise_reduction": self.noise_reduction_params if self.noise_reduction_enabled else None,
+            "segment_fallback": [self.segment_fallback_max_fraction, self.segment_fallback_padding,
+                                 self.segment_fallback_merge_gap, self.segment_flag_params]
+            if self.segment_fallback_enabled else None,
+            "parallel": [self.parallel_chunk_seconds, self.parallel_overlap_seconds,
+                         self.parallel_min_seconds] if self.parallel_enabled else None,
+            "batch": self.batch_chunk_seconds if strategy == "batch" else None
+        }
+        return self.cache.key(self.cache.audio_hash(audio_path), params)
+
+    def _reduce_noise(self, audio_path, tmp_dir):
+        """
+        Spectral gating over the whole file, faster than real time.
+        Returns (engine_audio, stats); keeps the original audio if it fails.
+        """
+        denoised_path = tmp_dir / "denoised" / f"{audio_path.stem}.wav"
+        denoised_path.parent.mkdir(exist_ok=True)
+        try:
+            stats = denoise_file(audio_path, denoised_path, **self.noise_reduction_params)
+        except Exception as e:
+            print(f"[{self.agent_name}] ⚠️ Noise reduction failed ({e}) - using original audio")
+            return audio_path, None
+
+        print(f"[{self.agent_name}] 🔉 Noise reduction: {stats['seconds']}s in {stats['processing_time']}s "
+              f"(RTF {stats['real_time_factor']})")
+        return denoised_path, stats
+
+    def _compact_silence(self, audio_path, tmp_dir):
+        """
+        Runs VAD over the recording and writes a speech-only 16 kHz copy.
+        Returns (engine_audio, timeline, stats); keeps `audio_path` when there
+        is little to remove or VAD fails.
+        """
+        compact_path = tmp_dir / "vad" / f"{audio_path.stem}.wav"
+        compact_path.parent.mkdir(exist_ok=True)
+        try:
+            start_time = time.time()
+            timeline, stats = compact_speech(audio_path, compact_path, **self.vad_params)
+            stats["vad_time"] = round(time.time() - start_time, 2)
+        except Exception as e:
+            print(f"[{self.agent_name}] ⚠️ VAD failed ({e}) - transcribing full audio")
+            return audio_path, None, None
+
+        if timeline is None:
+            print(f"[{self.agent_name}] 🔇 VAD: only {stats['removed_ratio']:.0%} non-speech - using full audio")
+            return audio_path, None, stats
+
+        print(f"[{self.agent_name}] 🔇 VAD: {stats['original_seconds']}s -> {stats['compacted_seconds']}s "
+              f"({stats['removed_ratio']:.0%} removed, {stats['speech_regions']} regions, {stats['vad_time']}s)")
+        return compact_path, timeline, stats
+
+    def _restore_timeline(self, result, timeline):
+        """Maps segment and SRT timestamps from the compacted audio back to the recording"""
+        segments = result.get("segments")
+        srt_file = result.get("srt_file")
+        if not segments and srt_file and Path(srt_file).exists():
+            segments = parse_srt(srt_file)
+        if not segments:
+            return
+
+        remapped = timeline.remap_segments(segments)
+        for segment in remapped:
+            if segment.get("words"):
+                segment["words"] = timeline.remap_segments(segment["words"])
+        if srt_file:
+            write_srt(remapped, srt_file)
+        if result.get("vtt_file"):
+            write_vtt(remapped, result["vtt_file"])
+        result["segments"] = remapped
+        result["timeline"] = timeline.to_list()
+
+    def _run_engines(self, audio_path, language, custom_prompt, output_name, force_engine, enable_fallback):
+        """whisper-amd first, OpenAI Whisper fallback"""
         # Strategy 1: Try whisper-amd first (unless forced to OpenAI)
         if force_engine != "openai" and self._verify_whisper_amd():
             amd_result = self._transcribe_with_whisper_amd(audio_path, language, custom_prompt, output_name)
             
+            if amd_result["success"] and self.segment_fallback_enabled and enable_fallback \
+                    and force_engine != "amd":
+                amd_result = self._repair_segments(amd_result, audio_path, language, custom_prompt)
+
             if amd_result["success"]:
                 # Check if result is good quality (not music classification)
                 if not amd_result.get("is_music_classification", False):
@@ -437,13 +824,562 @@ class TranscriptionAgent(AgentFramework):
             "audio_file": str(audio_path)
         }
 
+    def _repair_segments(self, result, audio_path, language, custom_prompt):
+        """
+        Flags every whisper-amd segment and re-decodes only the flagged time
+        ranges with OpenAI Whisper, splicing the new segments back in. Returns
+        the result unchanged (so the whole-file fallback applies) when too
+        much of the recording is bad or the fallback engine is missing.
+        """
+        segments = result.get("segments")
+        if not segments and result.get("srt_file") and Path(result["srt_file"]).exists():
+            segments = parse_srt(result["srt_file"])
+        if not segments:
+            return result
+        for segment in segments:
+            segment["flags"] = segment_flags(segment, **self.segment_flag_params)
+        result["segments"] = segments
+
+        ranges = bad_ranges(segments, merge_gap=self.segment_fallback_merge_gap, **self.segment_flag_params)
+        if not ranges:
+            # "música" in the text but no segment is a music tag: it was spoken
+            result["is_music_classification"] = False
+            result["quality_score"] = "good" if result.get("word_count", 0) > 0 else "poor"
+            return result
+
+        rate, _, frames = audio_info(audio_path)
+        total = frames / float(rate)
+        bad_seconds = sum(end - start for start, end, _ in ranges)
+        if bad_seconds > self.segment_fallback_max_fraction * total or \
+                not self.engines.is_available("openai-whisper"):
+            return result
+
+        print(f"[{self.agent_name}] 🩹 {len(ranges)} bad range(s), {bad_seconds:.1f}s of {total:.1f}s - "
+              f"re-decoding only those with OpenAI Whisper")
+        start_time = time.time()
+        chunks = [{"index": i, "start": max(0.0, start - self.segment_fallback_padding),
+                   "end": min(total, end + self.segment_fallback_padding)}
+                  for i, (start, end, _) in enumerate(ranges)]
+        openai_language, prompt = self._openai_request(language, custom_prompt)
+        replacements, report, unrepaired_music = [], [], False
+        tmp_dir = Path(tempfile.mkdtemp(prefix="mcp_repair_"))
+        try:
+            paths = extract_chunks(audio_path, chunks, tmp_dir)
+            for (start, end, flags), chunk, path in zip(ranges, chunks, paths):
+                entry = {"start": round(start, 3), "end": round(end, 3), "flags": flags}
+                try:
+                    redo = self.engines.transcribe("openai-whisper", path, None, language=openai_language,
+                                                   prompt=prompt, **self.openai_options)
+                except EngineError as e:
+                    entry.update(status="failed", error=str(e))
+                    unrepaired_music = unrepaired_music or "music" in flags
+                    report.append(entry)
+                    continue
+                new_segments = [{"start": round(seg["start"] + chunk["start"], 3),
+                                 "end": round(seg["end"] + chunk["start"], 3),
+                                 "text": seg["text"].strip(), "repaired": True}
+                                for seg in redo.get("segments") or []]
+                replacements.append((start, end, new_segments))
+                entry.update(status="replaced", text=" ".join(seg["text"] for seg in new_segments).strip())
+                report.append(entry)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        segments = splice_segments(segments, replacements)
+        transcribed_text = " ".join(seg["text"] for seg in segments).strip()
+        word_count = len(transcribed_text.split())
+        written = [key for key in ("txt_file", "srt_file", "vtt_file") if result.get(key)]
+        if written:
+            output_base = Path(result[written[0]]).with_suffix("")
+            result.update(write_transcripts(segments, output_base, [key.split("_")[0] for key in written]))
+
+        self.stats["segments_repaired"] += len(replacements)
+        result.update({
+            "text": transcribed_text,
+            "word_count": word_count,
+            "segments": segments,
+            "is_music_classification": unrepaired_music,
+            "quality_score": "good" if word_count > 0 and not unrepaired_music else "poor",
+            "segment_fallback": {
+                "engine": "openai-whisper",
+                "ranges": report,
+                "redecoded_seconds": round(sum(c["end"] - c["start"] for c in chunks), 2),
+                "audio_seconds": round(total, 2),
+                "processing_time": round(time.time() - start_time, 2)
+            }
+        })
+        result["processing_time"] = result.get("processing_time", 0.0) + result["segment_fallback"]["processing_time"]
+        print(f"[{self.agent_name}] 🩹 Repaired {len(replacements)}/{len(ranges)} range(s) "
+              f"({result['segment_fallback']['redecoded_seconds']:.1f}s re-decoded)")
+        return result
+
+    def _can_race(self, force_engine, enable_fallback):
+        return force_engine is None and enable_fallback and self._verify_whisper_amd() \
+            and self.engines.is_available("openai-whisper")
+
+    def _passes_quality(self, result):
+        """What a race result needs to win: a real transcript, not a music tag"""
+        return result.get("success", False) and not result.get("is_music_classification", False) \
+            and result.get("word_count", 0) >= self.race_min_words
+
+    def _run_engines_race(self, audio_path, language, custom_prompt, output_name):
+        """
+        Starts whisper-amd and OpenAI Whisper at the same time, each in its own
+        process (and process group) with half of the CPU budget. The first
+        result that passes the quality checks wins; the other worker is killed
+        with its whole process group right away.
+        """
+        amd_threads = max(1, self.race_cpu_budget // 2)
+        budgets = {"amd": amd_threads, "openai": max(1, self.race_cpu_budget - amd_threads)}
+        print(f"[{self.agent_name}] 🏁 Race: whisper-amd ({budgets['amd']} threads) vs "
+              f"OpenAI Whisper ({budgets['openai']} threads)")
+
+        # spawn: workers must not inherit the capture/segment threads of this process
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        race_dir = Path(tempfile.mkdtemp(prefix="mcp_race_"))
+        start_time = time.time()
+        entrants, outcomes, winner = {}, {}, None
+        try:
+            for engine, threads in budgets.items():
+                out_dir = race_dir / engine
+                out_dir.mkdir()
+                process = context.Process(target=_race_worker, name=f"race-{engine}", daemon=True,
+                                          args=(engine, threads, str(audio_path), str(out_dir), language,
+                                                custom_prompt, output_name, results))
+                process.start()
+                try:
+                    os.setpgid(process.pid, process.pid)
+                except (AttributeError, OSError):
+                    pass  # The worker did it first
+                entrants[engine] = {"process": process, "threads": threads}
+
+            while winner is None and len(outcomes) < len(entrants):
+                try:
+                    engine, result = results.get(timeout=1.0)
+                except queue.Empty:
+                    # A worker that died without reporting (crash, OOM kill) is out of the race
+                    for engine, entrant in entrants.items():
+                        if engine not in outcomes and not entrant["process"].is_alive():
+                            outcomes[engine] = {"success": False,
+                                                "error": f"Worker exited with code {entrant['process'].exitcode}"}
+                            entrant["wall_seconds"] = time.time() - start_time
+                    continue
+                outcomes[engine] = result
+                entrants[engine]["wall_seconds"] = time.time() - start_time
+                if self._passes_quality(result):
+                    winner = engine
+                else:
+                    reason = result.get("error") or ("music" if result.get("is_music_classification") else "too short")
+                    print(f"[{self.agent_name}] ⚠️ Race: {engine} finished without a usable result ({reason})")
+
+            race = {"winner": None, "cpu_budget": self.race_cpu_budget, "entrants": {}}
+            for engine, entrant in entrants.items():
+                process = entrant["process"]
+                if engine in outcomes:
+                    status = "won" if engine == winner else ("lost" if outcomes[engine].get("success") else "failed")
+                    cpu = outcomes[engine].get("cpu_seconds")
+                else:
+                    # Measure before the kill: /proc entries disappear with the processes
+                    status = "cancelled"
+                    cpu = _process_group_cpu(process.pid)
+                    entrant["wall_seconds"] = time.time() - start_time
+                    try:
+                        os.killpg(process.pid, signal.SIGKILL)
+                    except (AttributeError, OSError):
+                        process.kill()
+                process.join(5)
+                race["entrants"][engine] = {"status": status, "threads": entrant["threads"],
+                                            "wall_seconds": round(entrant["wall_seconds"], 2),
+                                            "cpu_seconds": round(cpu, 2) if cpu is not None else None}
+            results.close()
+
+            if winner is None:
+                # Nobody passed: keep what the sequential fallback would have kept
+                for engine in ("openai", "amd"):
+                    if outcomes.get(engine, {}).get("success"):
+                        winner = engine
+                        break
+            if winner is None:
+                self.stats["amd_failed"] += 1
+                return {
+                    "success": False,
+                    "error": "All transcription engines failed",
+                    "amd_error": outcomes.get("amd", {}).get("error", "Not attempted"),
+                    "openai_error": outcomes.get("openai", {}).get("error", "Not attempted"),
+                    "race": race,
+                    "audio_file": str(audio_path)
+                }
+
+            result = outcomes[winner]
+            for key in ("txt_file", "srt_file", "vtt_file"):
+                if result.get(key) and Path(result[key]).exists():
+                    target = self.transcripts_dir / f"{output_name}{Path(result[key]).suffix}"
+                    shutil.move(result[key], target)
+                    result[key] = str(target)
+        finally:
+            for entrant in entrants.values():
+                if entrant["process"].is_alive():
+                    entrant["process"].kill()
+            shutil.rmtree(race_dir, ignore_errors=True)
+
+        losers = [e for engine, e in race["entrants"].items() if engine != winner]
+        race["winner"] = result.get("engine")
+        race["wasted_cpu_seconds"] = round(sum(e["cpu_seconds"] or 0.0 for e in losers), 2)
+        race["wasted_wall_seconds"] = round(sum(e["wall_seconds"] for e in losers), 2)
+        race["total_seconds"] = round(time.time() - start_time, 2)
+        result["race"] = race
+        self.stats["race_wasted_cpu_seconds"] += race["wasted_cpu_seconds"]
+        self.stats["amd_success" if winner == "amd" else "openai_fallback"] += 1
+        print(f"[{self.agent_name}] 🏆 Race won by {race['winner']} in {race['total_seconds']:.1f}s "
+              f"(wasted {race['wasted_cpu_seconds']:.1f} CPU-s on the other engine)")
+        return result
+
+    def _should_parallelize(self, audio_path):
+        if not self.parallel_enabled or self.parallel_workers < 2:
+            return False
+        try:
+            rate, _, frames = audio_info(audio_path)
+        except Exception:
+            return False
+        return frames / float(rate) >= self.parallel_min_seconds
+
+    def _run_engines_parallel(self, audio_path, language, custom_prompt, output_name, force_engine, enable_fallback):
+        """
+        Splits the audio at pauses, runs the engine chain on every chunk in a
+        process pool and merges the chunk transcripts into one TXT/SRT.
+        """
+        chunks = plan_chunks(audio_path, chunk_seconds=self.parallel_chunk_seconds,
+                             overlap_seconds=self.parallel_overlap_seconds,
+                             search_seconds=self.parallel_search_seconds, **self.vad_params)
+        if len(chunks) < 2:
+            return self._run_engines(audio_path, language, custom_prompt, output_name, force_engine, enable_fallback)
+
+        workers = min(self.parallel_workers, len(chunks))
+        print(f"[{self.agent_name}] 🧩 Parallel transcription: {len(chunks)} chunks, "
+              f"{workers} workers x {self.parallel_threads_per_worker} threads")
+        chunk_dir = Path(tempfile.mkdtemp(prefix="mcp_chunks_"))
+        start_time = time.time()
+        try:
+            paths = extract_chunks(audio_path, chunks, chunk_dir)
+            results = {}
+            # spawn: workers must not inherit the capture/segment threads of this process
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_chunk_worker,
+                                     initargs=(self.parallel_threads_per_worker,)) as pool:
+                futures = {pool.submit(_transcribe_chunk, str(path), str(chunk_dir), language, custom_prompt,
+                                       force_engine, enable_fallback): chunk["index"]
+                           for chunk, path in zip(chunks, paths)}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        results[index] = {"success": False, "error": f"Worker error: {e}", "segments": []}
+                    status = "✅" if results[index]["success"] else "❌"
+                    print(f"[{self.agent_name}] {status} Chunk {index + 1}/{len(chunks)} done")
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+        processing_time = time.time() - start_time
+
+        succeeded = [chunk for chunk in chunks if results[chunk["index"]]["success"]]
+        if not succeeded:
+            return {
+                "success": False,
+                "error": "No chunk was transcribed successfully",
+                "chunk_errors": [results[c["index"]].get("error") for c in chunks],
+                "audio_file": str(audio_path)
+            }
+
+        segments = merge_chunk_segments([(c, results[c["index"]]["segments"]) for c in succeeded])
+        transcribed_text = " ".join(segment["text"] for segment in segments)
+        txt_file = self.transcripts_dir / f"{output_name}.txt"
+        srt_file = self.transcripts_dir / f"{output_name}.srt"
+        with open(txt_file, 'w', encoding='utf-8') as f:
+            f.write(transcribed_text)
+        write_srt(segments, srt_file)
+
+        engines = sorted({results[c["index"]]["engine"] for c in succeeded})
+        word_count = len(transcribed_text.split())
+        is_music = any(results[c["index"]]["is_music_classification"] for c in succeeded)
+        failed = len(chunks) - len(succeeded)
+        print(f"[{self.agent_name}] 🧵 Merged {len(succeeded)} chunks ({failed} failed): "
+              f"{word_count} words in {processing_time:.1f}s")
+        if failed == 0:
+            self.stats["amd_success" if engines == ["whisper-amd"] else "openai_fallback"] += 1
+
+        return {
+            "success": True,
+            "engine": "+".join(engines),
+            "text": transcribed_text,
+            "word_count": word_count,
+            "processing_time": processing_time,
+            "txt_file": str(txt_file),
+            "srt_file": str(srt_file),
+            "language": results[succeeded[0]["index"]].get("language") or language,
+            "segments": segments,
+            "chunk_count": len(chunks),
+            "failed_chunks": failed,
+            "is_music_classification": is_music,
+            "quality_score": "good" if word_count > 0 and not is_music and not failed else "partial"
+        }
+
+    def transcribe_batch(self, audio_paths, language="es", custom_prompt=None):
+        """
+        Transcribes a backlog of recordings with OpenAI Whisper in batched
+        decoding: the 30 s windows of every file (long ones cut at pauses
+        into independent chunks) go through the encoder and decoder
+        together. Cached files are restored instead of decoded.
+
+        Returns one result per path, in order, shaped like transcribe_audio_file's.
+        """
+        audio_paths = [Path(p) for p in audio_paths]
+        results = [None] * len(audio_paths)
+        keys = {}  # index -> cache key
+        for i, audio_path in enumerate(audio_paths):
+            if not audio_path.exists():
+                results[i] = {
+                    "success": False,
+                    "error": f"Audio file not found: {audio_path}",
+                    "audio_file": str(audio_path)
+                }
+                continue
+            self.stats["total_transcriptions"] += 1
+            if self.cache is not None:
+                try:
+                    keys[i] = self._cache_key(audio_path, language, custom_prompt, "openai", True, "batch")
+                except Exception as e:
+                    print(f"[{self.agent_name}] ⚠️ Cache lookup failed ({e}) - transcribing without cache")
+
+        # Same single-flight slots as transcribe_audio_file, taken in key order so
+        # two overlapping batches cannot deadlock; the cache is read under them
+        with contextlib.ExitStack() as flights:
+            for key in sorted(set(keys.values())):
+                flights.enter_context(self.cache.single_flight(key))
+
+            pending, first_miss = [], {}  # first_miss: key -> index decoded for it
+            for i, audio_path in enumerate(audio_paths):
+                if results[i] is not None:
+                    continue
+                key = keys.get(i)
+                if key is not None:
+                    if key in first_miss:
+                        continue  # Same audio twice in the batch: decoded once
+                    cached = self.cache.get(key, self.transcripts_dir, audio_path.stem)
+                    if cached is not None:
+                        self.stats["cache_hits"] += 1
+                        cached["cached"] = True
+                        cached["audio_file"] = str(audio_path)
+                        results[i] = cached
+                        continue
+                    first_miss[key] = i
+                pending.append(i)
+
+            if pending:
+                batch_results = self._run_openai_batch([audio_paths[i] for i in pending], language, custom_prompt)
+                for i, result in zip(pending, batch_results):
+                    if keys.get(i) is not None and result.get("success"):
+                        self.cache.put(keys[i], result)
+                    results[i] = result
+
+            for i, key in keys.items():
+                if results[i] is None:
+                    restored = self.cache.get(key, self.transcripts_dir, audio_paths[i].stem)
+                    results[i] = restored if restored is not None else dict(results[first_miss[key]])
+                    results[i]["audio_file"] = str(audio_paths[i])
+        return results
+
+    def _run_openai_batch(self, audio_paths, language, custom_prompt):
+        """Preprocessing per file, one batched decode for all of them, then TXT/SRT per file"""
+        if not self.engines.is_available("openai-whisper"):
+            return [{"success": False, "error": "OpenAI Whisper not available", "engine": "openai-whisper",
+                     "audio_file": str(p)} for p in audio_paths]
+
+        tmp_dir = Path(tempfile.mkdtemp(prefix="mcp_batch_"))
+        try:
+            prepared, sources, audio_seconds = [], [], 0.0
+            for i, audio_path in enumerate(audio_paths):
+                engine_audio, timeline, prep_stats = audio_path, None, {}
+                file_dir = tmp_dir / str(i)
+                file_dir.mkdir()
+                if self.noise_reduction_enabled:
+                    engine_audio, prep_stats["noise_reduction"] = self._reduce_noise(engine_audio, file_dir)
+                if self.vad_enabled:
+                    engine_audio, timeline, prep_stats["vad"] = self._compact_silence(engine_audio, file_dir)
+                chunks = plan_chunks(engine_audio, chunk_seconds=self.batch_chunk_seconds,
+                                     overlap_seconds=self.parallel_overlap_seconds,
+                                     search_seconds=self.parallel_search_seconds, **self.vad_params)
+                prepared.append((timeline, prep_stats, chunks))
+                sources.extend(((i, c["index"]), str(engine_audio), c["start"], c["end"]) for c in chunks)
+                audio_seconds += chunks[-1]["end"] if chunks else 0.0
+
+            print(f"[{self.agent_name}] 📦 Batched OpenAI Whisper: {len(audio_paths)} files, "
+                  f"{len(sources)} streams, batch size {self.batch_size}")
+            openai_language, prompt = self._openai_request(language, custom_prompt)
+            start_time = time.time()
+            try:
+                decoded = self.engines.transcribe_batch("openai-whisper", sources, language=openai_language,
+                                                        prompt=prompt, batch_size=self.batch_size,
+                                                        **self.openai_options)
+            except EngineError as e:
+                print(f"[{self.agent_name}] ⚠️ Batched decoding failed ({e}) - transcribing one by one")
+                decoded = None
+            processing_time = time.time() - start_time
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if decoded is None:
+            return [self._transcribe_uncached(p, language, custom_prompt, p.stem, None, True) for p in audio_paths]
+
+        print(f"[{self.agent_name}] ✅ Batch done: {audio_seconds:.0f}s of audio in {processing_time:.1f}s "
+              f"(RTF {processing_time / max(audio_seconds, 1e-6):.2f})")
+        batch_stats = next(iter(decoded.values()), {}).get("batch_stats", {})
+        results = []
+        for i, audio_path in enumerate(audio_paths):
+            timeline, prep_stats, chunks = prepared[i]
+            segments = merge_chunk_segments([(c, decoded[(i, c["index"])]["segments"]) for c in chunks])
+            transcribed_text = " ".join(segment["text"] for segment in segments)
+            txt_file = self.transcripts_dir / f"{audio_path.stem}.txt"
+            srt_file = self.transcripts_dir / f"{audio_path.stem}.srt"
+            with open(txt_file, 'w', encoding='utf-8') as f:
+                f.write(transcribed_text)
+            write_srt(segments, srt_file)
+
+            word_count = len(transcribed_text.split())
+            result = {
+                "success": True,
+                "engine": "openai-whisper",
+                "text": transcribed_text,
+                "word_count": word_count,
+                "processing_time": processing_time,  # Shared by the whole batch
+                "txt_file": str(txt_file),
+                "srt_file": str(srt_file),
+                "language": decoded[(i, chunks[0]["index"])].get("language"),
+                "segments": segments,
+                "is_music_classification": False,
+                "quality_score": "excellent" if word_count > 0 else "poor",
+                "batch": {
+                    "files": len(audio_paths),
+                    "streams": len(sources),
+                    "chunk_count": len(chunks),
+                    "batch_size": self.batch_size,
+                    "audio_seconds": round(audio_seconds, 2),
+                    **batch_stats
+                }
+            }
+            if timeline is not None:
+                self._restore_timeline(result, timeline)
+            for key, stats in prep_stats.items():
+                if stats is not None:
+                    result[key] = stats
+            result["audio_file"] = str(audio_path)
+            self.stats["batched_files"] += 1
+            results.append(result)
+        return results
+
+    def start_live_transcriber(self, sample_rate, channels=1, language="es", on_update=None, output_name=None):
+        """
+        Starts a LiveTranscriber on the resident whisper.cpp model named in
+        transcription_settings.live (default "tiny", the "tiempo_real" config).
+        Feed it with RecordingAgent.add_chunk_listener(live.feed); returns None
+        when no resident backend is available.
+        """
+        model_name = self.live_settings.get('model', 'tiny')
+        model_config = self.transcription_settings.get('model_configs', {}).get(model_name, {})
+        backend = get_resident_whisper(self._get_model_path(f"ggml-{model_name}.bin"),
+                                       n_threads=int(model_config.get('threads', self.amd_config["threads"])),
+                                       temperature=0.0)
+        if backend is None:
+            print(f"[{self.agent_name}] ⚠️ Live transcription needs pywhispercpp and ggml-{model_name}.bin - disabled")
+            return None
+        backend.load()
+
+        transcript_path = self.transcripts_dir / f"{output_name}_live.txt" if output_name else None
+        print(f"[{self.agent_name}] 📡 Live transcription on '{model_name}' "
+              f"(window {self.live_settings.get('window_seconds', 15)}s, step {self.live_settings.get('step_seconds', 2)}s)")
+        return LiveTranscriber(
+            backend,
+            sample_rate=sample_rate,
+            channels=channels,
+            language=language,
+            initial_prompt="Esta es una persona hablando en español sobre ciberseguridad" if language == "es" else None,
+            window_seconds=float(self.live_settings.get('window_seconds', 15)),
+            step_seconds=float(self.live_settings.get('step_seconds', 2)),
+            on_update=on_update,
+            transcript_path=transcript_path
+        )
+
+    def start_segment_transcriber(self, output_name, **transcribe_kwargs):
+        """Starts a SegmentTranscriber; extra kwargs go to transcribe_audio_file"""
+        return SegmentTranscriber(self, output_name, **transcribe_kwargs)
+
+    def stitch_segment_results(self, segment_results, output_name):
+        """
+        Merges per-segment transcription results into one TXT/SRT pair,
+        shifting every timestamp by the segment's offset in the recording.
+
+        Args:
+            segment_results: list of (segment_info, result) tuples
+            output_name: Base name for the stitched files
+        """
+        segment_results = sorted(segment_results, key=lambda item: item[0]["index"])
+        succeeded = [(seg, res) for seg, res in segment_results if res.get("success")]
+        if not succeeded:
+            return {
+                "success": False,
+                "error": "No segment was transcribed successfully",
+                "segment_errors": [res.get("error") for _, res in segment_results]
+            }
+
+        texts, segments, engines = [], [], []
+        for seg, res in succeeded:
+            texts.append(res.get("text", "").strip())
+            engines.append(res.get("engine", "unknown"))
+            parts = res.get("segments")
+            if not parts and res.get("srt_file") and Path(res["srt_file"]).exists():
+                parts = parse_srt(res["srt_file"])
+            for part in parts or []:
+                segments.append({
+                    "start": round(part.get("start", 0.0) + seg["offset_seconds"], 3),
+                    "end": round(part.get("end", 0.0) + seg["offset_seconds"], 3),
+                    "text": part.get("text", "").strip()
+                })
+
+        transcribed_text = " ".join(t for t in texts if t)
+        txt_file = self.transcripts_dir / f"{output_name}.txt"
+        srt_file = self.transcripts_dir / f"{output_name}.srt"
+        with open(txt_file, 'w', encoding='utf-8') as f:
+            f.write(transcribed_text)
+        write_srt(segments, srt_file)
+
+        word_count = len(transcribed_text.split())
+        is_music = any(res.get("is_music_classification") for _, res in succeeded)
+        failed = len(segment_results) - len(succeeded)
+        print(f"[{self.agent_name}] 🧵 Stitched {len(succeeded)} segments ({failed} failed), {word_count} words")
+
+        return {
+            "success": True,
+            "engine": "+".join(sorted(set(engines))),
+            "text": transcribed_text,
+            "word_count": word_count,
+            "processing_time": sum(res.get("processing_time", 0) for _, res in succeeded),
+            "txt_file": str(txt_file),
+            "srt_file": str(srt_file),
+            "language": succeeded[0][1].get("language"),
+            "segments": segments,
+            "segment_count": len(segment_results),
+            "failed_segments": failed,
+            "is_music_classification": is_music,
+            "quality_score": "good" if word_count > 0 and not is_music and not failed else "partial"
+        }
+
     def transcribe_latest_recording(self, language="es", force_engine=None):
         """Convenience method to transcribe the most recent recording"""
         recordings_dir = Path("recordings/raw")
         if not recordings_dir.exists():
             return {"success": False, "error": "No recordings directory found"}
         
-        audio_files = list(recordings_dir.glob("*.wav"))
+        audio_files = list_recordings(recordings_dir)
         if not audio_files:
             return {"success": False, "error": "No audio files found in recordings/raw"}
         
@@ -452,6 +1388,19 @@ class TranscriptionAgent(AgentFramework):
         
         return self.transcribe_audio_file(latest_audio, language=language, force_engine=force_engine)
 
+    def transcribe_pending_recordings(self, language="es"):
+        """Batch-transcribes every recording in recordings/raw that has no transcript yet"""
+        recordings_dir = Path("recordings/raw")
+        if not recordings_dir.exists():
+            return []
+        pending = [p for p in sorted(list_recordings(recordings_dir), key=lambda x: x.stat().st_mtime)
+                   if not (self.transcripts_dir / f"{p.stem}.txt").exists()]
+        if not pending:
+            print(f"[{self.agent_name}] ✅ No pending recordings")
+            return []
+        print(f"[{self.agent_name}] 📚 {len(pending)} pending recordings")
+        return self.transcribe_batch(pending, language=language)
+
     def get_performance_stats(self):
         """Get performance statistics"""
         total = self.stats["total_transcriptions"]
@@ -461,7 +1410,7 @@ class TranscriptionAgent(AgentFramework):
         amd_success_rate = (self.stats["amd_success"] / total) * 100
         fallback_rate = (self.stats["openai_fallback"] / total) * 100
         
-        return {
+        stats = {
             "total_transcriptions": total,
             "amd_success": self.stats["amd_success"],
             "amd_success_rate": f"{amd_success_rate:.1f}%",
@@ -469,6 +1418,10 @@ class TranscriptionAgent(AgentFramework):
             "fallback_rate": f"{fallback_rate:.1f}%",
             "amd_failed": self.stats["amd_failed"]
         }
+        # Runs of every session, not only this one (engine/model/threads: median RTF, success rate)
+        if self.engines.history is not None:
+            stats["history"] = self.engines.history.summary()
+        return stats
 
     def run(self):
         """Test hybrid transcription system"""
@@ -477,7 +1430,7 @@ class TranscriptionAgent(AgentFramework):
         
         # System check
         amd_available = self._verify_whisper_amd()
-        openai_available = self.whisper_openai is not None
+        openai_available = self.engines.is_available("openai-whisper")
         
         print(f"[{self.agent_name}] 🔍 System Status:")
         print(f"[{self.agent_name}] whisper-amd available: {'✅' if amd_available else '❌'}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark del fallback OpenAI Whisper en CPU: fp32 contra int8 dinámico.
+
+Cada variante corre en su propio proceso para medir la memoria de forma
+limpia. Reporta carga, RTF (tiempo de proceso / duración del audio), pico de
+RSS, tamaño de los pesos y la diferencia del texto int8 respecto a fp32.
+
+    python benchmark_whisper_int8.py recordings/raw/clase.wav --model base --threads 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+from pathlib import Path
+
+from mcp.audio_io import audio_info
+from mcp.torch_quantization import configure_torch_threads, model_size_mb, quantize_dynamic_int8
+
+
+def _words(text):
+    return [w.strip(".,;:¿?¡!\"'()").lower() for w in text.split() if w.strip(".,;:¿?¡!\"'()")]
+
+
+def word_error_rate(reference, hypothesis):
+    """Distancia de edición por palabras / palabras de la referencia."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / float(max(1, len(ref)))
+
+
+def run_variant(variant, audio_path, model_name, threads, language, results):
+    """Carga y transcribe con una variante (fp32 / int8) en un proceso aparte."""
+    import whisper
+    configure_torch_threads(threads, 1)
+
+    start = time.time()
+    model = whisper.load_model(model_name, device="cpu")
+    if variant == "int8":
+        model = quantize_dynamic_int8(model)
+    load_time = time.time() - start
+
+    start = time.time()
+    result = model.transcribe(str(audio_path), language=language, temperature=0.0, best_of=5,
+                              beam_size=5, fp16=False, verbose=False)
+    processing_time = time.time() - start
+
+    results.put({
+        "variant": variant,
+        "load_time": round(load_time, 2),
+        "processing_time": round(processing_time, 2),
+        "weights_mb": round(model_size_mb(model), 1),
+        # ru_maxrss está en KB en Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        "text": result["text"].strip()
+    })
+
+
+def benchmark_int8(audio_path, model_name="base", threads=2, language="es", output="whisper_int8_benchmark.json"):
+    audio_path = Path(audio_path)
+    if not audio_path.exists():
+        print(f"❌ No existe el audio: {audio_path}")
+        return None
+    rate, _, frames = audio_info(audio_path)
+    duration = frames / float(rate)
+
+    print(f"🧪 Benchmark OpenAI Whisper '{model_name}' fp32 vs int8")
+    print(f"   Audio: {audio_path.name} ({duration:.1f}s), hilos: {threads}")
+
+    context = multiprocessing.get_context("spawn")
+    runs = {}
+    for variant in ("fp32", "int8"):
+        results = context.Queue()
+        process = context.Process(target=run_variant,
+                                  args=(variant, audio_path, model_name, threads, language, results))
+        process.start()
+        runs[variant] = results.get()
+        process.join()
+        runs[variant]["rtf"] = round(runs[variant]["processing_time"] / duration, 3)
+        print(f"   {variant}: RTF {runs[variant]['rtf']}, carga {runs[variant]['load_time']}s, "
+              f"pico RSS {runs[variant]['peak_rss_mb']} MB, pesos {runs[variant]['weights_mb']} MB")
+
+    fp32, int8 = runs["fp32"], runs["int8"]
+    summary = {
+        "audio": str(audio_path),
+        "audio_seconds": round(duration, 2),
+        "model": model_name,
+        "threads": threads,
+        "runs": runs,
+        "speedup": round(fp32["processing_time"] / max(int8["processing_time"], 1e-6), 2),
+        "rss_saved_mb": round(fp32["peak_rss_mb"] - int8["peak_rss_mb"], 1),
+        "word_difference": round(word_error_rate(fp32["text"], int8["text"]), 4)
+    }
+
+    print("\n📊 RESULTADOS")
+    print("=" * 40)
+    print(f"⚡ Aceleración int8: x{summary['speedup']}")
+    print(f"💾 Memoria ahorrada (pico RSS): {summary['rss_saved_mb']} MB")
+    print(f"📝 Diferencia de texto (WER int8 vs fp32): {summary['word_difference'] * 100:.1f}%")
+
+    with open(output, "w") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados guardados en: {output}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI Whisper fp32 vs int8 dinámico en CPU")
+    parser.add_argument("audio", nargs="?", default="test_audio.wav")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--language", default="es")
+    parser.add_argument("--output", default="whisper_int8_benchmark.json")
+    args = parser.parse_args()
+    benchmark_int8(args.audio, args.model, args.threads, args.language, args.output)
@@ -23,10 +23,15 @@ def run_full_pipeline(class_name="Cybersecurity Test Class",
                       instructor="Prof. MCP",
                       language_hint="es", 
                       record_duration_seconds=15,
-                      force_transcription_engine=None): # <-- NUEVA OPCIÓN
+                      force_transcription_engine=None, # <-- NUEVA OPCIÓN
+                      preferred_device_name=None,
+                      agents=None):
     """
     Runs the full MCP Agent pipeline: Record -> Transcribe -> Analyze -> Generate Note.
     Now using the new Hybrid TranscriptionAgent!
+
+    `agents` may hold already initialized (warm) agents under the keys
+    "recording", "transcription", "analysis" and "obsidian"; missing ones are created.
     """
     print("🚀 Starting Cybersecurity Class MCP Pipeline...")
     print("=" * 50)
@@ -34,10 +39,11 @@ def run_full_pipeline(class_name="Cybersecurity Test Class",
     # Initialize Agents
     print("\n[Pipeline] Initializing agents...")
     try:
-        recording_agent = RecordingAgent()
-        transcription_agent = TranscriptionAgent()  # <-- HÍBRIDO!
-        analysis_agent = AnalysisAgent()
-        obsidian_agent = ObsidianAgent()
+        agents = agents or {}
+        recording_agent = agents.get("recording") or RecordingAgent()
+        transcription_agent = agents.get("transcription") or TranscriptionAgent()  # <-- HÍBRIDO!
+        analysis_agent = agents.get("analysis") or AnalysisAgent()
+        obsidian_agent = agents.get("obsidian") or ObsidianAgent()
         print("[Pipeline] All agents initialized successfully.")
         print(f"[Pipeline] 🚀 Using Hybrid TranscriptionAgent (AMD + OpenAI fallback)")
     except Exception as e:
@@ -47,7 +53,15 @@ def run_full_pipeline(class_name="Cybersecurity Test Class",
     # --- 1. Audio Recording ---
     print("\n[Pipeline] Step 1: Recording Audio...")
     
-    selected_input_device_index = recording_agent.select_audio_source(class_type=class_type)
+    if class_type.lower() == "hibrido" or recording_agent.source_settings:
+        # Room mic + system audio (or the configured `sources`) captured together
+        sources = recording_agent.select_audio_sources(class_type=class_type,
+                                                       preferred_device_name=preferred_device_name)
+        selected_input_device_index = sources[0]["index"] if sources else None
+    else:
+        sources = None
+        selected_input_device_index = recording_agent.select_audio_source(class_type=class_type,
+                                                                          preferred_device_name=preferred_device_name)
     if selected_input_device_index is None:
         print("[Pipeline] ERROR: Could not select audio input device. Aborting.")
         return
@@ -56,16 +70,62 @@ def run_full_pipeline(class_name="Cybersecurity Test Class",
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     raw_audio_filename_base = f"{class_name.replace(' ', '_')}_{timestamp}"
 
-    if not recording_agent.start_recording(output_filename=raw_audio_filename_base, 
-                                           input_device_index=selected_input_device_index):
-        print("[Pipeline] ERROR: Failed to start recording. Aborting.")
-        return
-    
-    print(f"[Pipeline] Recording for {record_duration_seconds} seconds. Speak now!")
-    for _ in range(0, int(recording_agent.RATE / recording_agent.CHUNK * record_duration_seconds)):
-        recording_agent.record_chunk()
+    labels = {"class_name": class_name, "class_type": class_type, "instructor": instructor}
+
+    # Listeners are registered before capture starts: in callback mode audio
+    # flows as soon as the stream opens, and the first chunks must not be lost
+    # Rolling segments: transcribe finished parts while the class is still going
+    segment_transcriber = None
+    if recording_agent.segment_seconds:
+        segment_transcriber = transcription_agent.start_segment_transcriber(
+            raw_audio_filename_base,
+            language=language_hint,
+            force_engine=force_transcription_engine,
+            enable_fallback=True
+        )
+        recording_agent.add_segment_listener(segment_transcriber.submit)
 
-    recording_result = recording_agent.stop_recording()
+    # Live captions: committed text is printed (and appended to *_live.txt) as the class goes on
+    live_transcriber = None
+    if transcription_agent.live_settings.get('enabled'):
+        def show_caption(event):
+            if event["type"] == "commit":
+                print(f"[Live] {event['text']}")
+        output_rate, output_channels = recording_agent.output_format(sources)
+        live_transcriber = transcription_agent.start_live_transcriber(
+            sample_rate=output_rate,
+            channels=output_channels,
+            language=language_hint,
+            on_update=show_caption,
+            output_name=raw_audio_filename_base
+        )
+        if live_transcriber is not None:
+            recording_agent.add_chunk_listener(live_transcriber.feed)
+
+    recording_result = None
+    live_result = None
+    try:
+        if not recording_agent.start_recording(output_filename=raw_audio_filename_base,
+                                               input_device_index=selected_input_device_index,
+                                               labels=labels,
+                                               sources=sources):
+            print("[Pipeline] ERROR: Failed to start recording. Aborting.")
+            return
+
+        print(f"[Pipeline] Recording for {record_duration_seconds} seconds. Speak now!")
+        recording_agent.record_for(record_duration_seconds)
+        recording_result = recording_agent.stop_recording()
+    finally:
+        if segment_transcriber is not None:
+            recording_agent.remove_segment_listener(segment_transcriber.submit)
+            if not recording_result:
+                # No recording to stitch: still stop the worker and drain what it was given
+                segment_transcriber.finish()
+        if live_transcriber is not None:
+            recording_agent.remove_chunk_listener(live_transcriber.feed)
+            live_result = live_transcriber.finish()
+            print(f"[Pipeline] 📡 Live transcript: {len(live_result['text'].split())} words, "
+                  f"median latency {live_result['latency_median']}s")
     if not recording_result:
         print("[Pipeline] ERROR: Failed to stop/save recording. Aborting.")
         return
@@ -78,13 +138,18 @@ def run_full_pipeline(class_name="Cybersecurity Test Class",
     print("\n[Pipeline] Step 2: Transcribing Audio with Hybrid Engine...")
     print(f"[Pipeline] 🎯 Primary: whisper-amd, Fallback: OpenAI Whisper")
     
-    transcription_result = transcription_agent.transcribe_audio_file(
-        recorded_audio_path, 
-        language=language_hint,
-        output_name=raw_audio_filename_base,
-        force_engine=force_transcription_engine,  # None = auto, "amd" = force AMD, "openai" = force OpenAI
-        enable_fallback=True
-    )
+    if segment_transcriber is not None:
+        print(f"[Pipeline] Waiting for {segment_transcriber.pending()} remaining segment(s)...")
+        transcription_result = segment_transcriber.finish()
+    else:
+        transcription_result = transcription_agent.transcribe_audio_file(
+            recorded_audio_path, 
+            language=language_hint,
+            output_name=raw_audio_filename_base,
+            force_engine=force_transcription_engine,  # None = auto, "amd" = force AMD, "openai" = force OpenAI
+            enable_fallback=True,
+            recording_metadata=recording_metadata
+        )
     
     if not transcription_result or not transcription_result["success"]:
         print(f"[Pipeline] ERROR: Hybrid transcription failed: {transcription_result.get('error', 'Unknown')}")
@@ -117,12 +182,14 @@ def run_full_pipeline(class_name="Cybersecurity Test Class",
     print("\n[Pipeline] Step 4: Generating Obsidian Note...")
     
     # Prepare data for the Obsidian template
+    signal = recording_metadata.get("signal", {})
     note_data = {
         "class_name": class_name,
         "date": datetime.now().strftime("%Y-%m-%d"),
         "class_type": class_type.capitalize(),
         "duration": f"{recording_metadata.get('duration_seconds', 0) // 60} min {recording_metadata.get('duration_seconds', 0) % 60:.0f} sec",
-        "quality_score": f"{transcription_result.get('quality_score', 'N/A')} (Engine: {engine_used})",
+        "quality_score": f"{transcription_result.get('quality_score', 'N/A')} (Engine: {engine_used}, "
+                         f"Signal: {signal.get('quality', 'N/A')}, SNR ~{signal.get('snr_db', 'N/A')} dB)",
         "instructor_name": instructor,
         
         "extracted_topics": "\n".join(f"- {concept.capitalize()}" for concept in analysis_results.get("key_concepts", [])),
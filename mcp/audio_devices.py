@@ -0,0 +1,155 @@
+"""Long-lived PortAudio session with a cached device table."""
+import atexit
+import os
+import threading
+
+import pyaudio
+
+
+def _hotplug_signature():
+    """
+    Cheap fingerprint of the sound hardware (Linux/ALSA). Changes when a USB
+    mic or headset is plugged or removed; None where it cannot be read.
+    """
+    try:
+        with open('/proc/asound/cards', 'r') as f:
+            cards = f.read()
+        return cards, tuple(sorted(os.listdir('/dev/snd')))
+    except OSError:
+        return None
+
+
+class AudioSession:
+    """
+    Owns the single pyaudio.PyAudio() instance for the process and a device
+    table indexed by name, channel count and host API. The table is built once
+    and only rebuilt on an explicit rescan() or when refresh_if_changed()
+    notices a hot-plug; PortAudio is never re-initialised while a stream is open.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.pa = None
+        self.devices = []
+        self._by_name = {}
+        self._active_streams = set()
+        self._signature = None
+        self._start()
+
+    def _start(self):
+        self.pa = pyaudio.PyAudio()
+        self._signature = _hotplug_signature()
+        self._build_table()
+
+    def _build_table(self):
+        host_apis = {}
+        for i in range(self.pa.get_host_api_count()):
+            host_apis[i] = self.pa.get_host_api_info_by_index(i)['name']
+
+        self.devices = []
+        self._by_name = {}
+        for i in range(self.pa.get_device_count()):
+            info = self.pa.get_device_info_by_index(i)
+            entry = {
+                "index": i,
+                "name": info['name'],
+                "max_input_channels": int(info['maxInputChannels']),
+                "max_output_channels": int(info['maxOutputChannels']),
+                "host_api": host_apis.get(info['hostApi'], str(info['hostApi'])),
+                "default_sample_rate": info['defaultSampleRate'],
+            }
+            self.devices.append(entry)
+            self._by_name.setdefault(entry["name"].lower(), []).append(entry)
+
+    def device(self, index):
+        """Cached info for a device index, or None."""
+        if index is None or not 0 <= index < len(self.devices):
+            return None
+        return self.devices[index]
+
+    def input_devices(self, min_channels=1, host_api=None):
+        return [d for d in self.devices
+                if d["max_input_channels"] >= min_channels
+                and (host_api is None or d["host_api"].lower() == host_api.lower())]
+
+    def find(self, name, is_input=True, min_channels=1, host_api=None):
+        """
+        Index of the first device whose name matches `name` (exact match
+        first, then substring, case-insensitive) with enough channels in the
+        requested direction. Lookups only touch the cached table.
+        """
+        key = name.lower()
+        channel_field = "max_input_channels" if is_input else "max_output_channels"
+
+        def usable(d):
+            return d[channel_field] >= min_channels and \
+                (host_api is None or d["host_api"].lower() == host_api.lower())
+
+        for d in self._by_name.get(key, []):
+            if usable(d):
+                return d["index"]
+        for d in self.devices:
+            if key in d["name"].lower() and usable(d):
+                return d["index"]
+        return None
+
+    def default_input(self):
+        """Cached entry for PortAudio's default input device, or None."""
+        try:
+            return self.device(self.pa.get_default_input_device_info()['index'])
+        except (IOError, OSError):
+            return None
+
+    def open(self, **kwargs):
+        """Opens a stream through the shared PortAudio instance and tracks it."""
+        with self._lock:
+            stream = self.pa.open(**kwargs)
+            self._active_streams.add(stream)
+            return stream
+
+    def release(self, stream):
+        """Stops tracking a stream (call after closing it)."""
+        with self._lock:
+            self._active_streams.discard(stream)
+
+    def rescan(self):
+        """Re-initialises PortAudio to pick up new devices. Returns False if streams are open."""
+        with self._lock:
+            if self._active_streams:
+                return False
+            if self.pa is not None:
+                self.pa.terminate()
+            self._start()
+            return True
+
+    def refresh_if_changed(self):
+        """Rescans only if the sound hardware changed since the table was built."""
+        signature = _hotplug_signature()
+        if signature is None or signature == self._signature:
+            return False
+        return self.rescan()
+
+    def shutdown(self):
+        with self._lock:
+            for stream in list(self._active_streams):
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+            self._active_streams.clear()
+            if self.pa is not None:
+                self.pa.terminate()
+                self.pa = None
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_audio_session():
+    """Process-wide AudioSession, created on first use and terminated at exit."""
+    global _session
+    with _session_lock:
+        if _session is None or _session.pa is None:
+            _session = AudioSession()
+            atexit.register(_session.shutdown)
+        return _session
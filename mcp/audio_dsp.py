@@ -0,0 +1,445 @@
+"""Vectorized NumPy signal-processing stages used by the MCP agents."""
+import math
+import time
+from array import array
+
+import numpy as np
+
+from mcp.audio_io import StreamingWavWriter, audio_info, iter_pcm_blocks
+
+
+def pcm16_to_float(data, channels=1):
+    """Interleaved int16 PCM bytes -> float32 array of shape (frames, channels) in [-1, 1)."""
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    return samples.reshape(-1, channels)
+
+
+def float_to_pcm16(samples):
+    """Float samples in [-1, 1] -> int16 PCM bytes (clipped)."""
+    return (np.clip(samples, -1.0, 32767.0 / 32768.0) * 32768.0).astype(np.int16).tobytes()
+
+
+class LevelMeter:
+    """
+    Per-chunk signal statistics computed during capture: RMS, peak, clipping
+    ratio, silence flag and a rolling noise floor / SNR estimate.
+
+    Each chunk costs a couple of vectorized reductions over its samples plus a
+    percentile over a fixed window of recent levels. The time series is kept
+    in compact float32 arrays and can be saved next to the recording.
+    """
+    def __init__(self, sample_rate, channels=1, silence_db=-50.0, clip_threshold=0.99,
+                 window_seconds=10.0, check_after_seconds=60.0, chunk_seconds=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.silence_db = silence_db
+        self.clip_level = int(clip_threshold * 32767)
+        self.check_after_seconds = check_after_seconds
+        self.window_seconds = window_seconds
+
+        self.times = array('f')
+        self.rms_db = array('f')
+        self.peak_db = array('f')
+        self.clip_ratio = array('f')
+        self.snr_db = array('f')
+        self.alerts = []
+        self._window = None
+        self._window_pos = 0
+        self._window_filled = 0
+        self._elapsed = 0.0
+        self._clipped = 0
+        self._samples = 0
+        self._silent_chunks = 0
+        self._peak = 0
+        self._checked = False
+
+    def _window_for(self, chunk_seconds):
+        size = max(8, int(self.window_seconds / max(chunk_seconds, 1e-3)))
+        self._window = np.full(size, -100.0, dtype=np.float32)
+
+    def update(self, data):
+        """Adds one int16 chunk; returns its stats as a dict."""
+        samples = np.frombuffer(data, dtype=np.int16)
+        if len(samples) == 0:
+            return None
+        chunk_seconds = len(samples) / float(self.channels * self.sample_rate)
+        if self._window is None:
+            self._window_for(chunk_seconds)
+
+        as_float = samples.astype(np.float32)
+        rms = np.sqrt(np.mean(as_float * as_float)) / 32768.0
+        peak = int(np.max(np.abs(samples.astype(np.int32))))
+        clipped = int(np.count_nonzero(np.abs(samples.astype(np.int32)) >= self.clip_level))
+        rms_db = max(-100.0, 20 * math.log10(rms + 1e-10))
+        peak_db = max(-100.0, 20 * math.log10(peak / 32768.0 + 1e-10))
+
+        # Rolling floor = quiet end of the recent levels, speech = loud end
+        self._window[self._window_pos] = rms_db
+        self._window_pos = (self._window_pos + 1) % len(self._window)
+        self._window_filled = min(self._window_filled + 1, len(self._window))
+        recent = self._window[:self._window_filled]
+        floor_db, speech_db = np.percentile(recent, (10, 90))
+        snr_db = float(speech_db - floor_db)
+
+        self.times.append(self._elapsed)
+        self.rms_db.append(rms_db)
+        self.peak_db.append(peak_db)
+        self.clip_ratio.append(clipped / float(len(samples)))
+        self.snr_db.append(snr_db)
+        self._elapsed += chunk_seconds
+        self._clipped += clipped
+        self._samples += len(samples)
+        self._peak = max(self._peak, peak)
+        if rms_db < self.silence_db:
+            self._silent_chunks += 1
+        self.noise_floor_db = float(floor_db)
+
+        if not self._checked and self._elapsed >= self.check_after_seconds:
+            self._checked = True
+            self._early_check()
+
+        return {"rms_db": rms_db, "peak_db": peak_db, "clip_ratio": clipped / float(len(samples)),
+                "snr_db": snr_db, "silent": rms_db < self.silence_db}
+
+    def _early_check(self):
+        """Flags a dead or saturated input after the first minute."""
+        summary = self.summary()
+        if summary["quality"] == "dead":
+            self.alerts.append(f"No usable signal after {self._elapsed:.0f}s "
+                               f"(peak {summary['peak_dbfs']} dBFS, {summary['silence_ratio']:.0%} silent)")
+        elif summary["clip_ratio"] > 0.01:
+            self.alerts.append(f"Input clipping on {summary['clip_ratio']:.1%} of samples")
+
+    def summary(self):
+        count = len(self.rms_db)
+        if count == 0:
+            return {"quality": "dead", "chunks": 0, "peak_dbfs": -100.0, "silence_ratio": 1.0, "clip_ratio": 0.0}
+        rms_db = np.frombuffer(self.rms_db, dtype=np.float32)
+        snr_db = np.frombuffer(self.snr_db, dtype=np.float32)
+        peak_dbfs = round(max(-100.0, 20 * math.log10(self._peak / 32768.0 + 1e-10)), 1)
+        silence_ratio = self._silent_chunks / float(count)
+        clip_ratio = self._clipped / float(max(1, self._samples))
+        snr = float(np.median(snr_db))
+
+        if peak_dbfs < -45.0 or silence_ratio > 0.98:
+            quality = "dead"
+        elif snr < 10.0 or clip_ratio > 0.01:
+            quality = "poor"
+        elif snr < 20.0:
+            quality = "fair"
+        else:
+            quality = "good"
+
+        return {
+            "quality": quality,
+            "chunks": count,
+            "mean_rms_dbfs": round(float(10 * np.log10(np.mean(10 ** (rms_db / 10.0)))), 1),
+            "peak_dbfs": peak_dbfs,
+            "clip_ratio": round(clip_ratio, 5),
+            "silence_ratio": round(silence_ratio, 3),
+            "noise_floor_dbfs": round(float(np.percentile(rms_db, 10)), 1),
+            "snr_db": round(snr, 1),
+            "alerts": list(self.alerts)
+        }
+
+    def save(self, path):
+        """Writes the per-chunk time series as a compressed .npz file."""
+        np.savez_compressed(
+            path,
+            time_s=np.frombuffer(self.times, dtype=np.float32),
+            rms_db=np.frombuffer(self.rms_db, dtype=np.float32),
+            peak_db=np.frombuffer(self.peak_db, dtype=np.float32),
+            clip_ratio=np.frombuffer(self.clip_ratio, dtype=np.float32),
+            snr_db=np.frombuffer(self.snr_db, dtype=np.float32)
+        )
+        return str(path)
+
+
+class StreamingResampler:
+    """
+    Chunk-by-chunk polyphase resampler with optional downmix to mono.
+
+    The rational factor L/M is reduced by the gcd of both rates (44100 -> 16000
+    becomes 160/441) and a Kaiser-windowed sinc low-pass is split into L phases.
+    Every output sample of a chunk is computed in one gather + dot product, and
+    only the last few input samples are kept between calls, so the stage costs
+    a fixed amount of memory however long the recording is.
+    """
+    def __init__(self, in_rate, out_rate, in_channels=1, taps_per_phase=24, kaiser_beta=8.0):
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.in_channels = in_channels
+
+        g = math.gcd(self.in_rate, self.out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        self.taps_per_phase = taps_per_phase
+
+        # Prototype low-pass at the upsampled rate, cut off below the lower Nyquist
+        n_taps = taps_per_phase * self.up
+        cutoff = 0.5 / max(self.up, self.down) * 0.92
+        t = np.arange(n_taps) - (n_taps - 1) / 2.0
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n_taps, kaiser_beta)
+        prototype *= self.up / prototype.sum()
+        # phases[p, k] = prototype[p + k * up]
+        self.phases = prototype.reshape(taps_per_phase, self.up).T.astype(np.float32)
+
+        self.reset()
+
+    def reset(self):
+        """Forgets the filter history, as if the next block started a new stream."""
+        # History starts with zeros so the first outputs have a full filter span
+        self._history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        self._history_start = -(self.taps_per_phase - 1)  # absolute index of _history[0]
+        self._input_count = 0
+        self._output_count = 0
+
+    def process_float(self, mono):
+        """Resamples a 1-D float32 block; returns the output samples now available."""
+        buffer = np.concatenate((self._history, mono.astype(np.float32, copy=False)))
+        self._input_count += len(mono)
+
+        # Outputs whose newest input sample has arrived
+        n_end = (self._input_count * self.up + self.down - 1) // self.down
+        n = np.arange(self._output_count, n_end, dtype=np.int64)
+        if len(n):
+            t = n * self.down
+            newest = t // self.up - self._history_start
+            idx = newest[:, None] - np.arange(self.taps_per_phase)[None, :]
+            out = np.einsum('ij,ij->i', buffer[idx], self.phases[t % self.up])
+            self._output_count = n_end
+        else:
+            out = np.zeros(0, dtype=np.float32)
+
+        # Keep just enough input for the next output's filter span
+        keep_from = (self._output_count * self.down) // self.up - (self.taps_per_phase - 1)
+        keep_from = max(keep_from, self._history_start)
+        self._history = buffer[keep_from - self._history_start:]
+        self._history_start = keep_from
+        return out.astype(np.float32, copy=False)
+
+    def process(self, data):
+        """int16 interleaved bytes at in_rate -> int16 mono bytes at out_rate."""
+        frames = pcm16_to_float(data, self.in_channels)
+        mono = frames.mean(axis=1) if self.in_channels > 1 else frames[:, 0]
+        return float_to_pcm16(self.process_float(mono))
+
+
+class AutomaticGainControl:
+    """
+    Streaming AGC + limiter for int16 chunks, with no look-ahead.
+
+    Once per chunk the RMS level sets a desired gain (target - level, clamped
+    to [min_gain_db, max_gain_db]); chunks below `gate_dbfs` hold the current
+    gain so room noise is not pumped up during pauses. The gain follows the
+    desired value with a fast attack and a slow release, and is ramped
+    linearly across the chunk so there are no steps. Whatever still exceeds
+    `limit_dbfs` goes through a soft-knee clipper, and the next chunk starts
+    from a gain low enough to avoid it.
+    """
+    def __init__(self, sample_rate, channels=1, target_dbfs=-20.0, max_gain_db=24.0,
+                 min_gain_db=-12.0, gate_dbfs=-55.0, attack_seconds=0.05,
+                 release_seconds=2.0, limit_dbfs=-1.0):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.target_dbfs = target_dbfs
+        self.max_gain_db = max_gain_db
+        self.min_gain_db = min_gain_db
+        self.gate_dbfs = gate_dbfs
+        self.attack_seconds = attack_seconds
+        self.release_seconds = release_seconds
+        self.limit = 10 ** (limit_dbfs / 20.0)
+
+        self.gain_db = 0.0
+        self.gain_curve = array('f')   # gain applied at the end of each chunk (dB)
+        self.chunk_seconds = array('f')
+        self.cost_us = array('f')      # processing time of each chunk
+        self.limited_chunks = 0
+        self.clip_level = int(0.99 * 32767)
+        self._output_clipped = 0       # samples at full scale after the gain
+        self._output_samples = 0
+
+    def process(self, data):
+        """Applies the gain to one int16 chunk and returns the processed bytes."""
+        started = time.perf_counter()
+        x = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+        if len(x) == 0:
+            return data
+        frames = len(x) // self.channels
+        chunk_seconds = frames / float(self.sample_rate)
+
+        level_db = 10 * math.log10(float(np.dot(x, x)) / len(x) + 1e-10)
+        if level_db < self.gate_dbfs:
+            desired = self.gain_db
+        else:
+            desired = min(self.max_gain_db, max(self.min_gain_db, self.target_dbfs - level_db))
+        time_constant = self.attack_seconds if desired < self.gain_db else self.release_seconds
+        new_gain_db = self.gain_db + (desired - self.gain_db) * (1 - math.exp(-chunk_seconds / time_constant))
+
+        # Linear ramp from the previous gain to the new one, one value per frame
+        g0, g1 = 10 ** (self.gain_db / 20.0), 10 ** (new_gain_db / 20.0)
+        ramp = g0 + (g1 - g0) * (np.arange(1, frames + 1, dtype=np.float32) / frames)
+        y = x.reshape(frames, self.channels) * ramp[:, None]
+
+        peak = float(np.max(np.abs(y)))
+        if peak > self.limit:
+            # Soft knee above the ceiling; back the gain off so the next chunk fits
+            self.limited_chunks += 1
+            knee = self.limit * 0.9
+            over = np.abs(y) > knee
+            y[over] = np.sign(y[over]) * (knee + (self.limit - knee) *
+                                          np.tanh((np.abs(y[over]) - knee) / (self.limit - knee)))
+            new_gain_db += 20 * math.log10(self.limit / peak)
+
+        self.gain_db = new_gain_db
+        self.gain_curve.append(new_gain_db)
+        self.chunk_seconds.append(chunk_seconds)
+        out = float_to_pcm16(y.reshape(-1))
+        self._output_clipped += int(np.count_nonzero(np.abs(y) * 32768.0 >= self.clip_level))
+        self._output_samples += len(x)
+        self.cost_us.append((time.perf_counter() - started) * 1e6)
+        return out
+
+    def summary(self, max_points=600):
+        """
+        Gain statistics plus the gain curve decimated to at most `max_points`
+        values (mean dB per interval) for the recording metadata.
+        """
+        if not self.gain_curve:
+            return {"chunks": 0}
+        gains = np.frombuffer(self.gain_curve, dtype=np.float32)
+        seconds = np.frombuffer(self.chunk_seconds, dtype=np.float32)
+        cost = np.frombuffer(self.cost_us, dtype=np.float32)
+        total = float(seconds.sum())
+
+        interval = max(1.0, math.ceil(total / max_points))
+        bins = (np.cumsum(seconds) - seconds) // interval
+        counts = np.bincount(bins.astype(np.int64))
+        curve = np.bincount(bins.astype(np.int64), weights=gains) / np.maximum(counts, 1)
+
+        return {
+            "chunks": len(gains),
+            "target_dbfs": self.target_dbfs,
+            "mean_gain_db": round(float(gains.mean()), 1),
+            "min_gain_db": round(float(gains.min()), 1),
+            "max_gain_db": round(float(gains.max()), 1),
+            "limited_chunks": self.limited_chunks,
+            "output_clip_ratio": round(self._output_clipped / float(max(1, self._output_samples)), 5),
+            "cost_us_mean": round(float(cost.mean()), 1),
+            "cost_us_p99": round(float(np.percentile(cost, 99)), 1),
+            "cpu_ratio": round(float(cost.sum() / 1e6 / total), 5) if total else 0.0,
+            "curve_interval_seconds": interval,
+            "gain_curve_db": [round(float(g), 1) for g in curve]
+        }
+
+class SpectralGate:
+    """
+    Streaming STFT spectral-gating denoiser.
+
+    Frames use a sqrt-Hann window at 50% overlap, so analysis x synthesis
+    sums to one and unity gain reconstructs the input exactly. A per-bin
+    noise profile follows the quietest frames of each block: it drops
+    immediately when the room gets quieter and rises over ~`noise_rise_frames`
+    frames, so speech never gets absorbed into it. Bins close to the noise floor are
+    attenuated with a soft mask smoothed across frequency. All frames of a
+    block are processed in one batch of FFTs.
+    """
+    def __init__(self, frame_size=512, threshold_db=6.0, reduction_db=18.0,
+                 noise_percentile=20, noise_rise_frames=500):
+        self.frame_size = frame_size
+        self.hop = frame_size // 2
+        self.threshold_db = threshold_db
+        self.floor_gain = 10 ** (-reduction_db / 20.0)
+        self.noise_percentile = noise_percentile
+        self.noise_rise_frames = noise_rise_frames
+
+        n = np.arange(frame_size)
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * n / frame_size)).astype(np.float32)
+        self.noise_profile = None
+        self._in_carry = np.zeros(self.hop, dtype=np.float32)
+        self._out_tail = np.zeros(self.hop, dtype=np.float32)
+
+    @property
+    def latency(self):
+        """Output lags input by this many samples."""
+        return self.hop
+
+    def _update_noise(self, power):
+        # Noise power per bin is roughly exponential, so a low percentile
+        # scaled by -ln(1 - p) is an estimate of its mean that ignores speech
+        p = self.noise_percentile / 100.0
+        estimate = np.percentile(power, self.noise_percentile, axis=0) / -np.log(1 - p)
+        if self.noise_profile is None:
+            self.noise_profile = estimate
+        else:
+            # Rise with a time constant in frames, independent of the block size,
+            # and cap the step so a block full of speech barely moves the profile
+            estimate = np.minimum(estimate, 2.0 * self.noise_profile)
+            alpha = np.exp(-len(power) / float(self.noise_rise_frames))
+            risen = alpha * self.noise_profile + (1 - alpha) * estimate
+            self.noise_profile = np.minimum(risen, estimate)
+
+    def _gain(self, power):
+        snr_db = 10 * np.log10(power / (self.noise_profile + 1e-12) + 1e-12)
+        # Soft knee around the threshold instead of a hard on/off gate
+        mask = 1.0 / (1.0 + np.exp(-(snr_db - self.threshold_db) / 2.0))
+        gain = self.floor_gain + (1 - self.floor_gain) * mask
+        smoothed = gain.copy()
+        smoothed[:, 1:-1] = (gain[:, :-2] + gain[:, 1:-1] + gain[:, 2:]) / 3.0
+        return smoothed
+
+    def process_float(self, x):
+        """Denoises a mono float32 block; returns the samples that are complete."""
+        buffer = np.concatenate((self._in_carry, x.astype(np.float32, copy=False)))
+        n_frames = (len(buffer) - self.frame_size) // self.hop + 1 if len(buffer) >= self.frame_size else 0
+        if n_frames <= 0:
+            self._in_carry = buffer
+            return np.zeros(0, dtype=np.float32)
+
+        idx = np.arange(n_frames)[:, None] * self.hop + np.arange(self.frame_size)[None, :]
+        spectrum = np.fft.rfft(buffer[idx] * self.window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        self._update_noise(power)
+        frames = np.fft.irfft(spectrum * self._gain(power), n=self.frame_size, axis=1) * self.window
+
+        # Overlap-add: each hop is the first half of frame i plus the second half of frame i-1
+        out = frames[:, :self.hop].copy()
+        out[0] += self._out_tail
+        out[1:] += frames[:-1, self.hop:]
+        self._out_tail = frames[-1, self.hop:].astype(np.float32)
+        self._in_carry = buffer[n_frames * self.hop:]
+        return out.reshape(-1).astype(np.float32, copy=False)
+
+    def flush(self):
+        """Pushes out the samples still held back by the latency."""
+        return self.process_float(np.zeros(self.frame_size, dtype=np.float32))
+
+
+def denoise_file(src_path, dst_path, **gate_params):
+    """
+    Runs SpectralGate offline over a WAV/FLAC file, block by block, and writes
+    a mono 16-bit WAV with the same sample rate. Returns timing stats.
+    """
+    rate, channels, frames = audio_info(src_path)
+    frame_size = gate_params.pop('frame_size', 512 if rate <= 16000 else 1024)
+    gate = SpectralGate(frame_size=frame_size, **gate_params)
+    to_skip = gate.latency
+    start_time = time.time()
+    with StreamingWavWriter(dst_path, 1, 2, rate) as writer:
+        blocks = (pcm16_to_float(b, channels).mean(axis=1) for b in iter_pcm_blocks(src_path))
+        for block in blocks:
+            out = gate.process_float(block)
+            if to_skip:
+                dropped = min(to_skip, len(out))
+                out, to_skip = out[dropped:], to_skip - dropped
+            writer.write(float_to_pcm16(out))
+        tail = gate.flush()[to_skip:]
+        remaining = frames - writer.frames_written
+        writer.write(float_to_pcm16(tail[:max(0, remaining)]))
+    elapsed = time.time() - start_time
+    seconds = frames / float(rate) if rate else 0.0
+    return {
+        "seconds": round(seconds, 2),
+        "processing_time": round(elapsed, 2),
+        "real_time_factor": round(elapsed / seconds, 4) if seconds else 0.0
+    }
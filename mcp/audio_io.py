@@ -0,0 +1,287 @@
+"""Audio file helpers shared by the MCP agents."""
+import json
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+import wave
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+# In-process FLAC support is optional; without it we stream through ffmpeg
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    soundfile = None
+    SOUNDFILE_AVAILABLE = False
+
+# Recording containers the agents know how to read
+AUDIO_EXTENSIONS = ('.wav', '.flac')
+
+
+class StreamingWavWriter:
+    """
+    Appends PCM chunks to a WAV file on disk as they arrive.
+
+    Chunks are collected in a small bounded buffer and flushed once it fills up,
+    so memory stays flat no matter how long the recording runs. The RIFF/data
+    sizes in the header are patched every `header_interval` seconds, which keeps
+    the file playable even if the process dies mid-class.
+    """
+    HEADER_SIZE = 44
+
+    def __init__(self, path, channels, sample_width, sample_rate,
+                 buffer_bytes=256 * 1024, header_interval=5.0):
+        self.path = Path(path)
+        self.channels = channels
+        self.sample_width = sample_width
+        self.sample_rate = sample_rate
+        self.buffer_bytes = buffer_bytes
+        self.header_interval = header_interval
+
+        self.frame_size = channels * sample_width
+        self.data_bytes = 0
+        self._buffer = bytearray()
+        self._last_header_update = time.monotonic()
+        self._file = open(self.path, 'wb')
+        self._write_header()
+
+    @property
+    def frames_written(self):
+        """Number of frames accepted so far (flushed or still buffered)."""
+        return (self.data_bytes + len(self._buffer)) // self.frame_size
+
+    @property
+    def duration_seconds(self):
+        return self.frames_written / float(self.sample_rate)
+
+    def _write_header(self):
+        """Writes a canonical 44-byte PCM header for the current data size."""
+        byte_rate = self.sample_rate * self.frame_size
+        header = struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + self.data_bytes, b'WAVE',
+            b'fmt ', 16, 1, self.channels, self.sample_rate,
+            byte_rate, self.frame_size, self.sample_width * 8,
+            b'data', self.data_bytes
+        )
+        self._file.seek(0)
+        self._file.write(header)
+        self._file.seek(0, os.SEEK_END)
+
+    def write(self, data):
+        """Queues a chunk of raw PCM bytes for writing."""
+        if self._file is None:
+            raise ValueError(f"Cannot write to closed WAV file {self.path}")
+        self._buffer += data
+        if len(self._buffer) >= self.buffer_bytes:
+            self.flush()
+        if time.monotonic() - self._last_header_update >= self.header_interval:
+            self.flush()
+            self._update_header()
+
+    def flush(self):
+        """Moves the in-memory buffer to disk."""
+        if self._buffer and self._file is not None:
+            self._file.write(self._buffer)
+            self.data_bytes += len(self._buffer)
+            self._buffer = bytearray()
+
+    def _update_header(self):
+        self._write_header()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_header_update = time.monotonic()
+
+    def close(self):
+        """Flushes pending data, finalizes the header and closes the file."""
+        if self._file is None:
+            return
+        self.flush()
+        self._update_header()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FlacStreamWriter:
+    """
+    Lossless FLAC encoder fed chunk by chunk, with the same interface as
+    StreamingWavWriter. Uses libsndfile in-process when `soundfile` is
+    installed, otherwise pipes raw PCM into an ffmpeg encoder process.
+    Only 16-bit PCM input is supported.
+    """
+    def __init__(self, path, channels, sample_width, sample_rate, **_unused):
+        if sample_width != 2:
+            raise ValueError("FLAC streaming supports 16-bit PCM only")
+        self.path = Path(path)
+        self.channels = channels
+        self.sample_width = sample_width
+        self.sample_rate = sample_rate
+        self.frame_size = channels * sample_width
+        self.data_bytes = 0
+        self._sf = None
+        self._proc = None
+
+        if SOUNDFILE_AVAILABLE:
+            self._sf = soundfile.SoundFile(str(self.path), 'w', samplerate=sample_rate,
+                                           channels=channels, format='FLAC', subtype='PCM_16')
+        else:
+            self._proc = subprocess.Popen(
+                ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+                 "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+                 "-c:a", "flac", str(self.path)],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+
+    @property
+    def frames_written(self):
+        return self.data_bytes // self.frame_size
+
+    @property
+    def duration_seconds(self):
+        return self.frames_written / float(self.sample_rate)
+
+    def write(self, data):
+        if self._sf is not None:
+            self._sf.write(np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels))
+        elif self._proc is not None:
+            self._proc.stdin.write(data)
+        else:
+            raise ValueError(f"Cannot write to closed FLAC file {self.path}")
+        self.data_bytes += len(data)
+
+    def flush(self):
+        if self._sf is not None:
+            self._sf.flush()
+        elif self._proc is not None:
+            self._proc.stdin.flush()
+
+    def close(self):
+        if self._sf is not None:
+            self._sf.close()
+            self._sf = None
+        elif self._proc is not None:
+            self._proc.stdin.close()
+            self._proc.wait()
+            if self._proc.returncode != 0:
+                err = self._proc.stderr.read().decode(errors='replace')[:200]
+                self._proc = None
+                raise IOError(f"ffmpeg FLAC encoder failed for {self.path}: {err}")
+            self._proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_audio_writer(path, channels, sample_width, sample_rate, **kwargs):
+    """Returns a streaming writer for the container implied by the file suffix."""
+    if Path(path).suffix.lower() == '.flac':
+        return FlacStreamWriter(path, channels, sample_width, sample_rate)
+    return StreamingWavWriter(path, channels, sample_width, sample_rate, **kwargs)
+
+
+def list_recordings(directory):
+    """All recordings in `directory` with a supported container."""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return [f for f in directory.iterdir() if f.is_file() and f.suffix.lower() in AUDIO_EXTENSIONS]
+
+
+def audio_info(path):
+    """Returns (sample_rate, channels, frames) for a WAV or FLAC file."""
+    path = Path(path)
+    if path.suffix.lower() == '.wav':
+        with wave.open(str(path), 'rb') as wf:
+            return wf.getframerate(), wf.getnchannels(), wf.getnframes()
+    if SOUNDFILE_AVAILABLE:
+        info = soundfile.info(str(path))
+        return info.samplerate, info.channels, info.frames
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=sample_rate,channels,duration_ts,duration", "-of", "json", str(path)],
+        capture_output=True, text=True, timeout=30
+    )
+    stream = json.loads(result.stdout)["streams"][0]
+    rate = int(stream["sample_rate"])
+    frames = int(stream.get("duration_ts") or round(float(stream.get("duration", 0)) * rate))
+    return rate, int(stream["channels"]), frames
+
+
+def iter_pcm_blocks(path, block_frames=65536, start_frame=0):
+    """
+    Yields interleaved int16 PCM bytes from a WAV or FLAC file, `block_frames`
+    frames at a time, without loading the whole recording. `start_frame`
+    seeks first, so nothing before it is read or decoded.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.wav':
+        with wave.open(str(path), 'rb') as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path.name}: only 16-bit PCM WAV is supported")
+            if start_frame:
+                wf.setpos(min(start_frame, wf.getnframes()))
+            while True:
+                data = wf.readframes(block_frames)
+                if not data:
+                    break
+                yield data
+    elif SOUNDFILE_AVAILABLE:
+        for block in soundfile.blocks(str(path), blocksize=block_frames, dtype='int16', always_2d=True,
+                                      start=start_frame):
+            yield block.tobytes()
+    else:
+        rate, channels, _ = audio_info(path)
+        seek = ["-ss", f"{start_frame / float(rate):.6f}"] if start_frame else []
+        proc = subprocess.Popen(
+            ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", *seek,
+             "-i", str(path), "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        try:
+            block_bytes = block_frames * channels * 2
+            while True:
+                data = proc.stdout.read(block_bytes)
+                if not data:
+                    break
+                yield data
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+
+@contextmanager
+def decoded_wav(path):
+    """
+    Yields a 16-bit PCM WAV path for `path`. WAV input is passed through
+    untouched; FLAC is decoded to a temporary file that is removed afterwards.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.wav':
+        yield path
+        return
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="mcp_decode_"))
+    wav_path = tmp_dir / f"{path.stem}.wav"
+    try:
+        rate, channels, _ = audio_info(path)
+        with StreamingWavWriter(wav_path, channels, 2, rate) as writer:
+            for block in iter_pcm_blocks(path):
+                writer.write(block)
+        yield wav_path
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,634 @@
+"""Transcription engines behind one interface, with capability probes cached on disk."""
+import importlib.util
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from mcp.audio_io import audio_info, decoded_wav
+from mcp.model_pool import ModelPool
+from mcp.performance_history import PerformanceHistory
+from mcp.torch_quantization import configure_torch_threads, quantize_dynamic_int8
+from mcp.transcript_format import parse_srt, parse_whisper_cpp_json, write_transcripts
+from mcp.transcription_cache import file_fingerprint
+from mcp.whisper_backends import PYWHISPERCPP_AVAILABLE, get_resident_whisper
+from mcp.whisper_streaming import BatchedWhisperTranscriber, WindowedWhisperTranscriber
+
+try:
+    from importlib.metadata import PackageNotFoundError, version as package_version
+except ImportError:  # Python < 3.8
+    PackageNotFoundError = Exception
+    package_version = None
+
+
+class EngineError(Exception):
+    """An engine could not produce a transcript."""
+
+
+class EngineTimeout(EngineError):
+    """The engine was stopped after running past its timeout."""
+
+
+def _installed_version(distribution):
+    if package_version is None:
+        return None
+    try:
+        return package_version(distribution)
+    except PackageNotFoundError:
+        return None
+
+
+class TranscriptionEngine:
+    """
+    One way of turning an audio file into text. A new engine is a subclass
+    that sets `name`/`family`/`priority` and implements:
+
+    - fingerprint(): cheap identity of what is installed (file stats,
+      package version); None when the engine is not installed at all.
+    - probe(): the expensive check (running the binary, importing the
+      package). Returns a capabilities dict with at least "available"; the
+      registry caches it on disk until the fingerprint changes.
+    - transcribe(audio_path, output_base, language, prompt, capabilities,
+      **options): returns {"text", "segments", "language"} and, when the
+      engine wrote them itself, "txt_file"/"srt_file"/"vtt_file";
+      raises EngineError.
+
+    `defaults` lists the decoding options the engine understands; options
+    it does not know are ignored, so callers can pass one set to all.
+    run_profile(options) names the model and thread count of a run, which
+    is what the performance history groups runs by.
+    Engines that can decode several files in one pass also implement
+    transcribe_batch(sources, language, prompt, **options).
+    """
+    name = None
+    family = None     # "engine" label in the results (several engines may share one)
+    priority = 100    # lower runs first
+    defaults = {}
+
+    def fingerprint(self):
+        raise NotImplementedError
+
+    def probe(self):
+        raise NotImplementedError
+
+    def transcribe(self, audio_path, output_base, language="es", prompt=None, capabilities=None, **options):
+        raise NotImplementedError
+
+    def run_profile(self, options):
+        """(model, threads) of a run with these options."""
+        return getattr(self, "model_name", None), options.get("threads")
+
+    def options(self, overrides):
+        merged = dict(self.defaults)
+        merged.update({k: v for k, v in overrides.items() if k in self.defaults and v is not None})
+        return merged
+
+
+class WhisperCppCliEngine(TranscriptionEngine):
+    """
+    A whisper.cpp command line binary (whisper-amd or the stock build).
+
+    The binary writes its full JSON output (segments, timestamps, token
+    probabilities) into a private temporary directory; the result is parsed
+    from there and, when an output_base is given, TXT/SRT/VTT are written
+    from the parsed segments. Builds without JSON output fall back to SRT.
+    """
+    defaults = {
+        "threads": 2,
+        "processors": 1,
+        "temperature": 0.0,
+        "best_of": 5,
+        "beam_size": 5,
+        "no_speech_threshold": 0.2,
+        "suppress_non_speech_tokens": True,
+        "timeout": 300,
+        "output_formats": ("txt", "srt", "vtt")
+    }
+
+    def __init__(self, name, binary, model_path, priority, family=None, **defaults):
+        self.name = name
+        self.family = family or name
+        self.binary = binary
+        self.model_path = str(model_path) if model_path else None
+        self.priority = priority
+        self.defaults = self.options(defaults)
+
+    def resolved_binary(self):
+        return shutil.which(self.binary)
+
+    def run_profile(self, options):
+        return Path(self.model_path).name if self.model_path else None, options.get("threads")
+
+    def fingerprint(self):
+        binary = self.resolved_binary()
+        if binary is None:
+            return None
+        return f"{binary}|{file_fingerprint(binary)}|{file_fingerprint(self.model_path)}"
+
+    def probe(self):
+        binary = self.resolved_binary()
+        try:
+            result = subprocess.run([binary, "--help"], capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return {"available": False, "error": str(e)}
+        # whisper.cpp prints its usage on stderr
+        usage = (result.stdout or "") + (result.stderr or "")
+        version = re.search(r"version[:\s]+v?([\w.\-]+)", usage, re.IGNORECASE)
+        return {
+            "available": result.returncode == 0 and bool(self.model_path and Path(self.model_path).exists()),
+            "binary": binary,
+            "version": version.group(1) if version else None,
+            "flags": sorted(set(re.findall(r"(?<![\w-])(--[a-z][\w-]*)", usage)))
+        }
+
+    def command(self, wav_path, output_base, language, prompt, flags, options):
+        supported = set(flags or ())
+        command = [
+            self.resolved_binary(),
+            "-m", self.model_path,
+            "-t", str(options["threads"]),
+            "-p", str(options["processors"]),
+            "-l", language or "auto",
+        ]
+        if prompt:
+            command += ["--prompt", prompt]
+        command += [
+            "--temperature", str(options["temperature"]),
+            "--best-of", str(options["best_of"]),
+            "--beam-size", str(options["beam_size"]),
+            "--no-speech-thold", str(options["no_speech_threshold"]),
+        ]
+        # Older builds do not know --suppress-nst and take it for an output name
+        if options["suppress_non_speech_tokens"] and "--suppress-nst" in supported:
+            command.append("--suppress-nst")
+        if "--output-json-full" in supported:
+            command.append("--output-json-full")
+        elif "--output-json" in supported:
+            command.append("--output-json")
+        else:
+            command.append("--output-srt")
+        command += ["--output-file", str(output_base), str(wav_path)]
+        return command
+
+    def transcribe(self, audio_path, output_base, language="es", prompt=None, capabilities=None, **options):
+        options = self.options(options)
+        flags = (capabilities or {}).get("flags")
+        tmp_dir = Path(tempfile.mkdtemp(prefix="mcp_whispercpp_"))
+        try:
+            # whisper.cpp only reads WAV; FLAC recordings are decoded to a temporary file
+            with decoded_wav(audio_path) as wav_path:
+                command = self.command(wav_path, tmp_dir / "out", language, prompt, flags, options)
+                try:
+                    result = subprocess.run(command, capture_output=True, text=True, timeout=options["timeout"])
+                except subprocess.TimeoutExpired:
+                    raise EngineTimeout(f"Timeout ({options['timeout']}s)")
+                except OSError as e:
+                    raise EngineError(f"Could not start {self.binary}: {e}")
+            if result.returncode != 0:
+                raise EngineError(f"Return code {result.returncode}: {(result.stderr or '')[:200]}")
+
+            json_file, srt_file = tmp_dir / "out.json", tmp_dir / "out.srt"
+            if json_file.exists():
+                try:
+                    parsed = parse_whisper_cpp_json(json_file)
+                except (ValueError, KeyError) as e:
+                    raise EngineError(f"Unreadable JSON output: {e}")
+            elif srt_file.exists():
+                parsed = {"language": None, "segments": parse_srt(srt_file)}
+            else:
+                raise EngineError("No output generated")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        segments = parsed["segments"]
+        transcript = {
+            "text": " ".join(segment["text"] for segment in segments).strip(),
+            "segments": segments,
+            "language": parsed["language"] or language
+        }
+        if output_base is not None:
+            transcript.update(write_transcripts(segments, output_base, options["output_formats"]))
+        return transcript
+
+
+class ResidentWhisperCppEngine(TranscriptionEngine):
+    """whisper.cpp in-process through pywhispercpp; the model stays loaded between files."""
+    defaults = {
+        "threads": 2,
+        "temperature": 0.0,
+        "no_speech_threshold": 0.2,
+        "suppress_non_speech_tokens": True
+    }
+
+    def __init__(self, name, model_path, priority, family=None, **defaults):
+        self.name = name
+        self.family = family or name
+        self.model_path = str(model_path) if model_path else None
+        self.priority = priority
+        self.defaults = self.options(defaults)
+
+    def run_profile(self, options):
+        return Path(self.model_path).name if self.model_path else None, options.get("threads")
+
+    def fingerprint(self):
+        if not PYWHISPERCPP_AVAILABLE:
+            return None
+        return f"pywhispercpp {_installed_version('pywhispercpp')}|{file_fingerprint(self.model_path)}"
+
+    def probe(self):
+        return {"available": bool(self.model_path and Path(self.model_path).exists()),
+                "version": _installed_version('pywhispercpp')}
+
+    def backend(self, options=None):
+        """
+        The shared ResidentWhisperCpp for this model and these decoding
+        options (loaded lazily); one resident context per distinct set.
+        """
+        options = self.options(options or {})
+        return get_resident_whisper(
+            self.model_path,
+            n_threads=options["threads"],
+            temperature=options["temperature"],
+            no_speech_thold=options["no_speech_threshold"],
+            suppress_non_speech_tokens=options["suppress_non_speech_tokens"]
+        )
+
+    def transcribe(self, audio_path, output_base, language="es", prompt=None, capabilities=None, **options):
+        backend = self.backend(options)
+        if backend is None:
+            raise EngineError("pywhispercpp or the ggml model is missing")
+        try:
+            segments = backend.transcribe_file(audio_path, language=language or "auto", initial_prompt=prompt)
+        except Exception as e:
+            raise EngineError(f"Resident backend error: {e}")
+        return {"text": " ".join(s["text"] for s in segments).strip(), "segments": segments, "language": language}
+
+
+class OpenAIWhisperEngine(TranscriptionEngine):
+    """
+    openai-whisper (PyTorch). The package is only imported when a model is
+    needed, not when the registry is built. Models (tiny/base/small, picked
+    per call with model_name) live in a ModelPool shared by every agent of
+    the process; preload() warms the default one in the background.
+
+    With quantize="int8" every model is loaded on CPU and its Linear layers
+    are converted to dynamic int8 after loading. The PyTorch thread pools
+    are sized before the first model is loaded; a "threads" option pins
+    the intra-op count for the calls that pass it (pool and race workers),
+    otherwise intra_op_threads is used.
+
+    With streaming=True, WAV/FLAC recordings are decoded window by window by
+    WindowedWhisperTranscriber instead of model.transcribe(): no ffmpeg
+    process and no whole-file float32 array or spectrogram.
+    transcribe_batch() decodes the windows of several recordings (or
+    chunks) together with BatchedWhisperTranscriber.
+    """
+    STREAMING_SUFFIXES = (".wav", ".flac")
+    defaults = {
+        "model_name": None,
+        "threads": None,
+        "temperature": 0.0,
+        "best_of": 5,
+        "beam_size": 5,
+        "word_timestamps": True,
+        "condition_on_previous_text": True
+    }
+
+    def __init__(self, name, model_name="base", download_root=None, priority=30, family=None,
+                 rss_budget_mb=None, max_models=3, quantize=None, intra_op_threads=None,
+                 inter_op_threads=1, streaming=False, **defaults):
+        self.name = name
+        self.family = family or name
+        self.model_name = model_name
+        self.download_root = download_root
+        self.priority = priority
+        self.quantize = quantize if quantize in ("int8",) else None
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.streaming = streaming
+        self.defaults = self.options(defaults)
+        self.pool = ModelPool(self._load_model, rss_budget_mb=rss_budget_mb, max_models=max_models)
+
+    @property
+    def model(self):
+        """The default model if it is resident, else None."""
+        return self.pool.models.get(self.model_name)
+
+    def run_profile(self, options):
+        model_name = options.get("model_name") or self.model_name
+        model = f"{model_name}-{self.quantize}" if self.quantize else model_name
+        return model, options.get("threads") or self.intra_op_threads
+
+    def fingerprint(self):
+        if importlib.util.find_spec("whisper") is None:
+            return None
+        return f"openai-whisper {_installed_version('openai-whisper')}|{self.model_name}|{self.quantize or 'fp32'}"
+
+    def probe(self):
+        try:
+            import whisper
+        except Exception as e:
+            return {"available": False, "error": str(e)}
+        return {"available": hasattr(whisper, "load_model"),
+                "version": getattr(whisper, "__version__", None) or _installed_version('openai-whisper')}
+
+    def _load_model(self, model_name):
+        import whisper
+        # A background preload must not undo the count a worker pinned
+        configure_torch_threads(self.intra_op_threads, self.inter_op_threads, override=False)
+        kwargs = {}
+        if self.download_root:
+            Path(self.download_root).mkdir(parents=True, exist_ok=True)
+            kwargs["download_root"] = str(self.download_root)
+        if self.quantize:
+            kwargs["device"] = "cpu"
+        model = whisper.load_model(model_name, **kwargs)
+        if self.quantize == "int8":
+            model = quantize_dynamic_int8(model)
+        return model
+
+    def load(self, model_name=None):
+        """Returns the model from the pool, loading it if needed."""
+        return self.pool.get(model_name or self.model_name)
+
+    def preload(self, model_name=None):
+        """Starts loading a model in the background (no-op if it is resident)."""
+        return self.pool.preload(model_name or self.model_name)
+
+    def is_loaded(self, model_name=None):
+        return (model_name or self.model_name) in self.pool
+
+    def transcribe(self, audio_path, output_base, language="es", prompt=None, capabilities=None, **options):
+        options = self.options(options)
+        model_name = options.pop("model_name") or self.model_name
+        configure_torch_threads(options.pop("threads") or self.intra_op_threads, self.inter_op_threads)
+        if self.quantize:
+            options["fp16"] = False  # int8 kernels are CPU only
+        try:
+            model = self.load(model_name)
+        except Exception as e:
+            raise EngineError(f"Failed to load OpenAI model '{model_name}': {e}")
+        try:
+            if self.streaming and Path(audio_path).suffix.lower() in self.STREAMING_SUFFIXES:
+                options.pop("word_timestamps", None)
+                result = WindowedWhisperTranscriber(model, language=language, initial_prompt=prompt,
+                                                    **options).transcribe(audio_path)
+            else:
+                result = model.transcribe(str(audio_path), language=language, initial_prompt=prompt,
+                                          verbose=False, **options)
+        except Exception as e:
+            raise EngineError(f"OpenAI Whisper error: {e}")
+        return {"text": result["text"].strip(), "segments": result.get("segments", []),
+                "language": result.get("language", language)}
+
+    def transcribe_batch(self, sources, language="es", prompt=None, capabilities=None, batch_size=8, **options):
+        """
+        Batched decode of [(key, path, start_seconds, end_seconds)] WAV/FLAC
+        sources; returns {key: {"text", "segments", "language"}}.
+        """
+        options = self.options(options)
+        model_name = options.pop("model_name") or self.model_name
+        configure_torch_threads(options.pop("threads") or self.intra_op_threads, self.inter_op_threads)
+        options.pop("word_timestamps", None)
+        if self.quantize:
+            options["fp16"] = False
+        unsupported = [path for _, path, _, _ in sources if Path(path).suffix.lower() not in self.STREAMING_SUFFIXES]
+        if unsupported:
+            raise EngineError(f"Batched decoding needs WAV/FLAC input: {Path(unsupported[0]).name}")
+        try:
+            model = self.load(model_name)
+        except Exception as e:
+            raise EngineError(f"Failed to load OpenAI model '{model_name}': {e}")
+        transcriber = BatchedWhisperTranscriber(model, batch_size=batch_size, language=language,
+                                                initial_prompt=prompt, **options)
+        try:
+            results = transcriber.transcribe_many(sources)
+        except Exception as e:
+            raise EngineError(f"OpenAI Whisper batch error: {e}")
+        for result in results.values():
+            result["text"] = result["text"].strip()
+            result["batch_stats"] = dict(transcriber.stats)
+        return results
+
+
+class EngineRegistry:
+    """
+    The engines known to this process and what each one can do.
+
+    capabilities(name) runs an engine's probe at most once per installed
+    version: results are kept in memory and in a JSON file next to the
+    transcription cache, keyed by the engine fingerprint (binary path,
+    size and mtime, model file, package version). Replacing a binary or a
+    model changes the fingerprint and triggers a new probe; everything else
+    is a stat() call.
+
+    With a PerformanceHistory every run is logged (engine, model, threads,
+    audio length, wall time, outcome), and engines with a "timeout" option
+    get one scaled to the audio length unless the caller passes it.
+    """
+    def __init__(self, cache_path=None, history=None):
+        self.engines = {}
+        self.history = history
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._probed = {}  # name -> (fingerprint, capabilities)
+        self._lock = threading.Lock()
+
+    def register(self, engine):
+        self.engines[engine.name] = engine
+        return engine
+
+    def get(self, name):
+        return self.engines.get(name)
+
+    def _load_disk(self):
+        if self.cache_path is None:
+            return {}
+        try:
+            return json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_disk(self, name, fingerprint, capabilities):
+        if self.cache_path is None:
+            return
+        stored = self._load_disk()  # other processes may have probed other engines
+        stored[name] = {"fingerprint": fingerprint, "capabilities": capabilities, "probed_at": time.time()}
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(stored, indent=2))
+        os.replace(tmp, self.cache_path)
+
+    def capabilities(self, name):
+        """Capabilities of an engine ({"available": False} when it is not installed)."""
+        engine = self.engines.get(name)
+        if engine is None:
+            return {"available": False, "error": "unknown engine"}
+        fingerprint = engine.fingerprint()
+        if fingerprint is None:
+            return {"available": False, "error": "not installed"}
+
+        with self._lock:
+            cached = self._probed.get(name)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+            stored = self._load_disk().get(name)
+            if stored and stored.get("fingerprint") == fingerprint:
+                capabilities = stored["capabilities"]
+            else:
+                capabilities = engine.probe()
+                self._save_disk(name, fingerprint, capabilities)
+            self._probed[name] = (fingerprint, capabilities)
+            return capabilities
+
+    def is_available(self, name):
+        return bool(self.capabilities(name).get("available"))
+
+    def available(self):
+        """Installed engines, best first."""
+        return sorted((e for e in self.engines.values() if self.is_available(e.name)),
+                      key=lambda e: e.priority)
+
+    @staticmethod
+    def audio_seconds(audio_path):
+        """Duration of a recording from its header, or None if it cannot be read."""
+        try:
+            rate, _, frames = audio_info(audio_path)
+            return frames / float(rate)
+        except Exception:
+            return None
+
+    def estimate(self, name, audio_seconds, **options):
+        """Predicted processing time of `name` for `audio_seconds` (see PerformanceHistory.estimate)."""
+        engine = self.engines.get(name)
+        if engine is None or self.history is None or not audio_seconds:
+            return None
+        model, threads = engine.run_profile(engine.options(options))
+        return self.history.estimate(name, model, threads, audio_seconds)
+
+    def _record(self, name, model, threads, audio_seconds, started, outcome, **extra):
+        if self.history is None:
+            return
+        try:
+            self.history.record(name, model, threads, audio_seconds, time.time() - started, outcome, **extra)
+        except OSError as e:
+            print(f"[EngineRegistry] ⚠️ Could not write performance history: {e}")
+
+    def transcribe(self, name, audio_path, output_base, language="es", prompt=None, **options):
+        """Runs one engine; returns its result with "engine"/"processing_time" added. Raises EngineError."""
+        engine = self.engines[name]
+        capabilities = self.capabilities(name)
+        if not capabilities.get("available"):
+            raise EngineError(f"{name} not available: {capabilities.get('error', 'probe failed')}")
+        model, threads = engine.run_profile(engine.options(options))
+        audio_seconds = self.audio_seconds(audio_path) if self.history is not None else None
+        if self.history is not None and "timeout" in engine.defaults and options.get("timeout") is None:
+            options["timeout"] = self.history.timeout_for(name, model, threads, audio_seconds)
+        started = time.time()
+        outcome = "error"
+        try:
+            result = engine.transcribe(audio_path, output_base, language=language, prompt=prompt,
+                                       capabilities=capabilities, **options)
+            outcome = "success"
+        except EngineTimeout:
+            outcome = "timeout"
+            raise
+        finally:
+            self._record(name, model, threads, audio_seconds, started, outcome,
+                         **({"timeout": options["timeout"]} if "timeout" in options else {}))
+        result["engine"] = engine.family
+        result["engine_name"] = name
+        result["processing_time"] = time.time() - started
+        return result
+
+    def transcribe_batch(self, name, sources, language="es", prompt=None, **options):
+        """Batched decode on an engine that has transcribe_batch(); returns {key: result}. Raises EngineError."""
+        engine = self.engines[name]
+        if not hasattr(engine, "transcribe_batch"):
+            raise EngineError(f"{name} has no batched decoding")
+        capabilities = self.capabilities(name)
+        if not capabilities.get("available"):
+            raise EngineError(f"{name} not available: {capabilities.get('error', 'probe failed')}")
+        model, threads = engine.run_profile(engine.options(options))
+        audio_seconds = None
+        if self.history is not None:
+            durations = [(end if end is not None else self.audio_seconds(path) or 0.0) - start
+                         for _, path, start, end in sources]
+            audio_seconds = sum(durations)
+        started = time.time()
+        outcome = "error"
+        try:
+            results = engine.transcribe_batch(sources, language=language, prompt=prompt,
+                                              capabilities=capabilities, **options)
+            outcome = "success"
+        finally:
+            self._record(name, model, threads, audio_seconds, started, outcome,
+                         streams=len(sources), batch_size=options.get("batch_size"))
+        for result in results.values():
+            result["engine"] = engine.family
+            result["engine_name"] = name
+        return results
+
+    def status(self):
+        return {name: self.capabilities(name) for name in self.engines}
+
+
+def build_registry(settings=None, hardware=None):
+    """
+    Registry with the engines described in transcription_settings.engines;
+    `hardware` is the whisper_cpp_optimized profile (thread counts).
+    """
+    settings = settings or {}
+    hardware = hardware or {}
+    binaries = settings.get('binaries', {}) or {}
+    models_dir = Path(settings.get('models_dir', '/home/byte/whisper_models'))
+    model_path = models_dir / settings.get('model', 'ggml-base.bin')
+
+    history_settings = settings.get('history', {}) or {}
+    history = None
+    if history_settings.get('enabled', True):
+        history = PerformanceHistory(
+            history_settings.get('path', 'recordings/cache/performance_history.jsonl'),
+            max_records=int(history_settings.get('max_records', 5000)),
+            default_rtf=history_settings.get('default_rtf'),
+            timeout_margin=float(history_settings.get('timeout_margin', 3.0)),
+            overhead_seconds=float(history_settings.get('overhead_seconds', 15)),
+            min_timeout=float(history_settings.get('min_timeout_seconds', 60)),
+            max_timeout=float(history_settings.get('max_timeout_seconds', 3 * 3600))
+        )
+
+    registry = EngineRegistry(settings.get('capability_cache', 'recordings/cache/engine_capabilities.json'),
+                              history=history)
+    registry.register(ResidentWhisperCppEngine("whisper-amd-resident", model_path, priority=5, family="whisper-amd"))
+    registry.register(WhisperCppCliEngine("whisper-amd", binaries.get('whisper-amd', '/usr/local/bin/whisper-amd'),
+                                          model_path, priority=10))
+    registry.register(WhisperCppCliEngine("whisper-cpp", binaries.get('whisper-cpp', 'whisper'),
+                                          model_path, priority=20))
+    pool = settings.get('openai_pool', {}) or {}
+    runtime = settings.get('openai_runtime', {}) or {}
+    registry.register(OpenAIWhisperEngine("openai-whisper", settings.get('openai_model', 'base'),
+                                          download_root=settings.get('openai_download_root'), priority=30,
+                                          rss_budget_mb=pool.get('rss_budget_mb'),
+                                          max_models=int(pool.get('max_models', 3)),
+                                          quantize=runtime.get('quantize'),
+                                          intra_op_threads=runtime.get('intra_op_threads') or hardware.get('threads'),
+                                          inter_op_threads=runtime.get('inter_op_threads', 1),
+                                          streaming=bool(runtime.get('streaming', False))))
+    return registry
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_engine_registry(settings=None, hardware=None):
+    """Process-wide registry per engine settings, shared by every agent."""
+    key = json.dumps([settings or {}, hardware or {}], sort_keys=True, default=str)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = build_registry(settings, hardware)
+        return _registries[key]
@@ -0,0 +1,227 @@
+"""Live captions while recording: sliding-window decoding with stable-prefix commit."""
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+from mcp.audio_dsp import StreamingResampler, pcm16_to_float
+from mcp.vad import WHISPER_SAMPLE_RATE
+
+
+def _norm(word):
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def _segment_words(segments, offset):
+    """Splits decoded segments into (start, end, word), spreading each segment's time by word length."""
+    words = []
+    for segment in segments:
+        tokens = segment["text"].split()
+        if not tokens:
+            continue
+        span = max(0.0, segment["end"] - segment["start"])
+        weights = np.cumsum([0] + [len(t) + 1 for t in tokens], dtype=np.float64)
+        edges = segment["start"] + span * weights / weights[-1]
+        for token, start, end in zip(tokens, edges[:-1], edges[1:]):
+            words.append((offset + float(start), offset + float(end), token))
+    return words
+
+
+class LiveTranscriber:
+    """
+    Streaming transcription fed with captured PCM chunks.
+
+    A worker thread decodes the uncommitted audio (at most `window_seconds`)
+    every `step_seconds` with a resident model. Words are committed only when
+    two consecutive windows agree on them (longest common prefix), so the
+    committed transcript never changes afterwards; the rest is exposed as a
+    partial hypothesis. The audio buffer is trimmed at the last committed
+    word, which keeps every decode short.
+
+    Updates go to `on_update(event)` and to the updates() generator. Events
+    are dicts with "type" ("commit" or "partial"), "text", "start", "end" and
+    "latency" (seconds from the end of the audio to the commit).
+    """
+    def __init__(self, backend, sample_rate=WHISPER_SAMPLE_RATE, channels=1, language="es",
+                 initial_prompt=None, window_seconds=15.0, step_seconds=2.0,
+                 on_update=None, transcript_path=None):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.language = language
+        self.initial_prompt = initial_prompt or ""
+        self.window_seconds = window_seconds
+        self.step_seconds = step_seconds
+        self.on_update = on_update
+        self.transcript_path = transcript_path
+
+        self.resampler = StreamingResampler(sample_rate, WHISPER_SAMPLE_RATE, in_channels=channels) \
+            if sample_rate != WHISPER_SAMPLE_RATE or channels != 1 else None
+        self._incoming = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+
+        self._audio = np.zeros(0, dtype=np.float32)
+        self._audio_start = 0.0   # recording time of self._audio[0]
+        self._received = 0.0      # seconds of audio received so far
+        self._taken_at = time.time()
+        self._hypothesis = []     # (start, end, word) not yet agreed on
+        self.committed = []       # (start, end, word)
+        self.committed_until = 0.0
+        self.segments = []
+        self.latencies = []
+        self.windows = 0
+        self.decode_time = 0.0
+        self._events = queue.Queue()
+        self._transcript_file = open(transcript_path, 'w', encoding='utf-8') if transcript_path else None
+
+        self._thread = threading.Thread(target=self._work, name="LiveTranscriber", daemon=True)
+        self._thread.start()
+
+    def feed(self, data):
+        """Chunk listener for RecordingAgent: only queues the bytes."""
+        with self._lock:
+            self._incoming.append(data)
+        self._wake.set()
+
+    def _take_incoming(self):
+        with self._lock:
+            pending, self._incoming = self._incoming, []
+        if not pending:
+            return
+        data = b''.join(pending)
+        if self.resampler is not None:
+            samples = self.resampler.process_float(pcm16_to_float(data, self.channels).mean(axis=1))
+        else:
+            samples = pcm16_to_float(data, 1)[:, 0]
+        self._audio = np.concatenate((self._audio, samples))
+        self._received = self._audio_start + len(self._audio) / float(WHISPER_SAMPLE_RATE)
+        self._taken_at = time.time()
+
+    def _work(self):
+        decoded_until = 0.0
+        while True:
+            self._wake.wait(self.step_seconds)
+            self._wake.clear()
+            stopping = self._stop
+            self._take_incoming()
+            if stopping:
+                self._decode(final=True)
+                break
+            if self._received - decoded_until >= self.step_seconds:
+                decoded_until = self._received
+                self._decode()
+        self._events.put(None)
+
+    def _decode(self, final=False):
+        if len(self._audio) < WHISPER_SAMPLE_RATE // 2:
+            if final:
+                self._commit(self._hypothesis)
+            return
+        prompt = (self.initial_prompt + " " + " ".join(w for _, _, w in self.committed[-40:])).strip()
+        started = time.time()
+        segments = self.backend.transcribe_pcm(self._audio, language=self.language, initial_prompt=prompt or None)
+        self.decode_time += time.time() - started
+        self.windows += 1
+
+        words = [w for w in _segment_words(segments, self._audio_start)
+                 if (w[0] + w[1]) / 2 >= self.committed_until]
+        words = self._drop_repeated(words)
+
+        if final:
+            self._commit(words)
+            return
+
+        # Local agreement: the prefix both hypotheses share is stable
+        agreed = 0
+        while agreed < min(len(words), len(self._hypothesis)) and \
+                _norm(words[agreed][2]) == _norm(self._hypothesis[agreed][2]):
+            agreed += 1
+        self._commit(words[:agreed])
+        self._hypothesis = words[agreed:]
+
+        buffered = len(self._audio) / float(WHISPER_SAMPLE_RATE)
+        if buffered > self.window_seconds and self.committed_until <= self._audio_start:
+            # Nothing stable for a whole window: commit what the older half says
+            horizon = self._received - self.window_seconds / 2
+            forced = [w for w in self._hypothesis if w[1] <= horizon]
+            self._commit(forced)
+            self._hypothesis = self._hypothesis[len(forced):]
+        if buffered > self.window_seconds or self.committed_until - self._audio_start > self.step_seconds:
+            self._trim(max(self.committed_until, self._received - self.window_seconds))
+
+        if self._hypothesis:
+            self._emit({"type": "partial", "text": " ".join(w for _, _, w in self._hypothesis),
+                        "start": self._hypothesis[0][0], "end": self._hypothesis[-1][1], "latency": None})
+
+    def _drop_repeated(self, words, max_words=6):
+        """Removes leading words that repeat the tail of the committed text."""
+        tail = [_norm(w) for _, _, w in self.committed[-max_words:]]
+        head = [_norm(w) for _, _, w in words]
+        for n in range(min(len(tail), len(head)), 1, -1):
+            if tail[-n:] == head[:n]:
+                return words[n:]
+        return words
+
+    def _trim(self, cut):
+        drop = int((cut - self._audio_start) * WHISPER_SAMPLE_RATE)
+        if drop > 0:
+            self._audio = self._audio[drop:]
+            self._audio_start += drop / float(WHISPER_SAMPLE_RATE)
+
+    def _commit(self, words):
+        if not words:
+            return
+        self.committed.extend(words)
+        self.committed_until = words[-1][1]
+        text = " ".join(w for _, _, w in words)
+        latency = round(self._received - words[-1][1] + time.time() - self._taken_at, 2)
+        self.latencies.append(latency)
+        self.segments.append({"start": round(words[0][0], 3), "end": round(words[-1][1], 3), "text": text})
+        if self._transcript_file is not None:
+            self._transcript_file.write(text + " ")
+            self._transcript_file.flush()
+        self._emit({"type": "commit", "text": text, "start": words[0][0], "end": words[-1][1], "latency": latency})
+
+    def _emit(self, event):
+        self._events.put(event)
+        if self.on_update is not None:
+            try:
+                self.on_update(event)
+            except Exception as e:
+                print(f"[LiveTranscriber] Update callback error: {e}")
+
+    def updates(self):
+        """Generator over commit/partial events; ends after finish()."""
+        while True:
+            event = self._events.get()
+            if event is None:
+                break
+            yield event
+
+    @property
+    def text(self):
+        return " ".join(w for _, _, w in self.committed)
+
+    def finish(self):
+        """Decodes what is left, commits it and returns the live transcript."""
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+        if self._transcript_file is not None:
+            self._transcript_file.close()
+            self._transcript_file = None
+        latencies = np.array(self.latencies or [0.0])
+        return {
+            "text": self.text,
+            "segments": list(self.segments),
+            "windows": self.windows,
+            "decode_time": round(self.decode_time, 2),
+            "audio_seconds": round(self._received, 2),
+            "latency_median": round(float(np.median(latencies)), 2),
+            "latency_p90": round(float(np.percentile(latencies, 90)), 2),
+            "transcript_file": str(self.transcript_path) if self.transcript_path else None
+        }
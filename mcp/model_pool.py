@@ -0,0 +1,110 @@
+"""Process-wide pool of loaded models with background preload and an RSS budget."""
+import gc
+import threading
+import time
+from collections import OrderedDict
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc), or None elsewhere."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class ModelPool:
+    """
+    Keeps loaded models by name ("tiny", "base", "small", ...) in LRU order.
+
+    get(name) returns a resident model or loads it; concurrent callers for
+    the same name wait for one load. After every load the least recently
+    used models are dropped until the process RSS is back under
+    `rss_budget_mb` (the model just loaded always stays) or only
+    `max_models` remain. preload(name) does the load on a background
+    thread so it is off the critical path.
+    """
+    def __init__(self, loader, rss_budget_mb=None, max_models=3):
+        self.loader = loader
+        self.rss_budget_mb = rss_budget_mb
+        self.max_models = max(1, max_models)
+        self.models = OrderedDict()
+        self._loading = {}  # name -> Event of the load in progress
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0, "load_seconds": {}}
+
+    def __contains__(self, name):
+        return name in self.models
+
+    def get(self, name):
+        while True:
+            with self._lock:
+                if name in self.models:
+                    self.models.move_to_end(name)
+                    self.stats["hits"] += 1
+                    return self.models[name]
+                loading = self._loading.get(name)
+                if loading is None:
+                    loading = self._loading[name] = threading.Event()
+                    break
+            # Someone else is loading it; take theirs (or retry if it failed)
+            loading.wait()
+
+        try:
+            started = time.time()
+            model = self.loader(name)
+            with self._lock:
+                self.models[name] = model
+                self.stats["loads"] += 1
+                self.stats["load_seconds"][name] = round(time.time() - started, 2)
+            self._evict(keep=name)
+            return model
+        finally:
+            with self._lock:
+                self._loading.pop(name).set()
+
+    def _evict(self, keep):
+        while True:
+            with self._lock:
+                candidates = [n for n in self.models if n != keep]
+                if not candidates:
+                    return
+                rss = current_rss_mb()
+                over_budget = self.rss_budget_mb is not None and rss is not None and rss > self.rss_budget_mb
+                if not over_budget and len(self.models) <= self.max_models:
+                    return
+                victim = candidates[0]
+                del self.models[victim]
+                self.stats["evictions"] += 1
+            print(f"[ModelPool] Evicted '{victim}' (RSS {rss:.0f} MB)" if rss is not None
+                  else f"[ModelPool] Evicted '{victim}'")
+            gc.collect()
+
+    def preload(self, name):
+        """Loads `name` on a daemon thread; returns the thread (None if already resident)."""
+        if name in self.models:
+            return None
+
+        def load():
+            try:
+                self.get(name)
+                print(f"[ModelPool] Preloaded '{name}' in {self.stats['load_seconds'].get(name, 0.0):.1f}s")
+            except Exception as e:
+                print(f"[ModelPool] Could not preload '{name}': {e}")
+
+        thread = threading.Thread(target=load, name=f"preload-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        rss = current_rss_mb()
+        return {
+            "models": list(self.models),
+            "rss_mb": round(rss, 1) if rss is not None else None,
+            "rss_budget_mb": self.rss_budget_mb,
+            **self.stats
+        }
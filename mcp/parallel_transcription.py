@@ -0,0 +1,145 @@
+"""Splitting long recordings at pauses and merging the per-chunk transcripts."""
+import re
+from pathlib import Path
+
+import numpy as np
+
+from mcp.audio_dsp import StreamingResampler
+from mcp.audio_io import StreamingWavWriter, audio_info, iter_pcm_blocks
+from mcp.vad import WHISPER_SAMPLE_RATE, detect_speech_regions
+
+
+def plan_chunks(path, chunk_seconds=300.0, overlap_seconds=2.0, search_seconds=20.0, **vad_params):
+    """
+    Cuts the recording into chunks of about `chunk_seconds`. Each cut goes in
+    the longest pause found within +/- `search_seconds` of the target (or
+    exactly at the target if there is none). Every chunk is extended by
+    `overlap_seconds` on both sides so words at a forced cut are not lost.
+
+    Returns [{"index", "start", "end", "core_start", "core_end"}, ...]; the
+    core ranges tile the recording without overlap and decide which chunk
+    owns each transcribed segment.
+    """
+    rate, _, frames = audio_info(path)
+    total = frames / float(rate)
+    cuts = []
+    if total > chunk_seconds * 1.5:
+        regions = detect_speech_regions(path, **vad_params)
+        gaps = [(end, start) for (_, end), (start, _) in zip(regions, regions[1:])]
+        last = 0.0
+        while total - last > chunk_seconds * 1.5:
+            target = last + chunk_seconds
+            lo, hi = target - search_seconds, target + search_seconds
+            window = [(max(a, lo), min(b, hi)) for a, b in gaps if b > lo and a < hi]
+            if window:
+                a, b = max(window, key=lambda g: (g[1] - g[0], -abs((g[0] + g[1]) / 2 - target)))
+                cut = (a + b) / 2
+            else:
+                cut = target
+            cuts.append(cut)
+            last = cut
+
+    bounds = [0.0] + cuts + [total]
+    return [{
+        "index": i,
+        "start": round(max(0.0, bounds[i] - overlap_seconds) if i else 0.0, 3),
+        "end": round(min(total, bounds[i + 1] + overlap_seconds), 3),
+        "core_start": round(bounds[i], 3),
+        "core_end": round(bounds[i + 1], 3)
+    } for i in range(len(bounds) - 1)]
+
+
+def extract_chunks(src_path, chunks, out_dir):
+    """
+    Writes every chunk as a 16 kHz mono WAV in one pass over the source.
+    Chunks overlap, so a block may feed two writers. Returns the paths in order.
+    """
+    rate, channels, _ = audio_info(src_path)
+    resampler = StreamingResampler(rate, WHISPER_SAMPLE_RATE, in_channels=channels) \
+        if rate != WHISPER_SAMPLE_RATE or channels != 1 else None
+    out_dir = Path(out_dir)
+    paths = [out_dir / f"{Path(src_path).stem}_chunk{c['index']:03d}.wav" for c in chunks]
+    bounds = [(int(c["start"] * WHISPER_SAMPLE_RATE), int(c["end"] * WHISPER_SAMPLE_RATE)) for c in chunks]
+    writers = {}
+    position = 0  # output samples produced so far
+
+    for block in iter_pcm_blocks(src_path):
+        if resampler is not None:
+            samples = resampler.process(block)
+        else:
+            samples = block
+        data = np.frombuffer(samples, dtype=np.int16)
+        block_end = position + len(data)
+        for i, (start, end) in enumerate(bounds):
+            if start >= block_end or end <= position:
+                continue
+            if i not in writers:
+                writers[i] = StreamingWavWriter(paths[i], 1, 2, WHISPER_SAMPLE_RATE)
+            writers[i].write(data[max(start, position) - position:min(end, block_end) - position].tobytes())
+            if end <= block_end:
+                writers.pop(i).close()
+        position = block_end
+
+    for writer in writers.values():
+        writer.close()
+    return paths
+
+
+def _words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def _trim_repeated_prefix(previous_text, text, min_words=3, max_words=20):
+    """
+    Drops the start of `text` when it repeats the end of `previous_text`
+    (the same words decoded twice inside an overlap). Comparison is on
+    lower-cased words; the original spelling of what remains is kept.
+    """
+    prev_words = _words(previous_text)[-max_words:]
+    tokens = text.split()
+    token_words = [_words(t) for t in tokens]
+    flat = [w for ws in token_words for w in ws]
+    for n in range(min(len(prev_words), len(flat)), min_words - 1, -1):
+        if prev_words[-n:] == flat[:n]:
+            # Skip whole tokens until n words are consumed
+            consumed, k = 0, 0
+            while k < len(tokens) and consumed < n:
+                consumed += len(token_words[k])
+                k += 1
+            return " ".join(tokens[k:])
+    return text
+
+
+def merge_chunk_segments(chunk_segments):
+    """
+    Merges per-chunk segments (times relative to each chunk's audio) into
+    one list on the recording timeline. A segment is kept only by the chunk
+    whose core range contains its midpoint; words repeated across the cut
+    are removed from the later segment.
+
+    Args:
+        chunk_segments: list of (chunk, segments) as returned by plan_chunks
+                        and the engines
+    """
+    merged = []
+    ordered = sorted(chunk_segments, key=lambda item: item[0]["index"])
+    last_index = ordered[-1][0]["index"] if ordered else 0
+    for chunk, segments in ordered:
+        for segment in segments:
+            text = segment.get("text", "").strip()
+            if not text:
+                continue
+            start = segment.get("start", 0.0) + chunk["start"]
+            end = segment.get("end", segment.get("start", 0.0)) + chunk["start"]
+            middle = (start + end) / 2
+            in_core = chunk["core_start"] <= middle < chunk["core_end"] or \
+                (chunk["index"] == last_index and middle >= chunk["core_start"])
+            if not in_core:
+                continue
+            if merged and start < merged[-1]["end"] + 1.0:
+                text = _trim_repeated_prefix(merged[-1]["text"], text)
+                if not text:
+                    continue
+                start = max(start, merged[-1]["end"])
+            merged.append({"start": round(start, 3), "end": round(max(end, start), 3), "text": text})
+    return merged
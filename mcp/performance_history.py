@@ -0,0 +1,170 @@
+"""Persistent log of transcription runs, used to predict processing time, ETAs and timeouts."""
+import json
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class PerformanceHistory:
+    """
+    Append-only JSONL file with one line per engine run: engine, model,
+    threads, audio seconds, wall seconds, real-time factor (wall / audio)
+    and outcome ("success", "error", "timeout"). Every process appends to
+    the same file (pool and race workers included); each line is a single
+    O_APPEND write, so lines never interleave.
+
+    Predictions use the RTF of the latest `window` successful runs of the
+    same engine and model, with the same thread count when there are at
+    least `min_samples` of those. ETAs take the median; timeouts take the
+    90th percentile times `timeout_margin`, plus `overhead_seconds` for
+    process start and model load, clamped to [min_timeout, max_timeout].
+    Without history the engine's `default_rtf` is used.
+    """
+    OUTCOMES = ("success", "error", "timeout")
+
+    def __init__(self, path, max_records=5000, window=50, min_samples=3, default_rtf=None,
+                 timeout_margin=3.0, overhead_seconds=15.0, min_timeout=60.0, max_timeout=3 * 3600.0):
+        self.path = Path(path) if path else None
+        self.max_records = max(100, int(max_records))
+        self.window = max(1, int(window))
+        self.min_samples = max(1, int(min_samples))
+        self.default_rtf = dict(default_rtf or {})
+        self.timeout_margin = float(timeout_margin)
+        self.overhead_seconds = float(overhead_seconds)
+        self.min_timeout = float(min_timeout)
+        self.max_timeout = float(max_timeout)
+        self._records = []
+        self._loaded_size = None  # file size the records were read at
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        """Re-reads the file when another process has appended to it."""
+        if self.path is None:
+            return
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            self._records, self._loaded_size = [], None
+            return
+        if size == self._loaded_size:
+            return
+        records = []
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # Truncated line from a killed process
+        self._records, self._loaded_size = records[-self.max_records:], size
+
+    def record(self, engine, model, threads, audio_seconds, wall_seconds, outcome="success", **extra):
+        """Appends one run; returns the stored record."""
+        entry = {
+            "time": round(time.time(), 1),
+            "engine": engine,
+            "model": model,
+            "threads": threads,
+            "audio_seconds": round(float(audio_seconds), 2) if audio_seconds else None,
+            "wall_seconds": round(float(wall_seconds), 3),
+            "rtf": round(wall_seconds / audio_seconds, 4) if audio_seconds else None,
+            "outcome": outcome if outcome in self.OUTCOMES else "error",
+            **extra
+        }
+        if self.path is None:
+            self._records.append(entry)
+            return entry
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+            fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            self._reload()
+            if len(self._records) >= self.max_records:
+                self._compact()
+        return entry
+
+    def _compact(self):
+        """Keeps the newest half of max_records so the file does not grow forever."""
+        keep = self._records[-(self.max_records // 2):]
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for entry in keep:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        self._records, self._loaded_size = keep, self.path.stat().st_size
+
+    def rtf_samples(self, engine, model=None, threads=None):
+        """RTFs of the latest successful runs that match, most specific match first."""
+        with self._lock:
+            self._reload()
+            runs = [r for r in self._records
+                    if r.get("engine") == engine and r.get("outcome") == "success" and r.get("rtf")]
+        if model is not None:
+            runs = [r for r in runs if r.get("model") == model]
+        same_threads = [r for r in runs if r.get("threads") == threads]
+        if threads is not None and len(same_threads) >= self.min_samples:
+            runs = same_threads
+        return [r["rtf"] for r in runs[-self.window:]]
+
+    def estimate(self, engine, model, threads, audio_seconds):
+        """
+        Predicted processing time for `audio_seconds` of audio:
+        {"seconds", "p90_seconds", "rtf", "p90_rtf", "samples", "source"}
+        where source is "history" or "default".
+        """
+        samples = self.rtf_samples(engine, model, threads)
+        if len(samples) >= self.min_samples:
+            rtf, p90, source = statistics.median(samples), _percentile(samples, 0.9), "history"
+        else:
+            rtf = p90 = float(self.default_rtf.get(engine, 1.0))
+            source = "default"
+        return {
+            "seconds": round(audio_seconds * rtf + self.overhead_seconds, 1),
+            "p90_seconds": round(audio_seconds * p90 + self.overhead_seconds, 1),
+            "rtf": round(rtf, 3),
+            "p90_rtf": round(p90, 3),
+            "samples": len(samples),
+            "source": source
+        }
+
+    def timeout_for(self, engine, model, threads, audio_seconds):
+        """Timeout in seconds for a run, scaled to the audio length and clamped to the bounds."""
+        if not audio_seconds:
+            return int(self.max_timeout)
+        p90_rtf = self.estimate(engine, model, threads, audio_seconds)["p90_rtf"]
+        timeout = audio_seconds * p90_rtf * self.timeout_margin + self.overhead_seconds
+        return int(min(self.max_timeout, max(self.min_timeout, timeout)))
+
+    def summary(self):
+        """Per engine/model/threads: runs, success rate, median RTF and audio hours processed."""
+        with self._lock:
+            self._reload()
+            records = list(self._records)
+        groups = {}
+        for r in records:
+            groups.setdefault((r.get("engine"), r.get("model"), r.get("threads")), []).append(r)
+        summary = []
+        for (engine, model, threads), runs in sorted(groups.items(), key=lambda item: str(item[0])):
+            rtfs = [r["rtf"] for r in runs if r.get("outcome") == "success" and r.get("rtf")]
+            summary.append({
+                "engine": engine,
+                "model": model,
+                "threads": threads,
+                "runs": len(runs),
+                "success_rate": round(sum(r.get("outcome") == "success" for r in runs) / float(len(runs)), 3),
+                "timeouts": sum(r.get("outcome") == "timeout" for r in runs),
+                "median_rtf": round(statistics.median(rtfs), 3) if rtfs else None,
+                "audio_hours": round(sum(r.get("audio_seconds") or 0 for r in runs) / 3600.0, 2)
+            })
+        return summary
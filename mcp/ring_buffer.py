@@ -0,0 +1,68 @@
+"""Preallocated single-producer/single-consumer ring buffer for audio bytes."""
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size byte ring shared between the PortAudio callback (producer)
+    and a drain thread (consumer).
+
+    No locks are taken: the producer only ever advances `write_pos` and the
+    consumer only ever advances `read_pos`, both monotonically, and each
+    position is published after its bytes have been copied. Under the GIL an
+    integer assignment is atomic, so neither side can observe a torn update.
+    When the consumer falls behind, incoming chunks are dropped whole and
+    counted instead of overwriting audio that has not been read yet.
+    """
+    def __init__(self, capacity_bytes, frame_size=2):
+        # Keep the capacity a whole number of frames so samples never split
+        capacity_bytes -= capacity_bytes % frame_size
+        if capacity_bytes <= 0:
+            raise ValueError("Ring buffer capacity must hold at least one frame")
+        self.capacity = capacity_bytes
+        self.frame_size = frame_size
+        self._buffer = bytearray(capacity_bytes)
+        self._view = memoryview(self._buffer)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.dropped_chunks = 0
+        self.dropped_frames = 0
+
+    def available(self):
+        """Bytes written but not yet consumed."""
+        return self.write_pos - self.read_pos
+
+    def free(self):
+        return self.capacity - self.available()
+
+    def write(self, data):
+        """Producer side. Returns False (and counts the loss) if the chunk does not fit."""
+        size = len(data)
+        if size > self.free():
+            self.dropped_chunks += 1
+            self.dropped_frames += size // self.frame_size
+            return False
+
+        start = self.write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if first < size:
+            self._view[0:size - first] = data[first:]
+        self.write_pos += size
+        return True
+
+    def read(self, max_bytes=None):
+        """Consumer side. Returns up to `max_bytes` whole frames, or b'' when empty."""
+        size = self.available()
+        if max_bytes is not None:
+            size = min(size, max_bytes)
+        size -= size % self.frame_size
+        if size <= 0:
+            return b''
+
+        start = self.read_pos % self.capacity
+        first = min(size, self.capacity - start)
+        data = bytes(self._view[start:start + first])
+        if first < size:
+            data += bytes(self._view[0:size - first])
+        self.read_pos += size
+        return data
@@ -0,0 +1,89 @@
+"""Per-segment quality flags and splicing re-decoded time ranges into a transcript."""
+import re
+
+# Tags whisper emits instead of speech: "[Música]", "(música de fondo)", "Music.", "♪ ♪"
+_MUSIC_TAG = re.compile(r"^([\[\(\*][^\]\)]*\b(música|musica|music|aplausos|applause)\b[^\]\)]*[\]\)\*]"
+                        r"|(música|musica|music)\W*)$", re.IGNORECASE)
+# Typical hallucinations on silence or noise (YouTube subtitle credits)
+_HALLUCINATIONS = ("amara.org", "suscríbete", "subtítulos realizados por", "gracias por ver el video",
+                   "thanks for watching")
+
+
+def _is_repetition(text, min_repeats=5):
+    """A word or short phrase looped over and over (decoder stuck)."""
+    words = re.findall(r"\w+", text.lower())
+    for size in (1, 2, 3):
+        for i in range(0, max(0, len(words) - size * min_repeats + 1)):
+            phrase = words[i:i + size]
+            if all(words[i + k * size:i + (k + 1) * size] == phrase for k in range(1, min_repeats)):
+                return True
+    return False
+
+
+def segment_flags(segment, min_confidence=0.4, no_speech_threshold=0.6):
+    """
+    Problems found in one transcribed segment:
+    "music" (only a music/applause tag), "hallucination" (known filler
+    text), "repetition", "low_confidence" (mean token probability below
+    `min_confidence`, when the engine reports one) and "no_speech" (the
+    engine thinks there was no speech but still wrote text).
+    """
+    text = segment.get("text", "").strip()
+    flags = []
+    if "♪" in text or _MUSIC_TAG.match(text.rstrip(".")):
+        flags.append("music")
+    lowered = text.lower()
+    if any(h in lowered for h in _HALLUCINATIONS):
+        flags.append("hallucination")
+    if _is_repetition(text):
+        flags.append("repetition")
+    confidence = segment.get("confidence")
+    if confidence is not None and confidence < min_confidence:
+        flags.append("low_confidence")
+    if segment.get("no_speech_prob", 0.0) > no_speech_threshold and segment.get("avg_logprob", 0.0) < -1.0:
+        flags.append("no_speech")
+    return flags
+
+
+def bad_ranges(segments, merge_gap=2.0, **flag_params):
+    """
+    Time ranges covered by flagged segments, with neighbours closer than
+    `merge_gap` seconds merged into one range. Returns [(start, end, flags)].
+    """
+    ranges = []
+    for segment in segments:
+        flags = segment_flags(segment, **flag_params)
+        if not flags:
+            continue
+        start, end = float(segment.get("start", 0.0)), float(segment.get("end", 0.0))
+        if ranges and start - ranges[-1][1] <= merge_gap:
+            ranges[-1] = (ranges[-1][0], max(end, ranges[-1][1]), sorted(set(ranges[-1][2]) | set(flags)))
+        else:
+            ranges.append((start, end, flags))
+    return ranges
+
+
+def splice_segments(segments, replacements):
+    """
+    Replaces the segments inside each re-decoded range.
+
+    Args:
+        segments: the original segments
+        replacements: [(start, end, new_segments)] with new_segments on the
+                      recording timeline; ranges whose re-decode failed are
+                      simply left out
+
+    A segment belongs to a range when its midpoint falls inside it, for
+    the originals (dropped) and for the new segments (kept) alike, so the
+    padding decoded around a range never duplicates its neighbours. Ranges
+    are half-open, so a midpoint on the boundary of two adjacent ranges
+    belongs to the later one only.
+    """
+    def inside(segment, start, end):
+        middle = (segment.get("start", 0.0) + segment.get("end", 0.0)) / 2
+        return start <= middle < end
+
+    kept = [s for s in segments if not any(inside(s, start, end) for start, end, _ in replacements)]
+    for start, end, new_segments in replacements:
+        kept.extend(s for s in new_segments if s.get("text", "").strip() and inside(s, start, end))
+    return sorted(kept, key=lambda s: s.get("start", 0.0))
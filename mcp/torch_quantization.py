@@ -0,0 +1,77 @@
+"""CPU runtime setup for the PyTorch whisper fallback: thread counts and dynamic int8 quantization."""
+import io
+
+# PyTorch only comes with openai-whisper; without it there is nothing to tune
+try:
+    import torch
+    from torch import nn
+    TORCH_AVAILABLE = True
+except ImportError:
+    torch = None
+    nn = None
+    TORCH_AVAILABLE = False
+
+_inter_op_configured = False
+_intra_op_threads = None  # what this process pinned, None until set
+
+
+def configure_torch_threads(intra_op_threads, inter_op_threads=1, override=True):
+    """
+    Sets the intra-op (per matmul) and inter-op thread pools. The inter-op
+    pool can only be sized before PyTorch runs its first parallel op, so it
+    is set once per process and later calls only adjust intra-op. With
+    override=False the intra-op count is left alone when something already
+    pinned it (pool and race workers pin their share of the CPU budget).
+    """
+    global _inter_op_configured, _intra_op_threads
+    if not TORCH_AVAILABLE:
+        return
+    if intra_op_threads and (override or _intra_op_threads is None):
+        if int(intra_op_threads) != _intra_op_threads:
+            torch.set_num_threads(int(intra_op_threads))
+            _intra_op_threads = int(intra_op_threads)
+    if inter_op_threads and not _inter_op_configured:
+        try:
+            torch.set_num_interop_threads(int(inter_op_threads))
+        except RuntimeError:
+            pass  # Already started; keep PyTorch's pool
+    _inter_op_configured = True
+
+
+def to_plain_linear(model):
+    """
+    Replaces Linear subclasses (whisper.model.Linear casts its weights on
+    every call) with plain nn.Linear modules sharing the same tensors.
+    quantize_dynamic matches module types exactly, so without this step
+    whisper's layers would be left in fp32. Returns how many were replaced.
+    """
+    replaced = 0
+    for parent in model.modules():
+        for name, child in list(parent.named_children()):
+            if isinstance(child, nn.Linear) and type(child) is not nn.Linear:
+                plain = nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                plain.weight = child.weight
+                plain.bias = child.bias
+                setattr(parent, name, plain)
+                replaced += 1
+    return replaced
+
+
+def quantize_dynamic_int8(model):
+    """
+    Dynamic int8 quantization of every Linear layer (weights stored as
+    int8, activations quantized on the fly). Convolutions and embeddings
+    stay in fp32. The model must run on CPU; it is modified in place.
+    """
+    if not TORCH_AVAILABLE:
+        raise RuntimeError("PyTorch is not installed")
+    model = model.cpu().float().eval()
+    to_plain_linear(model)
+    return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def model_size_mb(model):
+    """Serialized size of the model's weights (packed int8 weights included)."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024.0 * 1024.0)
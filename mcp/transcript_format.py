@@ -0,0 +1,119 @@
+"""Helpers for reading and writing timestamped transcript formats."""
+import json
+import re
+from pathlib import Path
+
+_SRT_TIME = re.compile(r'(\d+):(\d{2}):(\d{2})[,.](\d{3})')
+
+
+def format_timestamp(seconds, separator=','):
+    """Seconds -> 'HH:MM:SS,mmm' (SRT) or 'HH:MM:SS.mmm' (VTT)."""
+    millis = int(round(max(0.0, seconds) * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def parse_timestamp(text):
+    match = _SRT_TIME.search(text)
+    if not match:
+        raise ValueError(f"Invalid timestamp: {text!r}")
+    h, m, s, ms = (int(g) for g in match.groups())
+    return h * 3600 + m * 60 + s + ms / 1000.0
+
+
+def parse_srt(path):
+    """Reads an SRT file into a list of {"start", "end", "text"} segments."""
+    content = Path(path).read_text(encoding='utf-8', errors='replace')
+    segments = []
+    for block in re.split(r'\n\s*\n', content.strip()):
+        lines = [line for line in block.splitlines() if line.strip()]
+        for i, line in enumerate(lines):
+            if '-->' in line:
+                start, end = line.split('-->', 1)
+                segments.append({
+                    "start": parse_timestamp(start),
+                    "end": parse_timestamp(end),
+                    "text": " ".join(l.strip() for l in lines[i + 1:])
+                })
+                break
+    return segments
+
+
+def write_srt(segments, path):
+    """Writes segments as SRT."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, segment in enumerate(segments, 1):
+            f.write(f"{i}\n")
+            f.write(f"{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n")
+            f.write(f"{segment.get('text', '').strip()}\n\n")
+    return str(path)
+
+
+def write_vtt(segments, path):
+    """Writes segments as WebVTT."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for segment in segments:
+            f.write(f"{format_timestamp(segment['start'], '.')} --> {format_timestamp(segment['end'], '.')}\n")
+            f.write(f"{segment.get('text', '').strip()}\n\n")
+    return str(path)
+
+
+def write_transcripts(segments, output_base, formats=("txt", "srt", "vtt")):
+    """
+    Writes the requested formats (txt: one segment per line, srt, vtt) from
+    the same segments in a single pass. Returns {"txt_file", "srt_file",
+    "vtt_file"} for the formats written.
+    """
+    formats = [fmt for fmt in ("txt", "srt", "vtt") if fmt in formats]
+    files = {fmt: open(f"{output_base}.{fmt}", 'w', encoding='utf-8') for fmt in formats}
+    try:
+        if "vtt" in files:
+            files["vtt"].write("WEBVTT\n\n")
+        for i, segment in enumerate(segments, 1):
+            text = segment.get('text', '').strip()
+            if "txt" in files:
+                files["txt"].write(f"{text}\n")
+            if "srt" in files:
+                files["srt"].write(f"{i}\n{format_timestamp(segment['start'])} --> "
+                                   f"{format_timestamp(segment['end'])}\n{text}\n\n")
+            if "vtt" in files:
+                files["vtt"].write(f"{format_timestamp(segment['start'], '.')} --> "
+                                   f"{format_timestamp(segment['end'], '.')}\n{text}\n\n")
+    finally:
+        for f in files.values():
+            f.close()
+    return {f"{fmt}_file": f"{output_base}.{fmt}" for fmt in formats}
+
+
+def _is_special_token(text):
+    # whisper.cpp names control tokens like [_BEG_], [_TT_150], [_SOT_]
+    return text.startswith("[_") and text.endswith("]")
+
+
+def parse_whisper_cpp_json(path):
+    """
+    Reads whisper.cpp --output-json / --output-json-full output into
+    {"language", "segments"}. Segments carry start/end in seconds and, with
+    the full output, "confidence": the mean probability of their text
+    tokens (control tokens excluded).
+    """
+    # Token texts may hold half of a multi-byte character
+    data = json.loads(Path(path).read_bytes().decode('utf-8', errors='replace'))
+    segments = []
+    for entry in data.get("transcription", []):
+        offsets = entry.get("offsets")
+        if offsets:
+            start, end = offsets["from"] / 1000.0, offsets["to"] / 1000.0
+        else:
+            start = parse_timestamp(entry["timestamps"]["from"])
+            end = parse_timestamp(entry["timestamps"]["to"])
+        segment = {"start": start, "end": end, "text": entry.get("text", "").strip()}
+        probabilities = [token["p"] for token in entry.get("tokens", [])
+                         if "p" in token and not _is_special_token(token.get("text", ""))]
+        if probabilities:
+            segment["confidence"] = round(sum(probabilities) / len(probabilities), 4)
+        segments.append(segment)
+    return {"language": (data.get("result") or {}).get("language"), "segments": segments}
@@ -0,0 +1,186 @@
+"""Persistent, content-addressed cache of transcription results."""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from mcp.audio_io import audio_info, iter_pcm_blocks
+
+# Cross-process locking is POSIX only; elsewhere only threads are deduplicated
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+
+def file_fingerprint(path):
+    """Cheap identity of a file on disk (size + mtime); None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _json_default(value):
+    # numpy scalars from the engines
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class TranscriptionCache:
+    """
+    Transcription results stored under a key derived from the decoded audio
+    samples and every parameter that affects the output (engine chain,
+    model fingerprints, language, prompt, preprocessing). A WAV and a FLAC of
+    the same recording share an entry; a new model file or engine setting
+    gives a new key, so old entries simply stop being hit and are pruned.
+
+    single_flight(key) makes concurrent requests for one key wait for the
+    first computation, within the process (threads) and across processes
+    (flock on a per-key lock file).
+    """
+    ARTIFACT_KEYS = ("txt_file", "srt_file", "vtt_file", "json_file")
+
+    def __init__(self, cache_dir, max_entries=500, max_audio_hashes=2000):
+        self.cache_dir = Path(cache_dir)
+        self.entries_dir = self.cache_dir / "entries"
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_audio_hashes = max_audio_hashes
+        self._index_path = self.cache_dir / "audio_hashes.json"
+        self._audio_hashes = self._load_index()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _load_index(self):
+        try:
+            return json.loads(self._index_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def audio_hash(self, path):
+        """sha256 of the PCM samples; memoized per (path, size, mtime) so unchanged files are hashed once."""
+        path = Path(path).resolve()
+        memo_key = f"{path}|{file_fingerprint(path)}"
+        if memo_key in self._audio_hashes:
+            return self._audio_hashes[memo_key]
+
+        rate, channels, _ = audio_info(path)
+        digest = hashlib.sha256(f"{rate}:{channels}:".encode())
+        for block in iter_pcm_blocks(path):
+            digest.update(block)
+        value = digest.hexdigest()
+
+        self._audio_hashes[memo_key] = value
+        self._prune_hashes()
+        tmp = self._index_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._audio_hashes))
+        os.replace(tmp, self._index_path)
+        return value
+
+    def _prune_hashes(self):
+        """Drops memo entries of files that are gone or changed; keeps the newest max_audio_hashes."""
+        live = {}
+        for memo_key, value in self._audio_hashes.items():
+            path, _, fingerprint = memo_key.rpartition("|")
+            if file_fingerprint(path) == fingerprint:
+                live[memo_key] = value
+        # Insertion order: the oldest hashes go first
+        self._audio_hashes = dict(list(live.items())[-self.max_audio_hashes:])
+
+    def key(self, audio_hash, params):
+        payload = json.dumps({"audio": audio_hash, "params": params}, sort_keys=True, default=_json_default)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return self.entries_dir / key[:2] / key
+
+    @contextmanager
+    def single_flight(self, key):
+        """Holds the computation slot for `key`; other callers block until it is released."""
+        with self._locks_guard:
+            lock, users = self._locks.get(key, (threading.Lock(), 0))
+            self._locks[key] = (lock, users + 1)
+        lock.acquire()
+        lock_file = None
+        try:
+            if FCNTL_AVAILABLE:
+                lock_path = self.entries_dir / key[:2] / f"{key}.lock"
+                lock_path.parent.mkdir(parents=True, exist_ok=True)
+                lock_file = open(lock_path, 'w')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+            lock.release()
+            with self._locks_guard:
+                lock, users = self._locks[key]
+                if users <= 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, users - 1)
+
+    def get(self, key, output_dir, output_name):
+        """
+        Returns the stored result with its artifacts copied to
+        `output_dir/output_name.*`, or None on a miss.
+        """
+        entry = self._entry_dir(key)
+        try:
+            result = json.loads((entry / "result.json").read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+        output_dir = Path(output_dir)
+        for artifact_key, stored_name in result.pop("_artifacts", {}).items():
+            target = output_dir / f"{output_name}{Path(stored_name).suffix}"
+            try:
+                shutil.copyfile(entry / stored_name, target)
+            except FileNotFoundError:
+                # An artifact was deleted: the entry is unusable, recompute it
+                shutil.rmtree(entry, ignore_errors=True)
+                return None
+            result[artifact_key] = str(target)
+        os.utime(entry)  # recently used entries survive pruning
+        return result
+
+    def put(self, key, result):
+        """Stores a successful result and its artifact files."""
+        entry = self._entry_dir(key)
+        tmp = entry.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        stored = dict(result)
+        artifacts = {}
+        for artifact_key in self.ARTIFACT_KEYS:
+            path = result.get(artifact_key)
+            if path and Path(path).is_file():
+                name = f"{artifact_key}{Path(path).suffix}"
+                shutil.copyfile(path, tmp / name)
+                artifacts[artifact_key] = name
+                stored.pop(artifact_key)
+        stored["_artifacts"] = artifacts
+        stored["cached_at"] = time.time()
+        (tmp / "result.json").write_text(json.dumps(stored, default=_json_default), encoding='utf-8')
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        self.prune()
+
+    def prune(self):
+        """Keeps the `max_entries` most recently used entries."""
+        entries = [d for d in self.entries_dir.glob("*/*") if d.is_dir() and not d.name.endswith(".tmp")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda d: d.stat().st_mtime, reverse=True)
+        for stale in entries[self.max_entries:]:
+            shutil.rmtree(stale, ignore_errors=True)
@@ -0,0 +1,175 @@
+"""Voice activity detection and silence compaction ahead of transcription."""
+import bisect
+from pathlib import Path
+
+import numpy as np
+
+from mcp.audio_dsp import StreamingResampler, pcm16_to_float
+from mcp.audio_io import StreamingWavWriter, audio_info, iter_pcm_blocks
+
+WHISPER_SAMPLE_RATE = 16000
+
+
+def frame_features(mono, frame_len):
+    """
+    Per-frame log energy (dBFS) and spectral flatness for a float block.
+    Speech is loud relative to the room and tonal (low flatness); fans and
+    hiss are broadband (flatness close to 1).
+    """
+    n_frames = len(mono) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, np.float32), np.zeros(0, np.float32)
+    frames = mono[:n_frames * frame_len].reshape(n_frames, frame_len)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    power = np.abs(np.fft.rfft(frames * np.hanning(frame_len), axis=1)) ** 2 + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db.astype(np.float32), flatness.astype(np.float32)
+
+
+def detect_speech_regions(path, frame_ms=30, threshold_db=10.0, min_silence=1.0,
+                          min_speech=0.25, padding=0.25, flatness_limit=0.5):
+    """
+    Scans a WAV/FLAC file block by block and returns [(start_s, end_s), ...]
+    of speech. The energy threshold adapts to the recording: it sits
+    `threshold_db` above the 10th percentile frame energy (the room floor).
+    """
+    rate, channels, _ = audio_info(path)
+    frame_len = int(rate * frame_ms / 1000)
+    energies, flatnesses = [], []
+    carry = np.zeros(0, np.float32)
+    for block in iter_pcm_blocks(path):
+        frames = pcm16_to_float(block, channels)
+        mono = np.concatenate((carry, frames.mean(axis=1)))
+        usable = len(mono) - len(mono) % frame_len
+        e, f = frame_features(mono[:usable], frame_len)
+        energies.append(e)
+        flatnesses.append(f)
+        carry = mono[usable:]
+
+    if not energies:
+        return []
+    energy = np.concatenate(energies)
+    flatness = np.concatenate(flatnesses)
+    if len(energy) == 0:
+        return []
+
+    floor = float(np.percentile(energy, 10))
+    speech = (energy > floor + threshold_db) & ((flatness < flatness_limit) | (energy > floor + 2 * threshold_db))
+
+    # Frame flags -> runs of speech
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    frame_s = frame_len / float(rate)
+    total = len(energy) * frame_s
+
+    regions = []
+    for s, e in zip(starts * frame_s, ends * frame_s):
+        if regions and s - regions[-1][1] < min_silence:
+            regions[-1][1] = e
+        else:
+            regions.append([s, e])
+    regions = [(max(0.0, float(s) - padding), min(total, float(e) + padding))
+               for s, e in regions if e - s >= min_speech]
+
+    # Padding can make neighbours overlap again
+    merged = []
+    for s, e in regions:
+        if merged and s <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+class TimelineMap:
+    """
+    Offset table from the compacted timeline back to the original recording.
+    Each entry is (compact_start, original_start, duration) in seconds.
+    """
+    def __init__(self, entries=None):
+        self.entries = list(entries or [])
+        self._starts = [e[0] for e in self.entries]
+
+    def add(self, compact_start, original_start, duration):
+        self.entries.append((compact_start, original_start, duration))
+        self._starts.append(compact_start)
+
+    def to_original(self, t):
+        if not self.entries:
+            return t
+        i = max(0, bisect.bisect_right(self._starts, t) - 1)
+        compact_start, original_start, duration = self.entries[i]
+        return original_start + min(max(0.0, t - compact_start), duration)
+
+    def remap_segments(self, segments):
+        """Returns copies of `segments` with start/end on the original timeline."""
+        remapped = []
+        for segment in segments:
+            segment = dict(segment)
+            segment["start"] = round(self.to_original(segment.get("start", 0.0)), 3)
+            segment["end"] = round(self.to_original(segment.get("end", segment["start"])), 3)
+            remapped.append(segment)
+        return remapped
+
+    def to_list(self):
+        return [list(e) for e in self.entries]
+
+
+def compact_speech(src_path, dst_path, join_gap=0.3, min_removed_ratio=0.05, **vad_params):
+    """
+    Writes only the speech regions of `src_path` to `dst_path` as 16 kHz mono
+    WAV, separated by `join_gap` seconds of silence so words are not glued
+    together. Returns (TimelineMap, stats), or (None, stats) when there is too
+    little silence to be worth it.
+    """
+    rate, channels, frames = audio_info(src_path)
+    total = frames / float(rate)
+    regions = detect_speech_regions(src_path, **vad_params)
+    kept = sum(e - s for s, e in regions)
+    stats = {
+        "original_seconds": round(total, 2),
+        "speech_seconds": round(kept, 2),
+        "speech_regions": len(regions),
+        "removed_ratio": round(1 - kept / total, 3) if total else 0.0
+    }
+    if not regions or total == 0 or stats["removed_ratio"] < min_removed_ratio:
+        return None, stats
+
+    resampler = StreamingResampler(rate, WHISPER_SAMPLE_RATE, in_channels=channels) \
+        if rate != WHISPER_SAMPLE_RATE or channels != 1 else None
+    gap = bytes(int(join_gap * WHISPER_SAMPLE_RATE) * 2)
+    timeline = TimelineMap()
+
+    # Region boundaries in source frames; blocks are sliced against them in order
+    bounds = [(int(s * rate), int(e * rate)) for s, e in regions]
+    region_idx = 0
+    block_start = 0
+    with StreamingWavWriter(Path(dst_path), 1, 2, WHISPER_SAMPLE_RATE) as writer:
+        for block in iter_pcm_blocks(src_path):
+            samples = np.frombuffer(block, dtype=np.int16).reshape(-1, channels)
+            block_end = block_start + len(samples)
+            i = region_idx
+            while i < len(bounds) and bounds[i][0] < block_end:
+                r_start, r_end = bounds[i]
+                lo, hi = max(r_start, block_start), min(r_end, block_end)
+                if hi > lo:
+                    if lo == r_start:
+                        if timeline.entries:
+                            writer.write(gap)
+                        # Each region is resampled on its own: no filter history
+                        # from the previous region smears across the cut
+                        if resampler is not None:
+                            resampler.reset()
+                        timeline.add(writer.duration_seconds, r_start / float(rate), (r_end - r_start) / float(rate))
+                    piece = samples[lo - block_start:hi - block_start].tobytes()
+                    writer.write(resampler.process(piece) if resampler else piece)
+                if r_end <= block_end:
+                    i += 1
+                    region_idx = i
+                else:
+                    break
+            block_start = block_end
+        stats["compacted_seconds"] = round(writer.duration_seconds, 2)
+
+    return timeline, stats
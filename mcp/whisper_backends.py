@@ -0,0 +1,121 @@
+"""In-process whisper.cpp backend: the ggml model is loaded once and kept resident."""
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from mcp.audio_dsp import StreamingResampler, pcm16_to_float
+from mcp.audio_io import audio_info, iter_pcm_blocks
+from mcp.vad import WHISPER_SAMPLE_RATE
+
+# pywhispercpp bindings are optional; without them the CLI binary is used
+try:
+    from pywhispercpp.model import Model as WhisperCppModel
+    PYWHISPERCPP_AVAILABLE = True
+except ImportError:
+    WhisperCppModel = None
+    PYWHISPERCPP_AVAILABLE = False
+
+
+def iter_pcm_16k(path, block_frames=65536, start_sample=0):
+    """
+    Yields a WAV/FLAC file as float32 mono blocks at 16 kHz, resampled on the
+    fly. `start_sample` (16 kHz timeline) seeks in the source instead of
+    decoding everything before it.
+    """
+    rate, channels, _ = audio_info(path)
+    resampler = StreamingResampler(rate, WHISPER_SAMPLE_RATE, in_channels=channels) \
+        if rate != WHISPER_SAMPLE_RATE else None
+    start_frame = int(round(start_sample * rate / float(WHISPER_SAMPLE_RATE)))
+    for block in iter_pcm_blocks(path, block_frames, start_frame=start_frame):
+        samples = pcm16_to_float(block, channels)
+        mono = samples.mean(axis=1) if channels > 1 else samples[:, 0]
+        yield resampler.process_float(mono) if resampler else mono
+
+
+def load_pcm_16k(path):
+    """Reads a WAV/FLAC file as float32 mono at 16 kHz (the rate whisper expects)."""
+    blocks = list(iter_pcm_16k(path))
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+
+class ResidentWhisperCpp:
+    """
+    A whisper.cpp context that lives as long as the process.
+
+    The model is loaded on first use (or by load(), e.g. during warm-up) and
+    every later call only pays for inference. Input is a float32 PCM buffer at
+    16 kHz, so no temporary WAV is needed. A whisper context is not
+    re-entrant, so calls are serialized with a lock.
+    """
+    # Decoding options that map 1:1 onto whisper_full_params
+    PARAM_NAMES = ("temperature", "no_speech_thold", "suppress_non_speech_tokens")
+
+    def __init__(self, model_path, n_threads=2, **params):
+        self.model_path = str(model_path)
+        self.n_threads = n_threads
+        self.params = {k: v for k, v in params.items() if k in self.PARAM_NAMES and v is not None}
+        self.model = None
+        self.load_time = None
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def load(self):
+        """Loads the ggml model if it is not resident yet. Returns the load time in seconds."""
+        with self._lock:
+            if self.model is None:
+                if not PYWHISPERCPP_AVAILABLE:
+                    raise RuntimeError("pywhispercpp is not installed")
+                started = time.time()
+                try:
+                    self.model = WhisperCppModel(self.model_path, n_threads=self.n_threads,
+                                                 print_progress=False, print_realtime=False, **self.params)
+                except (TypeError, AttributeError):
+                    # Older bindings do not know every option; keep the ones all versions have
+                    self.params = {}
+                    self.model = WhisperCppModel(self.model_path, n_threads=self.n_threads)
+                self.load_time = time.time() - started
+            return self.load_time
+
+    def transcribe_pcm(self, samples, language="es", initial_prompt=None):
+        """
+        Transcribes a float32 mono 16 kHz buffer.
+        Returns [{"start", "end", "text"}, ...] with times in seconds.
+        """
+        self.load()
+        params = {"language": language}
+        if initial_prompt:
+            params["initial_prompt"] = initial_prompt
+        with self._lock:
+            segments = self.model.transcribe(np.ascontiguousarray(samples, dtype=np.float32), **params)
+            self.calls += 1
+        # whisper.cpp timestamps are in 10 ms units
+        return [{"start": s.t0 / 100.0, "end": s.t1 / 100.0, "text": s.text.strip()}
+                for s in segments if s.text.strip()]
+
+    def transcribe_file(self, path, language="es", initial_prompt=None):
+        return self.transcribe_pcm(load_pcm_16k(path), language, initial_prompt)
+
+    def close(self):
+        with self._lock:
+            self.model = None
+
+
+_resident = {}
+_resident_lock = threading.Lock()
+
+
+def get_resident_whisper(model_path, n_threads=2, **params):
+    """Process-wide ResidentWhisperCpp per (model, threads, decoding params); None without pywhispercpp."""
+    if not PYWHISPERCPP_AVAILABLE or not model_path or not Path(model_path).exists():
+        return None
+    key = (str(model_path), n_threads, tuple(sorted(params.items())))
+    with _resident_lock:
+        if key not in _resident:
+            _resident[key] = ResidentWhisperCpp(model_path, n_threads=n_threads, **params)
+        return _resident[key]
@@ -0,0 +1,312 @@
+"""openai-whisper decoding over 30-second windows streamed from the recording, without ffmpeg."""
+from collections import deque
+
+import numpy as np
+
+from mcp.vad import WHISPER_SAMPLE_RATE
+from mcp.whisper_backends import iter_pcm_16k
+
+WINDOW_SECONDS = 30
+WINDOW_SAMPLES = WINDOW_SECONDS * WHISPER_SAMPLE_RATE
+# One timestamp token = 2 mel frames of 10 ms
+TIME_PRECISION = 0.02
+SAMPLES_PER_TIMESTAMP = int(TIME_PRECISION * WHISPER_SAMPLE_RATE)
+
+
+def iter_windows(path, window_samples=WINDOW_SAMPLES, start_sample=0, end_sample=None):
+    """
+    Sliding window reader. Yields (offset_samples, window, final) where
+    `window` holds up to `window_samples` samples starting at the offset;
+    the caller answers with how many samples it consumed (generator.send).
+    Only one window plus one read block is ever held in memory.
+    `start_sample`/`end_sample` limit it to a slice of the recording
+    (offsets stay on the recording timeline); the reader seeks to the
+    start, so chunks of a long recording do not re-read its beginning.
+    """
+    source = iter_pcm_16k(path, start_sample=start_sample)
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = start_sample
+    position = start_sample  # recording samples read so far
+    exhausted = False
+    while True:
+        while not exhausted and len(buffer) < window_samples:
+            try:
+                block = next(source)
+            except StopIteration:
+                exhausted = True
+                break
+            block_start, position = position, position + len(block)
+            if end_sample is not None and position >= end_sample:
+                block = block[:max(0, end_sample - block_start)]
+                exhausted = True
+            buffer = np.concatenate((buffer, block))
+        if not len(buffer):
+            return
+        final = exhausted and len(buffer) <= window_samples
+        consumed = yield offset, buffer[:window_samples], final
+        consumed = max(1, min(int(consumed or window_samples), len(buffer)))
+        buffer = buffer[consumed:]
+        offset += consumed
+
+
+class _WindowStream:
+    """Decode state of one window sequence: a whole file or one chunk of it."""
+    def __init__(self, path, start_sample=0, end_sample=None, prompt_tokens=(), key=None):
+        self.key = key
+        self.start_sample = start_sample
+        self.prompt_tokens = list(prompt_tokens)
+        self.all_tokens = list(prompt_tokens)
+        self.segments = []
+        self.language = None
+        self.done = False
+        self._windows = iter_windows(path, start_sample=start_sample, end_sample=end_sample)
+        self.advance(None)
+
+    def advance(self, consumed):
+        """Moves to the window that starts `consumed` samples later (None = the first one)."""
+        try:
+            if consumed is None:
+                self.offset, self.window, self.final = next(self._windows)
+            else:
+                self.offset, self.window, self.final = self._windows.send(consumed)
+        except StopIteration:
+            self.finish()
+
+    def finish(self):
+        self.done = True
+        self.window = None
+        self._windows.close()
+
+    def result(self):
+        return {
+            "text": "".join(segment["text"] for segment in self.segments),
+            "segments": self.segments,
+            "language": self.language
+        }
+
+
+class WindowedWhisperTranscriber:
+    """
+    The core of whisper.transcribe() fed from iter_windows: each window is
+    padded to 30 s, turned into its own log-mel spectrogram and decoded with
+    whisper.decode(). The next window starts at the last complete timestamp,
+    as in whisper's own loop, so words cut by the window edge are decoded
+    again in the next one. Peak memory depends on the window, not on the
+    length of the recording.
+
+    Word-level timestamps are not computed (whisper needs the spectrogram
+    of the whole segment for them); segments carry start/end, tokens,
+    avg_logprob, no_speech_prob and compression_ratio like whisper's.
+    """
+    def __init__(self, model, language=None, initial_prompt=None, temperature=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+                 beam_size=5, best_of=5, condition_on_previous_text=True, fp16=False,
+                 compression_ratio_threshold=2.4, logprob_threshold=-1.0, no_speech_threshold=0.6):
+        import whisper
+        self.whisper = whisper
+        self.model = model
+        self.language = language
+        self.initial_prompt = initial_prompt
+        self.temperatures = temperature if isinstance(temperature, (list, tuple)) else (temperature,)
+        self.beam_size = beam_size
+        self.best_of = best_of
+        self.condition_on_previous_text = condition_on_previous_text
+        self.fp16 = fp16
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.n_mels = getattr(model.dims, "n_mels", 80)
+
+    def _tokenizer(self, language):
+        from whisper.tokenizer import get_tokenizer
+        try:
+            return get_tokenizer(self.model.is_multilingual, num_languages=self.model.num_languages,
+                                 language=language, task="transcribe")
+        except (TypeError, AttributeError):
+            return get_tokenizer(self.model.is_multilingual, language=language, task="transcribe")
+
+    def _mel(self, window):
+        if len(window) < WINDOW_SAMPLES:
+            window = np.pad(window, (0, WINDOW_SAMPLES - len(window)))
+        try:
+            mel = self.whisper.log_mel_spectrogram(window, n_mels=self.n_mels)
+        except TypeError:
+            mel = self.whisper.log_mel_spectrogram(window)
+        return mel.to(self.model.device)
+
+    def _options(self, temperature, prompt, language):
+        kwargs = {"beam_size": self.beam_size} if temperature == 0 else {"best_of": self.best_of}
+        return self.whisper.DecodingOptions(language=language, task="transcribe", prompt=prompt,
+                                            temperature=temperature, fp16=self.fp16, **kwargs)
+
+    def _needs_fallback(self, result):
+        """True while the output looks degenerate and a higher temperature may do better."""
+        too_repetitive = result.compression_ratio > self.compression_ratio_threshold
+        too_unsure = result.avg_logprob < self.logprob_threshold
+        if result.no_speech_prob > self.no_speech_threshold and too_unsure:
+            return False  # Silence: nothing better to find
+        return too_repetitive or too_unsure
+
+    def _decode(self, mel, prompt, language):
+        """Decodes one window, raising the temperature while the output looks degenerate."""
+        result = None
+        for temperature in self.temperatures:
+            result = self.whisper.decode(self.model, mel, self._options(temperature, prompt, language))
+            if not self._needs_fallback(result):
+                break
+        return result
+
+    def _prompt_tokens(self, tokenizer):
+        return tokenizer.encode(" " + self.initial_prompt.strip()) if self.initial_prompt else []
+
+    def _accept(self, stream, result, tokenizer):
+        """Adds one decoded window to its stream and moves the stream to the next window."""
+        window = stream.window
+        if result.no_speech_prob > self.no_speech_threshold and result.avg_logprob < self.logprob_threshold:
+            consumed = len(window)
+        else:
+            time_offset = (stream.offset - stream.start_sample) / float(WHISPER_SAMPLE_RATE)
+            new_segments, consumed = self._split(result, tokenizer, time_offset,
+                                                 len(window) / float(WHISPER_SAMPLE_RATE), len(window))
+            for segment in new_segments:
+                segment.update(id=len(stream.segments), seek=stream.offset, temperature=result.temperature,
+                               avg_logprob=result.avg_logprob, compression_ratio=result.compression_ratio,
+                               no_speech_prob=result.no_speech_prob)
+                stream.segments.append(segment)
+                stream.all_tokens.extend(segment["tokens"])
+            if not self.condition_on_previous_text or result.temperature > 0.5:
+                stream.all_tokens = list(stream.prompt_tokens)
+        if stream.final and consumed >= len(window):
+            stream.finish()
+        else:
+            stream.advance(consumed)
+
+    def transcribe(self, path):
+        language = self.language
+        tokenizer = self._tokenizer(language)
+        stream = _WindowStream(path, prompt_tokens=self._prompt_tokens(tokenizer))
+        stream.language = language
+        while not stream.done:
+            prompt = stream.all_tokens[-223:] if stream.all_tokens else None
+            result = self._decode(self._mel(stream.window), prompt, stream.language)
+            if stream.language is None:
+                # Detected on the first window; keep it for the rest
+                stream.language = result.language
+                tokenizer = self._tokenizer(stream.language)
+            self._accept(stream, result, tokenizer)
+        return stream.result()
+
+    @staticmethod
+    def _split(result, tokenizer, time_offset, window_duration, window_samples):
+        """Cuts a window's tokens into timestamped segments; returns (segments, samples consumed)."""
+        tokens = list(result.tokens)
+        begin = tokenizer.timestamp_begin
+        is_timestamp = [t >= begin for t in tokens]
+
+        def text_of(span):
+            return tokenizer.decode([t for t in span if t < tokenizer.eot])
+
+        segments = []
+        single_ending = is_timestamp[-2:] == [False, True]
+        consecutive = [i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]]
+        if consecutive:
+            slices = consecutive + ([len(tokens)] if single_ending else [])
+            last = 0
+            for current in slices:
+                span = tokens[last:current]
+                segments.append({"start": time_offset + (span[0] - begin) * TIME_PRECISION,
+                                 "end": time_offset + (span[-1] - begin) * TIME_PRECISION,
+                                 "text": text_of(span), "tokens": span})
+                last = current
+            if single_ending:
+                consumed = window_samples
+            else:
+                # Resume at the last complete timestamp; the rest is decoded again
+                consumed = (tokens[last - 1] - begin) * SAMPLES_PER_TIMESTAMP
+        else:
+            duration = window_duration
+            stamps = [t for t in tokens if t >= begin]
+            if stamps and stamps[-1] != begin:
+                duration = (stamps[-1] - begin) * TIME_PRECISION
+            segments.append({"start": time_offset, "end": time_offset + duration,
+                             "text": text_of(tokens), "tokens": tokens})
+            consumed = window_samples
+        segments = [s for s in segments if s["text"].strip()]
+        return segments, consumed if consumed > 0 else window_samples
+
+
+class BatchedWhisperTranscriber(WindowedWhisperTranscriber):
+    """
+    Decodes many window sequences at once: whole files, or independent
+    chunks of one long file (see mcp.parallel_transcription.plan_chunks).
+    Every step takes the current window of up to `batch_size` streams,
+    stacks their spectrograms and runs the encoder and the decoder once
+    for the whole batch; each stream then advances on its own result.
+    Windows that need a higher temperature are re-decoded together, still
+    as a batch. A finished stream frees its slot for the next source, so at
+    most `batch_size` files are open and buffered at a time.
+
+    A batch shares one set of decoding options, so the prompt is the
+    initial prompt only: condition_on_previous_text does not apply here.
+    """
+    def __init__(self, model, batch_size=8, **kwargs):
+        super().__init__(model, **kwargs)
+        self.batch_size = max(1, int(batch_size))
+        self.stats = {"batches": 0, "windows": 0}
+
+    def _decode_batch(self, mels, prompt, language):
+        import torch
+        results = [None] * len(mels)
+        pending = list(range(len(mels)))
+        for temperature in self.temperatures:
+            decoded = self.whisper.decode(self.model, torch.stack([mels[i] for i in pending]),
+                                          self._options(temperature, prompt, language))
+            self.stats["batches"] += 1
+            retry = []
+            for index, result in zip(pending, decoded):
+                results[index] = result
+                if self._needs_fallback(result):
+                    retry.append(index)
+            pending = retry
+            if not pending:
+                break
+        return results
+
+    def transcribe_many(self, sources):
+        """
+        Args:
+            sources: [(key, path, start_seconds, end_seconds)]; end None means
+                     up to the end of the file. Paths must be WAV/FLAC.
+
+        Returns:
+            {key: {"text", "segments", "language"}} with segment times
+            relative to each source's start
+        """
+        tokenizer = self._tokenizer(self.language)
+        prompt_tokens = self._prompt_tokens(tokenizer)
+        prompt = prompt_tokens or None
+        queue = deque(sources)
+        active, results = [], {}
+        while queue or active:
+            while queue and len(active) < self.batch_size:
+                key, path, start, end = queue.popleft()
+                stream = _WindowStream(path, int(round(start * WHISPER_SAMPLE_RATE)),
+                                       int(round(end * WHISPER_SAMPLE_RATE)) if end is not None else None,
+                                       prompt_tokens, key=key)
+                stream.language = self.language
+                if stream.done:
+                    results[key] = stream.result()
+                else:
+                    active.append(stream)
+            if not active:
+                break
+
+            decoded = self._decode_batch([self._mel(stream.window) for stream in active], prompt, self.language)
+            self.stats["windows"] += len(active)
+            for stream, result in zip(active, decoded):
+                if stream.language is None:
+                    stream.language = result.language
+                self._accept(stream, result, tokenizer)
+                if stream.done:
+                    results[stream.key] = stream.result()
+            active = [stream for stream in active if not stream.done]
+        return results
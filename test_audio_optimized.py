@@ -65,15 +65,24 @@ if agent.start_recording('test_max_volume', input_device_index=4):
         
         print(f'   📈 Ratio de contenido: {ratio:.3f}')
         
-        # Determinar calidad de grabación
-        if file_size > 200000:  # > 200KB para 7 segundos
-            print('   ✅ EXCELENTE: Archivo con contenido significativo')
+        # Determinar calidad de grabación a partir de las métricas de la señal de
+        # entrada (medidas antes del AGC, que podría disimular un micrófono débil)
+        signal = result['metadata'].get('signal', {})
+        print(f"   📈 Señal de entrada: pico {signal.get('peak_dbfs')} dBFS, SNR ~{signal.get('snr_db')} dB, "
+              f"{signal.get('silence_ratio', 0):.0%} silencio, {signal.get('clip_ratio', 0):.2%} saturado")
+        agc = result['metadata'].get('agc') or {}
+        if agc.get('chunks'):
+            print(f"   🎚️ AGC: ganancia media {agc['mean_gain_db']} dB (máx {agc['max_gain_db']} dB), "
+                  f"{agc.get('output_clip_ratio', 0):.2%} saturado tras la ganancia")
+        signal_quality = signal.get('quality')
+        if signal_quality == 'good':
+            print('   ✅ EXCELENTE: Voz clara sobre el ruido de fondo')
             quality = 'high'
-        elif file_size > 100000:  # > 100KB
+        elif signal_quality == 'fair':
             print('   ⚠️ BUENO: Contenido moderado')
             quality = 'medium'
-        elif file_size > 50000:   # > 50KB
-            print('   ⚠️ BAJO: Contenido mínimo')
+        elif signal_quality == 'poor':
+            print('   ⚠️ BAJO: Poco margen sobre el ruido o saturación')
             quality = 'low'
         else:
             print('   ❌ CRÍTICO: Casi sin contenido')
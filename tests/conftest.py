@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Tests import the project packages (mcp, agents) from the repository root
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
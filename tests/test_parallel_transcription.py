@@ -0,0 +1,63 @@
+import pytest
+
+from mcp.parallel_transcription import _trim_repeated_prefix, merge_chunk_segments
+
+# Two chunks cut at 300 s with 2 s of overlap on each side of the cut
+FIRST = {"index": 0, "start": 0.0, "end": 302.0, "core_start": 0.0, "core_end": 300.0}
+SECOND = {"index": 1, "start": 298.0, "end": 600.0, "core_start": 300.0, "core_end": 600.0}
+
+
+def seg(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+@pytest.mark.parametrize("chunk_segments, expected", [
+    # No chunks at all
+    ([], []),
+    # Single chunk: times and text unchanged, blank segments dropped
+    ([(FIRST, [seg(0.0, 2.0, "hola a todos"), seg(2.0, 3.0, "  "), seg(3.0, 5.5, "empezamos")])],
+     [seg(0.0, 2.0, "hola a todos"), seg(3.0, 5.5, "empezamos")]),
+    # Second chunk empty: only the first one's segments
+    ([(FIRST, [seg(290.0, 295.0, "fin del primer trozo")]), (SECOND, [])],
+     [seg(290.0, 295.0, "fin del primer trozo")]),
+    # First chunk empty: the second one's times are offset by its start
+    ([(FIRST, []), (SECOND, [seg(4.0, 8.0, "solo el segundo")])],
+     [seg(302.0, 306.0, "solo el segundo")]),
+    # A segment decoded by both chunks inside the overlap is kept once, by
+    # the chunk whose core contains its midpoint
+    ([(FIRST, [seg(296.0, 299.0, "dentro del solape")]),
+      (SECOND, [seg(-2.0, 1.0, "dentro del solape"), seg(5.0, 9.0, "siguiente frase")])],
+     [seg(296.0, 299.0, "dentro del solape"), seg(303.0, 307.0, "siguiente frase")]),
+    # Words repeated across the cut are trimmed from the later segment,
+    # which starts no earlier than the previous one ends
+    ([(FIRST, [seg(295.0, 300.5, "la red usa cifrado asimétrico")]),
+      (SECOND, [seg(1.5, 6.0, "usa cifrado asimétrico para las claves")])],
+     [seg(295.0, 300.5, "la red usa cifrado asimétrico"), seg(300.5, 304.0, "para las claves")]),
+    # A later segment that only repeats the previous one disappears
+    ([(FIRST, [seg(297.0, 300.8, "muy bien gracias")]),
+      (SECOND, [seg(2.5, 3.5, "Muy bien, gracias.")])],
+     [seg(297.0, 300.8, "muy bien gracias")]),
+    # The last chunk keeps segments past its nominal core end
+    ([(SECOND, [seg(301.0, 304.0, "cola del audio")])],
+     [seg(599.0, 602.0, "cola del audio")]),
+])
+def test_merge_chunk_segments(chunk_segments, expected):
+    assert merge_chunk_segments(chunk_segments) == expected
+
+
+def test_merge_orders_chunks_by_index():
+    chunk_segments = [(SECOND, [seg(10.0, 12.0, "segundo")]), (FIRST, [seg(10.0, 12.0, "primero")])]
+    assert [s["text"] for s in merge_chunk_segments(chunk_segments)] == ["primero", "segundo"]
+
+
+@pytest.mark.parametrize("previous, text, expected", [
+    ("uno dos tres cuatro", "dos tres cuatro cinco", "cinco"),
+    # Fewer than three repeated words is not treated as a repeat
+    ("uno dos tres", "dos tres cinco", "dos tres cinco"),
+    # Case and punctuation are ignored, the spelling of the rest is kept
+    ("Hola, ¿qué tal?", "hola qué tal. Bien, ¿y tú?", "Bien, ¿y tú?"),
+    ("uno dos tres", "uno dos tres", ""),
+    ("", "texto nuevo aquí", "texto nuevo aquí"),
+])
+def test_trim_repeated_prefix(previous, text, expected):
+    assert _trim_repeated_prefix(previous, text) == expected
@@ -0,0 +1,97 @@
+import pytest
+
+from mcp.segment_fallback import bad_ranges, segment_flags, splice_segments
+
+
+def seg(start, end, text, **extra):
+    return {"start": start, "end": end, "text": text, **extra}
+
+
+@pytest.mark.parametrize("segment, expected", [
+    (seg(0, 2, "Hoy hablamos de redes."), []),
+    (seg(0, 2, "[Música]"), ["music"]),
+    (seg(0, 2, "(música de fondo)"), ["music"]),
+    (seg(0, 2, "♪ ♪"), ["music"]),
+    (seg(0, 2, "Subtítulos realizados por la comunidad de Amara.org"), ["hallucination"]),
+    (seg(0, 2, "sí sí sí sí sí sí"), ["repetition"]),
+    (seg(0, 2, "la clave la clave la clave la clave la clave"), ["repetition"]),
+    (seg(0, 2, "algo dudoso", confidence=0.2), ["low_confidence"]),
+    (seg(0, 2, "algo seguro", confidence=0.9), []),
+    (seg(0, 2, "eh", no_speech_prob=0.9, avg_logprob=-1.5), ["no_speech"]),
+    (seg(0, 2, "eh", no_speech_prob=0.9, avg_logprob=-0.2), []),
+])
+def test_segment_flags(segment, expected):
+    assert segment_flags(segment) == expected
+
+
+@pytest.mark.parametrize("segments, expected", [
+    ([], []),
+    ([seg(0.0, 4.0, "texto normal")], []),
+    # Flagged segment at the start of the file
+    ([seg(0.0, 3.0, "[Música]"), seg(3.0, 8.0, "empezamos la clase")],
+     [(0.0, 3.0, ["music"])]),
+    # Flagged segment at the end of the file
+    ([seg(0.0, 5.0, "y eso es todo"), seg(5.0, 9.5, "gracias por ver el video")],
+     [(5.0, 9.5, ["hallucination"])]),
+    # Neighbours within merge_gap become one range with the union of their flags
+    ([seg(10.0, 12.0, "[Música]"), seg(13.0, 15.0, "no no no no no no")],
+     [(10.0, 15.0, ["music", "repetition"])]),
+    # Farther apart than merge_gap: separate ranges
+    ([seg(10.0, 12.0, "[Música]"), seg(12.0, 20.0, "una frase normal"), seg(20.0, 22.0, "[Música]")],
+     [(10.0, 12.0, ["music"]), (20.0, 22.0, ["music"])]),
+])
+def test_bad_ranges(segments, expected):
+    assert bad_ranges(segments, merge_gap=2.0) == expected
+
+
+ORIGINAL = [
+    seg(0.0, 4.0, "[Música]"),
+    seg(4.0, 10.0, "buenos días"),
+    seg(10.0, 14.0, "Amara.org"),
+    seg(14.0, 18.0, "no no no no no"),
+    seg(18.0, 25.0, "seguimos con el tema"),
+    seg(25.0, 30.0, "[Música]"),
+]
+
+
+def texts(segments):
+    return [s["text"] for s in segments]
+
+
+def test_splice_range_at_file_start():
+    spliced = splice_segments(ORIGINAL, [(0.0, 4.0, [seg(0.5, 3.5, "bienvenidos")])])
+    assert texts(spliced)[:2] == ["bienvenidos", "buenos días"]
+    assert len(spliced) == len(ORIGINAL)
+
+
+def test_splice_range_at_file_end():
+    spliced = splice_segments(ORIGINAL, [(25.0, 30.0, [seg(25.0, 29.0, "hasta mañana")])])
+    assert texts(spliced)[-2:] == ["seguimos con el tema", "hasta mañana"]
+
+
+def test_splice_adjacent_ranges_keep_boundary_segment_once():
+    replacements = [
+        (10.0, 14.0, [seg(10.0, 12.5, "primera parte"), seg(13.0, 15.0, "en el borde")]),
+        (14.0, 18.0, [seg(13.0, 15.0, "en el borde"), seg(15.0, 18.0, "segunda parte")]),
+    ]
+    spliced = splice_segments(ORIGINAL, replacements)
+    assert texts(spliced) == ["[Música]", "buenos días", "primera parte", "en el borde", "segunda parte",
+                              "seguimos con el tema", "[Música]"]
+
+
+def test_splice_drops_new_segments_that_overrun_the_range():
+    # The re-decode covered padding on both sides: only segments centred in the range count
+    new_segments = [
+        seg(8.0, 10.5, "buenos días"),          # midpoint 9.25, belongs to the neighbour
+        seg(10.5, 13.5, "texto reparado"),
+        seg(13.0, 19.0, "seguimos con"),        # midpoint 16, past the range end
+    ]
+    spliced = splice_segments(ORIGINAL, [(10.0, 14.0, new_segments)])
+    assert texts(spliced) == ["[Música]", "buenos días", "texto reparado", "no no no no no",
+                              "seguimos con el tema", "[Música]"]
+
+
+def test_splice_failed_range_keeps_originals_and_blank_text_is_dropped():
+    spliced = splice_segments(ORIGINAL, [(25.0, 30.0, [seg(25.0, 30.0, "   ")])])
+    assert texts(spliced) == texts(ORIGINAL[:-1])
+    assert splice_segments(ORIGINAL, []) == ORIGINAL
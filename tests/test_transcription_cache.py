@@ -0,0 +1,124 @@
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from mcp.transcription_cache import TranscriptionCache
+
+
+def write_wav(path, samples, rate=16000):
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TranscriptionCache(tmp_path / "cache", max_entries=10)
+
+
+@pytest.fixture
+def audio(tmp_path):
+    rng = np.random.default_rng(0)
+    return write_wav(tmp_path / "class.wav", rng.integers(-3000, 3000, 16000))
+
+
+def make_result(tmp_path, text="hola mundo"):
+    txt = tmp_path / "engine_out.txt"
+    txt.write_text(text, encoding='utf-8')
+    return {"success": True, "engine": "whisper-amd", "text": text, "word_count": len(text.split()),
+            "txt_file": str(txt)}
+
+
+def test_hit_restores_result_and_artifacts(cache, audio, tmp_path):
+    key = cache.key(cache.audio_hash(audio), {"engine": "whisper-amd", "model": "base|1:1"})
+    cache.put(key, make_result(tmp_path))
+
+    out_dir = tmp_path / "transcripts"
+    out_dir.mkdir()
+    hit = cache.get(key, out_dir, "lesson")
+    assert hit["text"] == "hola mundo"
+    assert hit["txt_file"] == str(out_dir / "lesson.txt")
+    assert (out_dir / "lesson.txt").read_text(encoding='utf-8') == "hola mundo"
+
+
+def test_same_samples_share_a_key(cache, audio, tmp_path):
+    copy = tmp_path / "copy.wav"
+    copy.write_bytes(audio.read_bytes())
+    assert cache.audio_hash(copy) == cache.audio_hash(audio)
+
+
+def test_model_fingerprint_change_is_a_miss(cache, audio, tmp_path):
+    audio_hash = cache.audio_hash(audio)
+    old_key = cache.key(audio_hash, {"engine": "whisper-amd", "model": "ggml-base.bin|100:1"})
+    cache.put(old_key, make_result(tmp_path))
+
+    new_key = cache.key(audio_hash, {"engine": "whisper-amd", "model": "ggml-base.bin|100:2"})
+    assert new_key != old_key
+    assert cache.get(new_key, tmp_path, "lesson") is None
+
+
+def test_rewritten_audio_gets_a_new_hash(cache, audio):
+    before = cache.audio_hash(audio)
+    write_wav(audio, np.zeros(16000))
+    assert cache.audio_hash(audio) != before
+
+
+def test_single_flight_computes_once(cache, tmp_path):
+    key = "ab" + "0" * 62
+    computations = []
+    results = []
+
+    def request():
+        with cache.single_flight(key):
+            cached = cache.get(key, tmp_path, "lesson")
+            if cached is None:
+                computations.append(1)
+                time.sleep(0.2)  # the other thread arrives while this one computes
+                cache.put(key, {"success": True, "text": "uno"})
+                cached = {"text": "uno"}
+            results.append(cached["text"])
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(computations) == 1
+    assert results == ["uno", "uno"]
+    assert cache._locks == {}
+
+
+def test_missing_artifact_is_a_miss_and_drops_the_entry(cache, audio, tmp_path):
+    key = cache.key(cache.audio_hash(audio), {"engine": "whisper-amd"})
+    cache.put(key, make_result(tmp_path))
+    entry = cache._entry_dir(key)
+    (entry / "txt_file.txt").unlink()
+
+    assert cache.get(key, tmp_path, "lesson") is None
+    assert not entry.exists()
+
+
+def test_prune_keeps_most_recent_entries(tmp_path):
+    cache = TranscriptionCache(tmp_path / "cache", max_entries=2)
+    keys = [f"{i:02d}" + "0" * 62 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, {"success": True, "text": str(i)})
+        time.sleep(0.01)  # distinct mtimes
+
+    assert cache.get(keys[0], tmp_path, "x") is None
+    assert cache.get(keys[2], tmp_path, "x")["text"] == "2"
+
+
+def test_hash_memo_drops_deleted_files(cache, audio, tmp_path):
+    other = write_wav(tmp_path / "other.wav", np.ones(1600))
+    cache.audio_hash(other)
+    other.unlink()
+    cache.audio_hash(audio)
+    assert all(str(other.resolve()) not in memo_key for memo_key in cache._audio_hashes)
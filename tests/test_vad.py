@@ -0,0 +1,92 @@
+import wave
+
+import numpy as np
+import pytest
+
+from mcp.audio_dsp import StreamingResampler
+from mcp.audio_io import iter_pcm_blocks
+from mcp.vad import WHISPER_SAMPLE_RATE, TimelineMap, compact_speech
+
+RATE = 44100
+# (start, end) in seconds of each tone burst; the rest is quiet room noise
+TONES = [(1.0, 2.0), (4.0, 5.5), (8.0, 9.0)]
+TOTAL = 10.5
+
+
+def write_wav(path, samples, rate=RATE):
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+    return path
+
+
+def read_wav(path):
+    with wave.open(str(path), 'rb') as wf:
+        return wf.getframerate(), np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+@pytest.fixture
+def tone_and_silence(tmp_path):
+    rng = np.random.default_rng(1)
+    t = np.arange(int(TOTAL * RATE)) / float(RATE)
+    signal = rng.normal(0.0, 5.0, len(t))
+    for start, end in TONES:
+        burst = (t >= start) & (t < end)
+        signal[burst] += 8000 * np.sin(2 * np.pi * 440.0 * t[burst])
+    return write_wav(tmp_path / "lesson.wav", signal)
+
+
+def onsets(samples, rate, threshold=2000, min_gap=0.2):
+    """Times where the signal first gets loud after at least `min_gap` s of quiet."""
+    loud = np.flatnonzero(np.abs(samples.astype(np.int32)) > threshold)
+    found = []
+    for index in loud:
+        if not found or index - last > min_gap * rate:
+            found.append(index / float(rate))
+        last = index
+    return found
+
+
+def test_timeline_map_round_trip():
+    timeline = TimelineMap([(0.0, 0.75, 1.5), (1.8, 3.75, 2.0)])
+    assert timeline.to_original(0.0) == 0.75
+    assert timeline.to_original(1.0) == pytest.approx(1.75)
+    assert timeline.to_original(2.3) == pytest.approx(4.25)
+    # Times inside the join gap stick to the end of the previous region
+    assert timeline.to_original(1.6) == pytest.approx(2.25)
+    remapped = timeline.remap_segments([{"start": 0.25, "end": 2.8, "text": "hola"}])
+    assert remapped == [{"start": 1.0, "end": 4.75, "text": "hola"}]
+
+
+def test_compact_speech_timeline_matches_tone_onsets(tone_and_silence, tmp_path):
+    dst = tmp_path / "compact.wav"
+    timeline, stats = compact_speech(tone_and_silence, dst, padding=0.25)
+
+    assert timeline is not None
+    assert stats["speech_regions"] == len(TONES)
+    rate, compact = read_wav(dst)
+    assert rate == WHISPER_SAMPLE_RATE
+    assert len(compact) / float(rate) == pytest.approx(stats["compacted_seconds"], abs=0.01)
+
+    # Every tone starts at the same place once mapped back to the original
+    found = onsets(compact, rate)
+    assert len(found) == len(TONES)
+    for onset, (start, _) in zip(found, TONES):
+        assert timeline.to_original(onset) == pytest.approx(start, abs=0.01)
+
+
+def test_compact_speech_resamples_each_region_on_its_own(tone_and_silence, tmp_path):
+    dst = tmp_path / "compact.wav"
+    timeline, _ = compact_speech(tone_and_silence, dst, padding=0.0)
+    _, compact = read_wav(dst)
+    source = b"".join(iter_pcm_blocks(tone_and_silence))
+
+    for compact_start, original_start, duration in timeline.entries:
+        first, count = int(original_start * RATE), int(duration * RATE)
+        alone = StreamingResampler(RATE, WHISPER_SAMPLE_RATE).process(source[first * 2:(first + count) * 2])
+        expected = np.frombuffer(alone, dtype=np.int16)
+        begin = int(round(compact_start * WHISPER_SAMPLE_RATE))
+        # Identical to resampling the region by itself: nothing carried over from the previous one
+        np.testing.assert_array_equal(compact[begin:begin + len(expected)], expected)